@@ -146,6 +146,14 @@ def get_current_user(token: str, db: Session):
     return user
 
 
+def require_moderator(token: str, db: Session) -> UserInDB:
+    """Текущий пользователь, если он модератор или администратор; иначе 403"""
+    user = get_current_user(token, db)
+    if user.role not in (UsersRoles.moder, UsersRoles.admin):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Недостаточно прав")
+    return user
+
+
 def read_users_me(current_user: User):
     return current_user
 
@@ -161,3 +169,11 @@ def jwt_decode(token: str):
         )
     except JWTError:
         raise credentials_exception
+
+
+def favorite_user_id(token: str) -> Optional[int]:
+    """ID пользователя для фильтра по избранным; для невалидного токена фильтр не применяется"""
+    try:
+        return jwt_decode(token).get("id")
+    except Exception:
+        return None
@@ -0,0 +1,95 @@
+"""
+Замер процессорного времени на запрос для fetch_nko и fetch_events
+
+Сравнивает построение запроса на каждый вызов (как раньше) с готовыми
+запросами на комбинацию фильтров. Данные — SQLite в памяти, поэтому
+время выполнения SQL минимально и разница видна на стороне Python.
+
+Запуск из каталога backend:
+    python bench_listing.py [--requests 2000] [--rows 200] [--limit 20]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from conftest import register_text_search  # Также типы PostgreSQL для SQLite
+from database import Base
+from event import EventFilterRequest, _event_page_statement, fetch_events
+from event_feed import sync_event_feed
+from nko import NKOFilterRequest, _nko_page_statement, fetch_nko
+from reference import load_reference_data
+
+def scenarios(limit: int):
+    return [
+        ("nko: без фильтров", fetch_nko, NKOFilterRequest(limit=limit)),
+        ("nko: город + категория", fetch_nko, NKOFilterRequest(city="Пермь", category=["Образование"], limit=limit)),
+        ("events: без фильтров", fetch_events, EventFilterRequest(limit=limit)),
+        ("events: НКО + категория", fetch_events, EventFilterRequest(nko_id=[1, 2, 3], category=["Спорт"], limit=limit)),
+    ]
+
+
+def seed(db, rows: int) -> None:
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db.add_all([
+        models.CityInDB(id=1, name="Пермь"),
+        models.UserInDB(id=1, full_name="Иванов Иван", login="ivanov", hash="x", salt="y", role="admin"),
+        models.NKOCategoryInDB(id=1, name="Образование", created_at=base_time),
+        models.EventsCategoryInDB(id=1, name="Спорт", description="Спорт"),
+    ])
+    for i in range(1, rows + 1):
+        created_at = base_time + timedelta(hours=i)
+        db.add(models.NKOInDB(
+            id=i, name=f"НКО {i}", address="ул. Ленина", city_id=1, coords=(58.0, 56.0), created_at=created_at,
+        ))
+        db.add(models.NKOCategoriesLinkInDB(nko_id=i, category_id=1))
+        db.add(models.EventInDB(
+            id=i, nko_id=i, name=f"Событие {i}", city_id=1, coords=(58.0, 56.0),
+            starts_at=created_at, finish_at=created_at + timedelta(hours=2),
+            created_by=1, state="approved", created_at=created_at,
+        ))
+        db.add(models.EventsCategoriesLinkInDB(events_id=i, category_id=1))
+    # GET /event читает ленту event_feed: без нее сценарии событий мерили бы пустую таблицу
+    sync_event_feed(list(range(1, rows + 1)), db)
+    db.commit()
+    load_reference_data(db)
+
+
+def cpu_per_request_us(fetch, filters, db, requests: int, rebuild: bool) -> float:
+    started = time.process_time()
+    for _ in range(requests):
+        if rebuild:
+            _nko_page_statement.cache_clear()
+            _event_page_statement.cache_clear()
+        fetch(filters, db)
+    return (time.process_time() - started) / requests * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20, help="размер страницы")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    # Функции полнотекстового поиска для генерируемых колонок search_vector
+    event.listen(engine, "connect", register_text_search)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.rows)
+
+    print(f"{'сценарий':<28}{'до, мкс':>12}{'после, мкс':>12}{'выигрыш':>10}")
+    for name, fetch, filters in scenarios(args.limit):
+        cpu_per_request_us(fetch, filters, db, 100, rebuild=False)  # прогрев
+        before = cpu_per_request_us(fetch, filters, db, args.requests, rebuild=True)
+        after = cpu_per_request_us(fetch, filters, db, args.requests, rebuild=False)
+        print(f"{name:<28}{before:>12.0f}{after:>12.0f}{(1 - after / before) * 100:>9.0f}%")
+
+
+if __name__ == "__main__":
+    main()
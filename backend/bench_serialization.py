@@ -0,0 +1,72 @@
+"""
+Замер стоимости сериализации спискового ответа на 10 000 строк
+
+Сравнивает стандартный путь FastAPI (проверка по response_model,
+jsonable_encoder, json.dumps) с serialized_response (один проход
+TypeAdapter.dump_json).
+
+Запуск из каталога backend:
+    python bench_serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from event import EventPage, EventResponse
+from serialization import EVENT_PAGE, serialized_response
+
+
+def make_page(rows: int) -> EventPage:
+    return EventPage(items=[
+        EventResponse(
+            id=i, nko_id=i, nko_name=f"НКО {i}", name=f"Событие {i}", description="Описание события " * 10,
+            address="ул. Ленина, 1", city="Пермь", picture=None, latitude=58.01, longitude=56.25,
+            starts_at="2024-01-01T10:00:00+00:00", finish_at="2024-01-01T12:00:00+00:00",
+            created_by=1, approved_by=1, state="approved", meta=None,
+            created_at="2023-12-01T00:00:00+00:00", categories=["Спорт", "Экология"],
+        )
+        for i in range(rows)
+    ], next_cursor="WyIyMDIzLTEyLTAxVDAwOjAwOjAwIiwgMV0")
+
+
+def fastapi_default(page: EventPage) -> bytes:
+    field = create_response_field(name="Response_get_events", type_=EventPage)
+    content = asyncio.run(serialize_response(field=field, response_content=page, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def single_pass(page: EventPage) -> bytes:
+    return serialized_response(EVENT_PAGE, page, Response()).body
+
+
+def measure_ms(serialize, page: EventPage, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        serialize(page)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    page = make_page(args.rows)
+    # Оба пути дают один и тот же JSON
+    assert json.loads(fastapi_default(page)) == json.loads(single_pass(page))
+
+    before = measure_ms(fastapi_default, page, args.repeat)
+    after = measure_ms(single_pass, page, args.repeat)
+    print(f"{args.rows} строк: response_model + json.dumps {before:.1f} мс, TypeAdapter.dump_json {after:.1f} мс "
+          f"(в {before / after:.1f} раза быстрее)")
+
+
+if __name__ == "__main__":
+    main()
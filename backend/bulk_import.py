@@ -0,0 +1,487 @@
+"""
+Массовая загрузка НКО и событий из JSONL или CSV
+
+Строки проверяются моделями NKOCreateRequest/EventCreateRequest и потоком
+загружаются во временную таблицу (в PostgreSQL — через COPY). Города,
+категории и НКО сопоставляются одним запросом на всю загрузку, затем
+записи и связи с категориями вставляются INSERT ... SELECT. Строки с
+ошибками пропускаются и попадают в отчет.
+
+В CSV категории перечисляются через ";" в колонке categories, meta — JSON.
+
+Запуск из каталога backend:
+    python bulk_import.py {nko,event} FILE [--format jsonl|csv]
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from enum import Enum
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import (
+    BigInteger, Column, Integer, MetaData, SmallInteger, String, Table, Text, cast, exists, func, insert,
+    literal, select, text, update,
+)
+from sqlalchemy.dialects.postgresql import ENUM, JSONB
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TIMESTAMP
+
+import database
+from clusters import MapLayer, add_point
+from event import EventCreateRequest, event_duration_error
+from event_feed import sync_event_feed
+from models import (
+    CityInDB,
+    EventInDB,
+    EventsCategoriesLinkInDB,
+    EventsCategoryInDB,
+    EventsStates,
+    NKOCategoriesLinkInDB,
+    NKOCategoryInDB,
+    NKOInDB,
+    Point,
+    UserInDB,
+)
+from nko import NKOCreateRequest
+from versions import bump_versions
+
+IMPORT_FORMATS = ("jsonl", "csv")
+_FORMAT_BY_EXTENSION = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}
+
+# Разделитель списка категорий в CSV
+CSV_LIST_SEPARATOR = ";"
+
+# Строк на один executemany, если COPY недоступен (SQLite в тестах)
+INSERT_BATCH_SIZE = 1000
+
+
+class ImportKind(str, Enum):
+    nko = "nko"
+    event = "event"
+
+
+class ImportRowError(BaseModel):
+    """Ошибка строки входного файла (нумерация строк данных с 1)"""
+
+    row: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    """Итог массовой загрузки"""
+
+    kind: ImportKind
+    total: int
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+
+
+def import_format(filename: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Формат входного файла: явно заданный или по расширению имени
+
+    Raises:
+        HTTPException: Если формат не поддерживается или не определен
+    """
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Неподдерживаемый формат '{requested}'")
+        return requested
+    for extension, name in _FORMAT_BY_EXTENSION.items():
+        if filename and filename.lower().endswith(extension):
+            return name
+    raise HTTPException(status_code=400, detail="Не удалось определить формат файла: укажите format=jsonl или csv")
+
+
+def _csv_record(record: Dict[str, str], kind: ImportKind) -> Dict[str, Any]:
+    """Значения строки CSV в виде, который принимают модели запросов"""
+    values: Dict[str, Any] = {key: value if value != "" else None for key, value in record.items()}
+    categories = values.get("categories")
+    values["categories"] = [
+        name.strip() for name in categories.split(CSV_LIST_SEPARATOR) if name.strip()
+    ] if categories else []
+    # У НКО meta — JSON-объект, у событий — текст
+    if kind == ImportKind.nko and values.get("meta") is not None:
+        values["meta"] = json.loads(values["meta"])
+    return values
+
+
+def read_records(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Построчное чтение входного файла без загрузки целиком в память
+
+    Returns:
+        Пары (номер строки данных, запись); запись JSONL разбирается позже,
+        чтобы ошибка разбора попала в отчет по своей строке
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            for row_no, record in enumerate(csv.DictReader(text_stream), start=1):
+                yield row_no, record
+        else:
+            for row_no, line in enumerate(text_stream, start=1):
+                if line.strip():
+                    yield row_no, line
+    finally:
+        # Файл закрывает владелец потока (UploadFile или CLI)
+        text_stream.detach()
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" if item["loc"] else item["msg"]
+            for item in error.errors()
+        )
+    return str(error)
+
+
+def _parse_datetime(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name}: некорректная дата '{value}'")
+
+
+def _stage_row(kind: ImportKind, row_no: int, raw: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Проверка записи и ее строка для временной таблицы
+
+    Returns:
+        Строка временной таблицы и названия категорий
+
+    Raises:
+        ValueError, ValidationError: Если запись некорректна
+    """
+    if isinstance(raw, str):
+        record = json.loads(raw)
+        if not isinstance(record, dict):
+            raise ValueError("Строка JSONL должна быть объектом")
+    else:
+        record = _csv_record(raw, kind)
+
+    if kind == ImportKind.nko:
+        data = NKOCreateRequest.model_validate(record)
+        row = {
+            "name": data.name, "description": data.description, "logo": data.logo, "address": data.address,
+            "coords": (data.latitude, data.longitude), "meta": data.meta,
+        }
+    else:
+        data = EventCreateRequest.model_validate(record)
+        if data.state not in EventsStates.__members__:
+            raise ValueError(f"state: неизвестное состояние '{data.state}'")
+        starts_at = _parse_datetime(data.starts_at, "starts_at")
+        finish_at = _parse_datetime(data.finish_at, "finish_at")
+        if finish_at is not None and (finish_at.tzinfo is None) == (starts_at.tzinfo is None) and finish_at < starts_at:
+            raise ValueError("finish_at раньше starts_at")
+        duration_error = event_duration_error(starts_at, finish_at)
+        if duration_error:
+            raise ValueError(duration_error)
+        has_coords = data.latitude is not None and data.longitude is not None
+        row = {
+            "nko_id": data.nko_id, "name": data.name, "description": data.description, "address": data.address,
+            "picture": data.picture, "coords": (data.latitude, data.longitude) if has_coords else None,
+            "starts_at": starts_at, "finish_at": finish_at, "created_by": data.created_by,
+            "state": EventsStates[data.state], "meta": data.meta,
+        }
+
+    row.update(row_no=row_no, city=data.city)
+    return row, data.categories
+
+
+def _staging_tables(kind: ImportKind) -> Tuple[Table, Table]:
+    """Временные таблицы загрузки: записи и их категории (в PostgreSQL удаляются при коммите)"""
+    metadata = MetaData()
+    options = {"prefixes": ["TEMPORARY"], "postgresql_on_commit": "DROP"}
+    if kind == ImportKind.nko:
+        fields = [
+            Column("name", String(255)), Column("description", Text), Column("logo", Text),
+            Column("address", Text), Column("coords", Point), Column("meta", JSONB),
+        ]
+    else:
+        fields = [
+            Column("nko_id", BigInteger), Column("name", String(255)), Column("description", Text),
+            Column("address", Text), Column("picture", Text), Column("coords", Point),
+            Column("starts_at", TIMESTAMP(timezone=True)), Column("finish_at", TIMESTAMP(timezone=True)),
+            Column("created_by", BigInteger),
+            Column("state", ENUM(EventsStates, name="events_states", create_type=False)),
+            Column("meta", Text),
+        ]
+    rows = Table(
+        f"import_{kind.value}", metadata,
+        Column("row_no", Integer, primary_key=True, autoincrement=False),
+        Column("id", BigInteger),
+        Column("city", Text),
+        Column("city_id", SmallInteger),
+        Column("error", Text),
+        *fields,
+        **options,
+    )
+    categories = Table(
+        f"import_{kind.value}_categories", metadata,
+        Column("row_no", Integer, nullable=False, index=True),
+        Column("name", Text, nullable=False),
+        Column("category_id", SmallInteger),
+        **options,
+    )
+    return rows, categories
+
+
+def _copy_value(value: Any) -> str:
+    """Значение в текстовом формате COPY"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, tuple):
+        value = f"({value[0]},{value[1]})"
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Enum):
+        value = value.value
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+class _CopyStream:
+    """Файлоподобный источник для COPY FROM STDIN: строки берутся из генератора по мере чтения"""
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _load(db: Session, table: Table, rows: Iterable[Dict[str, Any]]) -> None:
+    """Потоковая загрузка строк во временную таблицу: COPY в PostgreSQL, пакетный INSERT в остальных СУБД"""
+    columns = [column.name for column in table.columns if column.name not in ("id", "city_id", "category_id", "error")]
+    if db.get_bind().dialect.name == "postgresql":
+        lines = ("\t".join(_copy_value(row.get(name)) for name in columns) + "\n" for row in rows)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", _CopyStream(lines))
+        finally:
+            cursor.close()
+        return
+
+    batch = []
+    for row in rows:
+        batch.append({name: row.get(name) for name in columns})
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.execute(insert(table), batch)
+            batch = []
+    if batch:
+        db.execute(insert(table), batch)
+
+
+def _resolve(kind: ImportKind, rows: Table, categories: Table, db: Session) -> None:
+    """Сопоставление городов, категорий и НКО одним запросом на таблицу; строки без пары получают error"""
+    pending = rows.c.error.is_(None)
+
+    db.execute(update(rows).values(
+        city_id=select(CityInDB.id).where(CityInDB.name == rows.c.city).scalar_subquery()
+    ))
+    db.execute(
+        update(rows)
+        .where(pending, rows.c.city_id.is_(None))
+        .values(error=literal("Город '") + rows.c.city + literal("' не найден"))
+    )
+
+    category_model = NKOCategoryInDB if kind == ImportKind.nko else EventsCategoryInDB
+    db.execute(update(categories).values(
+        category_id=select(category_model.id).where(category_model.name == categories.c.name).scalar_subquery()
+    ))
+    missing_category = (
+        select(func.min(categories.c.name))
+        .where(categories.c.row_no == rows.c.row_no, categories.c.category_id.is_(None))
+        .scalar_subquery()
+    )
+    db.execute(
+        update(rows)
+        .where(pending, missing_category.is_not(None))
+        .values(error=literal("Категория '") + missing_category + literal("' не найдена"))
+    )
+
+    if kind == ImportKind.event:
+        db.execute(
+            update(rows)
+            .where(pending, ~exists().where(NKOInDB.id == rows.c.nko_id))
+            .values(error=literal("НКО с ID ") + cast(rows.c.nko_id, Text) + literal(" не найдено"))
+        )
+        db.execute(
+            update(rows)
+            .where(pending, ~exists().where(UserInDB.id == rows.c.created_by))
+            .values(error=literal("Пользователь с ID ") + cast(rows.c.created_by, Text) + literal(" не найден"))
+        )
+
+
+def _insert(kind: ImportKind, rows: Table, categories: Table, db: Session) -> List[int]:
+    """Вставка проверенных записей и их связей с категориями; возвращает ID новых записей"""
+    postgres = db.get_bind().dialect.name == "postgresql"
+    valid = rows.c.error.is_(None)
+    target, link, link_key = (
+        (NKOInDB.__table__, NKOCategoriesLinkInDB.__table__, "nko_id")
+        if kind == ImportKind.nko
+        else (EventInDB.__table__, EventsCategoriesLinkInDB.__table__, "events_id")
+    )
+
+    # ID выделяются заранее, чтобы связать записи с их категориями
+    if postgres:
+        next_id = func.nextval(func.pg_get_serial_sequence(target.name, "id"))
+    else:
+        next_id = select(func.coalesce(func.max(target.c.id), 0)).scalar_subquery() + rows.c.row_no
+    db.execute(update(rows).where(valid).values(id=next_id))
+
+    if kind == ImportKind.nko:
+        columns: Sequence[str] = ("id", "name", "description", "logo", "address", "city_id", "coords", "meta")
+    else:
+        columns = (
+            "id", "nko_id", "name", "description", "address", "city_id", "picture", "coords",
+            "starts_at", "finish_at", "created_by", "state", "meta",
+        )
+        if postgres:
+            # Секции за месяцы загружаемых событий (UTC, как в ensure_events_partition)
+            db.execute(text(
+                "SELECT ensure_events_partition(month) FROM ("
+                f"SELECT DISTINCT date_trunc('month', starts_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS month "
+                f"FROM {rows.name} WHERE error IS NULL) AS months"
+            ))
+
+    db.execute(insert(target).from_select(
+        [*columns, "created_at"],
+        select(*[rows.c[name] for name in columns], func.now()).where(valid),
+    ))
+    db.execute(insert(link).from_select(
+        [link_key, "category_id"],
+        select(rows.c.id, categories.c.category_id)
+        .distinct()
+        .join_from(categories, rows, categories.c.row_no == rows.c.row_no)
+        .where(valid),
+    ))
+
+    ids = list(db.execute(select(rows.c.id).where(valid).order_by(rows.c.row_no)).scalars())
+
+    # Производные данные: кластеры карты и лента событий
+    layer = MapLayer.nko if kind == ImportKind.nko else MapLayer.event
+    if postgres:
+        db.execute(text("SELECT rebuild_map_clusters()"))
+    else:
+        on_map = [valid, rows.c.coords.is_not(None)]
+        if kind == ImportKind.event:
+            on_map.append(rows.c.state == EventsStates.approved)
+        for coords, in db.execute(select(rows.c.coords).where(*on_map)):
+            add_point(layer, *coords, db)
+    if kind == ImportKind.event:
+        sync_event_feed(ids, db)
+
+    return ids
+
+
+def bulk_import(kind: ImportKind, records: Iterable[Tuple[int, Any]], db: Session) -> ImportReport:
+    """
+    Массовая загрузка НКО или событий одной транзакцией
+
+    Args:
+        kind: Что загружается: nko или event
+        records: Пары (номер строки, запись) из read_records
+        db: Сессия базы данных
+
+    Returns:
+        Число прочитанных и загруженных строк и ошибки по строкам
+
+    Raises:
+        HTTPException: Если произошла ошибка БД
+    """
+    rows, categories = _staging_tables(kind)
+    errors: List[ImportRowError] = []
+    category_rows: List[Dict[str, Any]] = []
+    total = 0
+
+    def staged_rows() -> Iterator[Dict[str, Any]]:
+        nonlocal total
+        for row_no, raw in records:
+            total += 1
+            try:
+                row, names = _stage_row(kind, row_no, raw)
+            except (ValueError, ValidationError) as e:
+                errors.append(ImportRowError(row=row_no, error=_error_message(e)))
+                continue
+            category_rows.extend({"row_no": row_no, "name": name} for name in dict.fromkeys(names))
+            yield row
+
+    try:
+        connection = db.connection()
+        rows.create(connection)
+        categories.create(connection)
+
+        _load(db, rows, staged_rows())
+        _load(db, categories, category_rows)
+        if db.get_bind().dialect.name == "postgresql":
+            # Автоочистка не собирает статистику временных таблиц
+            db.execute(text(f"ANALYZE {rows.name}, {categories.name}"))
+        _resolve(kind, rows, categories, db)
+        errors.extend(
+            ImportRowError(row=row_no, error=error)
+            for row_no, error in db.execute(select(rows.c.row_no, rows.c.error).where(rows.c.error.is_not(None)))
+        )
+        ids = _insert(kind, rows, categories, db)
+
+        if ids:
+            bump_versions(db, "nko" if kind == ImportKind.nko else "events")
+        if db.get_bind().dialect.name != "postgresql":
+            categories.drop(connection)
+            rows.drop(connection)
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    errors.sort(key=lambda item: item.row)
+    return ImportReport(kind=kind, total=total, imported=len(ids), failed=len(errors), errors=errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=[kind.value for kind in ImportKind])
+    parser.add_argument("path", help="файл JSONL или CSV")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="по умолчанию по расширению файла")
+    args = parser.parse_args()
+
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        with open(args.path, "rb") as stream:
+            report = bulk_import(ImportKind(args.kind), read_records(stream, import_format(args.path, args.format)), db)
+    except HTTPException as e:
+        sys.exit(e.detail)
+    finally:
+        db.close()
+
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
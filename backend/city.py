@@ -3,12 +3,15 @@ from typing import Any, Dict, List, Optional
 from fastapi import Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import and_, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models import (
     CityInDB,
 )
+from reference import get_reference_data
+from versions import bump_versions
 
 
 class CityCreateRequest(BaseModel):
@@ -26,17 +29,24 @@ class CityResponse(BaseModel):
 def fetch_cities(regex: Optional[str], db: Session) -> List[CityResponse]:
     """
     Получение списка городов с фильтрацией
+
+    Полный список берется из кэша справочников, без обращения к БД.
+    Фильтр по regex выполняется в PostgreSQL (`~*`, синтаксис ARE):
+    пользовательское выражение не выполняется в процессе приложения.
     """
     
     try:
-        query = db.query(CityInDB)
-        
         if regex:
-            query = query.filter(CityInDB.name.op("~*")(regex))
-        
-        rows = query.all()
+            rows = (
+                db.query(CityInDB.id, CityInDB.name)
+                .filter(CityInDB.name.op("~*")(regex))
+                .order_by(CityInDB.id)
+                .all()
+            )
+        else:
+            rows = get_reference_data(db).cities.items()
         
-        city_list = [CityResponse(id=city.id, name=city.name) for city in rows]
+        city_list = [CityResponse(id=city_id, name=name) for city_id, name in rows]
         
         return city_list
     
@@ -56,6 +66,7 @@ def create_city(city_data: CityCreateRequest, db: Session) -> CityResponse:
         
         new_city = CityInDB(name=city_data.name)
         db.add(new_city)
+        bump_versions(db, "cities")
         db.commit()
         db.refresh(new_city)
         
@@ -72,17 +83,34 @@ def fetch_city_by_name(city_name: str, db: Session) -> CityResponse:
     """
     
     try:
-        city = db.query(CityInDB).filter(CityInDB.name == city_name).first()
+        city_id = get_reference_data(db).city_ids.get(city_name)
         
-        if not city:
+        if city_id is None:
             raise HTTPException(status_code=404, detail="City not found")
         
-        return CityResponse(id=city.id, name=city.name)
+        return CityResponse(id=city_id, name=city_name)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+async def fetch_cities_async(regex: Optional[str], db: AsyncSession) -> List[CityResponse]:
+    """
+    Асинхронный вариант fetch_cities для AsyncSession
+
+    Запрос строится тем же кодом, что и в синхронном варианте, и выполняется
+    через asyncpg без занятия потока из пула.
+    """
+    return await db.run_sync(lambda session: fetch_cities(regex, session))
+
+
+async def fetch_city_by_name_async(city_name: str, db: AsyncSession) -> CityResponse:
+    """Асинхронный вариант fetch_city_by_name для AsyncSession"""
+    return await db.run_sync(lambda session: fetch_city_by_name(city_name, session))
+
+
 def delete_city(city_id: int, db: Session) -> Dict[str, str]:
     """
     Удаление города по ID
@@ -95,6 +123,7 @@ def delete_city(city_id: int, db: Session) -> Dict[str, str]:
             raise HTTPException(status_code=404, detail="City not found")
         
         db.delete(city)
+        bump_versions(db, "cities")
         db.commit()
         
         return {"status": "success", "message": f"City with id {city_id} has been deleted."}
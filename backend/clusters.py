@@ -0,0 +1,205 @@
+import math
+import time
+from enum import Enum
+from typing import Iterable, List, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import and_, case, or_, text, tuple_
+from sqlalchemy.orm import Session
+
+from database import dialect_insert
+from geo import parse_bbox
+from models import EventInDB, EventsStates, MapClusterInDB
+
+# Сетка кластеров: ячейка — тайл Web Mercator уровня zoom + CLUSTER_CELL_SHIFT,
+# т.е. 8x8 ячеек (~32px) на экранный тайл 256px. Значения должны совпадать
+# с функцией rebuild_map_clusters() в database/1_init.sql.
+CLUSTER_CELL_SHIFT = 3
+MAX_CLUSTER_ZOOM = 16
+MAX_MERCATOR_LAT = 85.05112878
+
+# Ограничение размера ответа: число ячеек в запрошенном окне
+MAX_VIEWPORT_CELLS = 4096
+
+
+class MapLayer(str, Enum):
+    nko = "nko"
+    event = "event"
+
+
+class ClusterResponse(BaseModel):
+    """Модель ответа с кластером точек на карте"""
+
+    count: int
+    latitude: float  # Центроид точек кластера
+    longitude: float
+    bbox: List[float]  # [min_lat, min_lon, max_lat, max_lon]
+
+
+def cell_for(latitude: float, longitude: float, zoom: int) -> Tuple[int, int]:
+    """
+    Ячейка сетки кластеров, в которую попадает точка на уровне zoom
+
+    Returns:
+        Координаты ячейки (x, y); y растет с севера на юг
+    """
+    n = 2 ** (zoom + CLUSTER_CELL_SHIFT)
+    lat = math.radians(max(min(latitude, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT))
+    x = math.floor((longitude + 180) / 360 * n)
+    y = math.floor((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _point_cells(latitude: float, longitude: float) -> List[Tuple[int, int, int]]:
+    """Ячейки точки на всех уровнях масштаба: [(zoom, x, y), ...]"""
+    return [(zoom, *cell_for(latitude, longitude, zoom)) for zoom in range(MAX_CLUSTER_ZOOM + 1)]
+
+
+def _version() -> int:
+    """Метка изменения ячейки (микросекунды), по ней строятся ETag тайлов"""
+    return time.time_ns() // 1000
+
+
+def add_point(layer: MapLayer, latitude: float, longitude: float, db: Session) -> None:
+    """
+    Учет новой точки в кластерах всех уровней
+
+    Выполняется в транзакции вызывающего кода, коммит делает он же.
+    """
+    table = MapClusterInDB.__table__
+    version = _version()
+    statement = dialect_insert(db, MapClusterInDB).values([
+        {
+            "layer": layer.value, "zoom": zoom, "cell_x": x, "cell_y": y, "count": 1,
+            "sum_lat": latitude, "sum_lon": longitude,
+            "min_lat": latitude, "min_lon": longitude, "max_lat": latitude, "max_lon": longitude,
+            "version": version,
+        }
+        for zoom, x, y in _point_cells(latitude, longitude)
+    ])
+    excluded = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.layer, table.c.zoom, table.c.cell_x, table.c.cell_y],
+        set_={
+            "count": table.c.count + 1,
+            "sum_lat": table.c.sum_lat + excluded.sum_lat,
+            "sum_lon": table.c.sum_lon + excluded.sum_lon,
+            "min_lat": case((excluded.min_lat < table.c.min_lat, excluded.min_lat), else_=table.c.min_lat),
+            "min_lon": case((excluded.min_lon < table.c.min_lon, excluded.min_lon), else_=table.c.min_lon),
+            "max_lat": case((excluded.max_lat > table.c.max_lat, excluded.max_lat), else_=table.c.max_lat),
+            "max_lon": case((excluded.max_lon > table.c.max_lon, excluded.max_lon), else_=table.c.max_lon),
+            "version": excluded.version,
+        },
+    )
+    db.execute(statement)
+
+
+def remove_points(layer: MapLayer, points: Iterable[Tuple[float, float]], db: Session) -> None:
+    """
+    Исключение точек из кластеров всех уровней
+
+    Границы bbox при удалении не сужаются: они остаются корректной, хотя
+    и не минимальной, оболочкой до следующего rebuild_clusters.
+    """
+    for latitude, longitude in points:
+        cells = tuple_(MapClusterInDB.zoom, MapClusterInDB.cell_x, MapClusterInDB.cell_y).in_(
+            _point_cells(latitude, longitude)
+        )
+        db.query(MapClusterInDB).filter(MapClusterInDB.layer == layer.value, cells).update(
+            {
+                MapClusterInDB.count: MapClusterInDB.count - 1,
+                MapClusterInDB.sum_lat: MapClusterInDB.sum_lat - latitude,
+                MapClusterInDB.sum_lon: MapClusterInDB.sum_lon - longitude,
+                MapClusterInDB.version: _version(),
+            },
+            synchronize_session=False,
+        )
+        db.query(MapClusterInDB).filter(
+            MapClusterInDB.layer == layer.value, cells, MapClusterInDB.count <= 0
+        ).delete(synchronize_session=False)
+
+
+def event_on_map(state) -> bool:
+    """Учитывается ли событие в кластерах: публичная карта показывает только одобренные события"""
+    return state == EventsStates.approved
+
+
+def remove_nko_events(nko_id: int, db: Session) -> None:
+    """Исключение из кластеров событий НКО, которые удалятся каскадно вместе с ним"""
+    rows = (
+        db.query(EventInDB.coords)
+        .filter(
+            EventInDB.nko_id == nko_id,
+            EventInDB.coords.isnot(None),
+            EventInDB.state == EventsStates.approved,
+        )
+        .all()
+    )
+    remove_points(MapLayer.event, [coords for coords, in rows], db)
+
+
+def rebuild_clusters(db: Session) -> None:
+    """Полный пересчет кластеров из таблиц nko и events"""
+    db.execute(text("SELECT rebuild_map_clusters()"))
+    db.commit()
+
+
+def fetch_clusters(layer: MapLayer, bbox: str, zoom: int, db: Session) -> List[ClusterResponse]:
+    """
+    Получение кластеров точек слоя в окне карты
+
+    Окно с min_lon > max_lon пересекает меридиан ±180° и делится на две
+    полосы ячеек: от min_lon до 180° и от -180° до max_lon.
+
+    Args:
+        layer: Слой карты (nko или event)
+        bbox: Окно карты "min_lat,min_lon,max_lat,max_lon"
+        zoom: Уровень масштаба карты
+        db: Сессия базы данных
+
+    Returns:
+        Список кластеров; размер зависит от окна, а не от числа точек
+
+    Raises:
+        HTTPException: Если окно слишком велико для выбранного масштаба
+    """
+    min_lat, min_lon, max_lat, max_lon = parse_bbox(bbox, crosses_antimeridian=True)
+    min_x, max_y = cell_for(min_lat, min_lon, zoom)
+    max_x, min_y = cell_for(max_lat, max_lon, zoom)
+
+    if min_lon <= max_lon:
+        columns = max_x - min_x + 1
+        in_columns = and_(MapClusterInDB.cell_x >= min_x, MapClusterInDB.cell_x <= max_x)
+    else:
+        columns = (2 ** (zoom + CLUSTER_CELL_SHIFT) - min_x) + (max_x + 1)
+        in_columns = or_(MapClusterInDB.cell_x >= min_x, MapClusterInDB.cell_x <= max_x)
+
+    if columns * (max_y - min_y + 1) > MAX_VIEWPORT_CELLS:
+        raise HTTPException(status_code=400, detail="Окно карты слишком велико для выбранного масштаба")
+
+    try:
+        rows = (
+            db.query(MapClusterInDB)
+            .filter(
+                MapClusterInDB.layer == layer.value,
+                MapClusterInDB.zoom == zoom,
+                in_columns,
+                and_(MapClusterInDB.cell_y >= min_y, MapClusterInDB.cell_y <= max_y),
+                MapClusterInDB.count > 0,
+            )
+            .all()
+        )
+
+        return [
+            ClusterResponse(
+                count=cluster.count,
+                latitude=cluster.sum_lat / cluster.count,
+                longitude=cluster.sum_lon / cluster.count,
+                bbox=[cluster.min_lat, cluster.min_lon, cluster.max_lat, cluster.max_lon],
+            )
+            for cluster in rows
+        ]
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -0,0 +1,179 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import BigInteger, Computed, SmallInteger, create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB, REGCONFIG, TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql.operators import custom_op
+
+from database import Base
+import models  # noqa: F401 - регистрация таблиц в Base.metadata
+from event_feed import sync_event_feed
+from favorites import invalidate_favorite_sets
+from reference import invalidate_reference_data, load_reference_data
+
+
+# SQLite не знает JSONB и автоинкрементит только INTEGER PRIMARY KEY
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(BigInteger, "sqlite")
+@compiles(SmallInteger, "sqlite")
+def _compile_bigint_sqlite(type_, compiler, **kw):
+    return "INTEGER"
+
+
+# Полнотекстовый поиск PostgreSQL в SQLite заменен упрощенным: tsvector и
+# tsquery — строки слов в нижнем регистре, `@@` — все слова запроса есть
+# в документе, ts_rank — число вхождений слов запроса. Колонки search_vector
+# вычисляются тем же выражением, что и в PostgreSQL, через функции ниже
+@compiles(TSVECTOR, "sqlite")
+@compiles(REGCONFIG, "sqlite")
+def _compile_text_sqlite(type_, compiler, **kw):
+    return "TEXT"
+
+
+# Операторы PostgreSQL, которых нет в SQLite, вызывают функции с тем же смыслом
+SQLITE_OPERATOR_FUNCTIONS = {"@@": "ts_match", "~*": "regex_match_i"}
+
+
+@compiles(BinaryExpression, "sqlite")
+def _compile_binary_sqlite(element, compiler, **kw):
+    if isinstance(element.operator, custom_op) and element.operator.opstring in SQLITE_OPERATOR_FUNCTIONS:
+        function = SQLITE_OPERATOR_FUNCTIONS[element.operator.opstring]
+        return f"{function}({compiler.process(element.left, **kw)}, {compiler.process(element.right, **kw)})"
+    return compiler.visit_binary(element, **kw)
+
+
+def _words(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+SQLITE_TEXT_SEARCH_FUNCTIONS = {
+    "to_tsvector": (2, lambda config, text: " ".join(_words(text))),
+    "setweight": (2, lambda vector, weight: f" {vector or ''} "),
+    "websearch_to_tsquery": (2, lambda config, q: " ".join(_words(q))),
+    "ts_match": (2, lambda vector, query: all(word in _words(vector) for word in _words(query))),
+    "ts_rank": (2, lambda vector, query: float(sum(_words(vector).count(word) for word in _words(query)))),
+    "ts_headline": (4, lambda config, text, query, options: text),
+    "regex_match_i": (2, lambda text, pattern: text is not None and re.search(pattern, text, re.IGNORECASE) is not None),
+}
+
+
+def register_text_search(dbapi_connection, connection_record=None):
+    for name, (arity, function) in SQLITE_TEXT_SEARCH_FUNCTIONS.items():
+        dbapi_connection.create_function(name, arity, function, deterministic=True)
+
+
+class QueryCounter:
+    """Счетчик SQL-запросов, отправленных через движок"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+@pytest.fixture(autouse=True)
+def reference_cache():
+    """Кэши справочников и избранного живут в процессе, у каждого теста своя БД"""
+    invalidate_reference_data()
+    invalidate_favorite_sets()
+    yield
+    invalidate_reference_data()
+    invalidate_favorite_sets()
+
+
+@pytest.fixture
+def engine():
+    # Одно соединение на все потоки: TestClient выполняет эндпоинты в пуле потоков
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    event.listen(engine, "connect", register_text_search)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def query_counter(engine):
+    return QueryCounter(engine)
+
+
+@pytest.fixture
+def count_queries(query_counter):
+    """Вызов функции с подсчетом SQL-запросов: count_queries(call) -> (число запросов, результат)"""
+
+    def _count(call):
+        query_counter.reset()
+        result = call()
+        return query_counter.count, result
+
+    return _count
+
+
+@pytest.fixture
+def seed(db):
+    """Фабрика тестовых данных: город, категории, пользователь и N записей"""
+    base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def _seed(count: int):
+        city = models.CityInDB(id=1, name="Пермь")
+        user = models.UserInDB(
+            id=1, full_name="Иванов Иван", login="ivanov", hash="x", salt="y", role="admin"
+        )
+        nko_categories = [
+            models.NKOCategoryInDB(id=1, name="Помощь детям", created_at=base_time),
+            models.NKOCategoryInDB(id=2, name="Образование", created_at=base_time),
+        ]
+        event_categories = [
+            models.EventsCategoryInDB(id=1, name="Спорт", description="Спортивные мероприятия"),
+            models.EventsCategoryInDB(id=2, name="Экология", description="Экологические акции"),
+        ]
+        db.add_all([city, user, *nko_categories, *event_categories])
+
+        for i in range(1, count + 1):
+            created_at = base_time + timedelta(hours=i)
+            db.add(models.NKOInDB(
+                id=i, name=f"НКО {i}", description=f"Описание {i}", address="ул. Ленина",
+                city_id=1, coords=(58.0 + i / 1000, 56.0), created_at=created_at,
+            ))
+            db.add(models.NKOCategoriesLinkInDB(nko_id=i, category_id=1))
+            db.add(models.NKOCategoriesLinkInDB(nko_id=i, category_id=2))
+            db.add(models.EventInDB(
+                id=i, nko_id=i, name=f"Событие {i}", city_id=1, coords=(58.0, 56.0),
+                starts_at=created_at, finish_at=created_at + timedelta(hours=2),
+                created_by=1, approved_by=1, state="approved", created_at=created_at,
+            ))
+            db.add(models.EventsCategoriesLinkInDB(events_id=i, category_id=1 + i % 2))
+            db.add(models.NewsInDB(
+                id=i, title=f"Новость {i}", description=f"Текст {i}", city_id=1,
+                created_by=1, approved_by=1, created_at=created_at,
+            ))
+            db.add(models.FavoriteNKOInDB(user_id=1, nko_id=i))
+            db.add(models.FavoriteEventsInDB(user_id=1, event_id=i))
+            db.add(models.FavoriteNewsInDB(user_id=1, news_id=i))
+        db.commit()
+        # Как при старте приложения: справочники загружены заранее
+        load_reference_data(db)
+        sync_event_feed(list(range(1, count + 1)), db)
+        db.commit()
+
+    return _seed
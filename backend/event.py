@@ -1,16 +1,32 @@
-from typing import Any, Dict, List, Optional
-
-from fastapi import Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy import and_, func, or_
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request
+from pydantic import BaseModel, field_validator
+from sqlalchemy import Row, Select, and_, bindparam, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from auth import favorite_user_id
+from config import settings
+from clusters import MapLayer, add_point, event_on_map, remove_points
 from database import get_db
+from pagination import DEFAULT_PAGE_SIZE, fetch_page, keyset_statement
+from reference import ReferenceData, get_reference_data, get_reference_data_with
+from versions import bump_versions
+from geo import apply_geo
+from search import apply_search, validate_trigram_regex
+from event_feed import array_overlap, remove_from_event_feed, sync_event_feed
+from favorites import with_favorite_flag
+from event_partitions import ensure_event_partition
 from models import (
+    EventFeedInDB,
     EventInDB,
+    EventsStates,
+    FavoriteEventsInDB,
     NKOInDB,
-    CityInDB,
-    EventsCategoryInDB,
     EventsCategoriesLinkInDB,
 )
 
@@ -24,8 +40,36 @@ class EventFilterRequest(BaseModel):
     favorite: Optional[bool] = None  # Фильтр по избранным
     category: Optional[List[str]] = None
     regex: Optional[str] = None
-    time_from: Optional[str] = None  # Фильтр по времени начала (ISO format)
-    time_to: Optional[str] = None  # Фильтр по времени окончания (ISO format)
+    q: Optional[str] = None  # Полнотекстовый поиск с ранжированием
+    near: Optional[str] = None  # Центр поиска "lat,lon", результаты сортируются по расстоянию
+    radius_km: Optional[float] = None  # Радиус поиска вокруг near
+    bbox: Optional[str] = None  # Прямоугольник "min_lat,min_lon,max_lat,max_lon"
+    time_from: Optional[datetime] = None  # Фильтр по времени начала (ISO format)
+    time_to: Optional[datetime] = None  # Фильтр по времени окончания (ISO format)
+    state: Optional[str] = None  # Фильтр по состоянию; публичный GET /event передает approved
+    upcoming: bool = False  # Только незавершенные события в порядке начала
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: Optional[str] = None  # Курсор следующей страницы из предыдущего ответа
+
+    @field_validator("time_from", "time_to", mode="before")
+    @classmethod
+    def _parse_time(cls, value: Any, info) -> Optional[datetime]:
+        """
+        Разбор ISO 8601 в datetime UTC; время без часового пояса считается UTC
+
+        Колонки TIMESTAMPTZ сравниваются с datetime: asyncpg не приводит
+        строки к timestamp. Некорректная дата — ошибка 400.
+        """
+        if value is None or value == "":
+            return None
+        if not isinstance(value, datetime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"{info.field_name}: некорректная дата '{value}'")
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
 
 
 class EventCreateRequest(BaseModel):
@@ -39,7 +83,7 @@ class EventCreateRequest(BaseModel):
     picture: Optional[str] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
-    starts_at: Optional[str] = None
+    starts_at: str  # Обязательно: ключ секционирования events по месяцам
     finish_at: Optional[str] = None
     created_by: int
     state: str
@@ -68,9 +112,294 @@ class EventResponse(BaseModel):
     meta: Optional[str]
     created_at: Optional[str]
     categories: List[str]
+    snippet: Optional[str] = None  # Фрагмент с подсветкой, только при поиске по q
+    distance_km: Optional[float] = None  # Расстояние до near, только при геопоиске
+    is_favorite: Optional[bool] = None  # В избранном у пользователя jwt_token; None без токена
+
+
+class EventPage(BaseModel):
+    """Страница списка событий"""
 
+    items: List[EventResponse]
+    next_cursor: Optional[str] = None  # None, если страница последняя
 
-def fetch_events(filters: EventFilterRequest, db: Session) -> List[EventResponse]:
+
+def _fetch_event_categories(event_ids: List[int], db: Session) -> Dict[int, List[str]]:
+    """
+    Загрузка категорий для набора событий одним запросом
+
+    Args:
+        event_ids: ID событий, для которых нужны категории
+        db: Сессия базы данных
+
+    Returns:
+        Словарь {ID события: список названий категорий}
+    """
+    categories: Dict[int, List[str]] = {event_id: [] for event_id in event_ids}
+    if not event_ids:
+        return categories
+
+    # Названия категорий берутся из кэша справочников
+    names = get_reference_data(db).event_categories
+    rows = (
+        db.query(EventsCategoriesLinkInDB.events_id, EventsCategoriesLinkInDB.category_id)
+        .filter(EventsCategoriesLinkInDB.events_id.in_(event_ids))
+        .all()
+    )
+    for event_id, category_id in rows:
+        categories[event_id].append(names.get(category_id))
+
+    return categories
+
+
+def _build_event_response(
+    event: EventInDB,
+    nko_name: Optional[str],
+    city_name: Optional[str],
+    categories: List[str],
+    snippet: Optional[str] = None,
+    distance_km: Optional[float] = None,
+    is_favorite: Optional[bool] = None,
+) -> EventResponse:
+    """Формирование ответа из ORM-объекта события без обращений к БД"""
+    # Извлечение координат из POINT
+    if event.coords and isinstance(event.coords, (tuple, list)) and len(event.coords) == 2:
+        latitude, longitude = float(event.coords[0]), float(event.coords[1])
+    else:
+        latitude, longitude = None, None
+
+    return EventResponse(
+        id=event.id,
+        nko_id=event.nko_id,
+        nko_name=nko_name,
+        name=event.name,
+        description=event.description,
+        address=event.address,
+        city=city_name,
+        picture=event.picture,
+        latitude=latitude,
+        longitude=longitude,
+        starts_at=event.starts_at.isoformat() if event.starts_at else None,
+        finish_at=event.finish_at.isoformat() if event.finish_at else None,
+        created_by=event.created_by,
+        approved_by=event.approved_by,
+        state=event.state.value if hasattr(event.state, 'value') else str(event.state),
+        meta=event.meta,
+        created_at=event.created_at.isoformat() if event.created_at else None,
+        categories=categories,
+        snippet=snippet,
+        distance_km=distance_km,
+        is_favorite=is_favorite,
+    )
+
+
+# Колонки строк списка из денормализованной ленты event_feed под именами полей ответа
+EVENT_LIST_COLUMNS = (
+    EventFeedInDB.id, EventFeedInDB.nko_id, EventFeedInDB.nko_name, EventFeedInDB.name,
+    EventFeedInDB.description, EventFeedInDB.address, EventFeedInDB.city_name.label("city"),
+    EventFeedInDB.picture, EventFeedInDB.coords, EventFeedInDB.starts_at, EventFeedInDB.finish_at,
+    EventFeedInDB.created_by, EventFeedInDB.approved_by, EventFeedInDB.state, EventFeedInDB.meta,
+    EventFeedInDB.created_at, EventFeedInDB.categories,
+)
+
+
+def _event_list_items(rows: List[Row]) -> List[Dict[str, Any]]:
+    """Элементы страницы событий из строк выборки EVENT_LIST_COLUMNS, см. _nko_list_items"""
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        coords = item.pop("coords")
+        item["latitude"], item["longitude"] = (float(coords[0]), float(coords[1])) if coords else (None, None)
+        item["state"] = item["state"].value if hasattr(item["state"], "value") else str(item["state"])
+        for name in ("starts_at", "finish_at", "created_at"):
+            item[name] = item[name].isoformat() if item[name] else None
+        items.append(item)
+    return items
+
+
+# Колонки сортировки публичной ленты предстоящих событий
+UPCOMING_ORDER_COLUMNS = (EventFeedInDB.starts_at, EventFeedInDB.id)
+
+
+def _event_list_statement(
+    city: bool, nko: bool, category: bool, regex: bool, time_from: bool, time_to: bool, favorite: bool,
+    state: bool = False, viewer: bool = False, upcoming: bool = False,
+) -> Select:
+    """
+    Запрос списка событий с фильтрами на именованных параметрах
+
+    Читает только ленту event_feed, где названия НКО, города и категорий уже
+    лежат в строке. Структура запроса зависит только от набора фильтров,
+    значения подставляются при выполнении: city_id, nko_ids, category_ids,
+    regex, time_from, time_to, user_id, state, viewer_id, upcoming_now,
+    ongoing_since. При viewer в строки добавляется флаг is_favorite.
+    """
+    statement = select(*EVENT_LIST_COLUMNS)
+
+    # Состояние подставляется в текст запроса при выполнении (literal_execute):
+    # с константой state = 'approved' планировщик может взять частичный индекс
+    # и в подготовленных выражениях asyncpg
+    if state:
+        statement = statement.where(
+            EventFeedInDB.state == bindparam("state", type_=EventFeedInDB.state.type, literal_execute=True)
+        )
+
+    # Незавершенные события: идущие сейчас и будущие. Нижняя граница starts_at
+    # задает диапазон сканирования индекса и отсекает старые секции
+    if upcoming:
+        statement = statement.where(
+            EventFeedInDB.starts_at >= bindparam("ongoing_since", type_=EventFeedInDB.starts_at.type),
+            func.coalesce(EventFeedInDB.finish_at, EventFeedInDB.starts_at)
+            >= bindparam("upcoming_now", type_=EventFeedInDB.starts_at.type),
+        )
+
+    if city:
+        statement = statement.where(EventFeedInDB.city_id == bindparam("city_id"))
+
+    # Фильтр по НКО (можно несколько)
+    if nko:
+        statement = statement.where(EventFeedInDB.nko_id.in_(bindparam("nko_ids", expanding=True)))
+
+    # Фильтр по категориям: пересечение массивов, обслуживается GIN-индексом
+    if category:
+        statement = statement.where(
+            array_overlap(EventFeedInDB.category_ids, bindparam("category_ids", type_=EventFeedInDB.category_ids.type))
+        )
+
+    # Фильтр по regex (поиск в имени и описании, обслуживается триграммными индексами)
+    if regex:
+        statement = statement.where(
+            or_(
+                EventFeedInDB.name.op("~*")(bindparam("regex")),
+                EventFeedInDB.description.op("~*")(bindparam("regex"))
+            )
+        )
+
+    # Фильтр по временному диапазону
+    if time_from:
+        statement = statement.where(EventFeedInDB.starts_at >= bindparam("time_from"))
+    if time_to:
+        # finish_at >= starts_at (ограничение в БД), поэтому условие по starts_at ничего
+        # не меняет в выборке, но дает планировщику отсечь секции по ключу секционирования
+        statement = statement.where(
+            EventFeedInDB.finish_at <= bindparam("time_to"),
+            EventFeedInDB.starts_at <= bindparam("time_to"),
+        )
+
+    # Фильтр по избранным
+    if favorite:
+        statement = (
+            statement.join(FavoriteEventsInDB, EventFeedInDB.id == FavoriteEventsInDB.event_id)
+            .where(FavoriteEventsInDB.user_id == bindparam("user_id"))
+        )
+
+    # Отметка избранного пользователя, запросившего список
+    if viewer:
+        statement = with_favorite_flag(statement, FavoriteEventsInDB, EventFeedInDB.id, "event_id", favorite)
+
+    return statement
+
+
+def _event_filter_params(filters: EventFilterRequest, reference: ReferenceData) -> Dict[str, Any]:
+    """
+    Значения фильтров списка событий для параметров запроса _event_list_statement
+
+    Неизвестное состояние события — ошибка 400.
+    """
+    params: Dict[str, Any] = {}
+    if filters.city:
+        params["city_id"] = reference.city_ids.get(filters.city)
+    if filters.nko_id and len(filters.nko_id) > 0:
+        params["nko_ids"] = filters.nko_id
+    if filters.category and len(filters.category) > 0:
+        params["category_ids"] = [
+            reference.event_category_ids[name]
+            for name in filters.category
+            if name in reference.event_category_ids
+        ]
+    if filters.regex:
+        params["regex"] = validate_trigram_regex(filters.regex)
+    if filters.time_from:
+        params["time_from"] = filters.time_from
+    if filters.time_to:
+        params["time_to"] = filters.time_to
+    if filters.jwt_token:
+        user_id = favorite_user_id(filters.jwt_token)
+        if user_id:
+            params["viewer_id"] = user_id
+            if filters.favorite:
+                params["user_id"] = user_id
+    if filters.state:
+        if filters.state not in EventsStates.__members__:
+            raise HTTPException(status_code=400, detail=f"Неизвестное состояние события '{filters.state}'")
+        params["state"] = EventsStates[filters.state]
+    if filters.upcoming:
+        now = datetime.now(timezone.utc)
+        params["upcoming_now"] = now
+        params["ongoing_since"] = now - timedelta(days=settings.event_feed_ongoing_days)
+    return params
+
+
+def _event_filter_shape(params: Dict[str, Any]) -> Tuple[bool, ...]:
+    """Набор заданных фильтров — аргументы _event_list_statement (кроме upcoming)"""
+    return tuple(
+        name in params
+        for name in (
+            "city_id", "nko_ids", "category_ids", "regex", "time_from", "time_to", "user_id", "state", "viewer_id"
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def _event_page_statement(
+    city: bool, nko: bool, category: bool, regex: bool, time_from: bool, time_to: bool, favorite: bool,
+    state: bool, viewer: bool, with_cursor: bool,
+) -> Select:
+    """
+    Запрос страницы событий в порядке создания для набора фильтров
+
+    Строится один раз на комбинацию фильтров (не больше 1024), см. _nko_page_statement.
+    """
+    return keyset_statement(
+        _event_list_statement(city, nko, category, regex, time_from, time_to, favorite, state, viewer),
+        (EventFeedInDB.created_at, EventFeedInDB.id),
+        with_cursor,
+    )
+
+
+@lru_cache(maxsize=None)
+def _event_upcoming_page_statement(
+    city: bool, nko: bool, category: bool, regex: bool, time_from: bool, time_to: bool, favorite: bool,
+    state: bool, viewer: bool, with_cursor: bool,
+) -> Select:
+    """
+    Запрос страницы предстоящих событий в порядке начала
+
+    Страница выбирается в два шага. Подзапрос отбирает ключи (starts_at, id)
+    только по колонкам частичного индекса event_feed_approved_upcoming_idx,
+    поэтому для публичной ленты (state = 'approved') это index-only scan по
+    диапазону starts_at. Полные строки и флаг is_favorite читаются затем лишь
+    для событий страницы.
+    """
+    page = keyset_statement(
+        _event_list_statement(city, nko, category, regex, time_from, time_to, favorite, state, upcoming=True)
+        .with_only_columns(*UPCOMING_ORDER_COLUMNS),
+        UPCOMING_ORDER_COLUMNS,
+        with_cursor,
+        descending=False,
+    ).subquery("page")
+    statement = select(*EVENT_LIST_COLUMNS).join(
+        page, and_(EventFeedInDB.id == page.c.id, EventFeedInDB.starts_at == page.c.starts_at)
+    )
+    if viewer:
+        statement = with_favorite_flag(statement, FavoriteEventsInDB, EventFeedInDB.id, "event_id", favorite)
+    return statement.order_by(*UPCOMING_ORDER_COLUMNS)
+
+
+def fetch_events(filters: EventFilterRequest, db: Session) -> EventPage:
     """
     Получение списка событий с фильтрацией
 
@@ -79,123 +408,81 @@ def fetch_events(filters: EventFilterRequest, db: Session) -> List[EventResponse
         db: Сессия базы данных
 
     Returns:
-        Список событий с их категориями
+        Страница событий с их категориями и курсором следующей страницы
     """
     
     try:
-        print(f"DEBUG: fetch_events called with filters: {filters}")
-        print(f"DEBUG: filters.city = {filters.city}")
+        reference = get_reference_data(db)
         
-        # Базовый запрос с JOIN к НКО и городам
-        query = (
-            db.query(EventInDB, NKOInDB.name.label("nko_name"), CityInDB.name.label("city_name"))
-            .join(NKOInDB, EventInDB.nko_id == NKOInDB.id)
-            .join(CityInDB, EventInDB.city_id == CityInDB.id)
-        )
+        params = _event_filter_params(filters, reference)
+        shape = _event_filter_shape(params)
         
-        # Фильтр по городу - ЭТОТ КОД ОТСУТСТВУЕТ!
-        if filters.city:
-            print(f"DEBUG: Applying city filter: {filters.city}")
-            query = query.filter(CityInDB.name == filters.city)
+        if filters.q or filters.near or filters.bbox or filters.radius_km is not None:
+            # Поиск и геофильтры добавляют колонки и меняют сортировку: такой запрос собирается заново
+            statement = _event_list_statement(*shape, upcoming=filters.upcoming)
+            
+            rank = None
+            if filters.q:
+                statement, rank = apply_search(statement, EventFeedInDB.search_vector, EventFeedInDB.description, filters.q)
+            
+            statement, distance = apply_geo(statement, EventFeedInDB.coords, filters.near, filters.radius_km, filters.bbox)
+            
+            # Сортировка: по расстоянию, по релевантности или по дате создания
+            descending = True
+            if distance is not None:
+                order_columns = (distance, EventFeedInDB.id)
+                key = lambda row: (row.distance_km, row.id)
+                descending = False
+            elif rank is not None:
+                order_columns = (rank, EventFeedInDB.id)
+                key = lambda row: (row.rank, row.id)
+            else:
+                order_columns = (EventFeedInDB.created_at, EventFeedInDB.id)
+                key = lambda row: (row.created_at, row.id)
+            statement = keyset_statement(statement, order_columns, bool(filters.cursor), descending)
+        elif filters.upcoming:
+            # Лента предстоящих событий: по времени начала, ключи страницы из частичного индекса
+            statement = _event_upcoming_page_statement(*shape, bool(filters.cursor))
+            order_columns = UPCOMING_ORDER_COLUMNS
+            key = lambda row: (row.starts_at, row.id)
         else:
-            print("DEBUG: No city filter applied")
-        
-        # Фильтр по НКО (можно несколько)
-        if filters.nko_id and len(filters.nko_id) > 0:
-            query = query.filter(EventInDB.nko_id.in_(filters.nko_id))
-        
-        # Фильтр по категориям
-        if filters.category and len(filters.category) > 0:
-            # Подзапрос для фильтрации по категориям
-            subquery = (
-                db.query(EventsCategoriesLinkInDB.events_id)
-                .join(EventsCategoryInDB, EventsCategoriesLinkInDB.category_id == EventsCategoryInDB.id)
-                .filter(EventsCategoryInDB.name.in_(filters.category))
-            )
-            query = query.filter(EventInDB.id.in_(subquery))
-        
-        # Фильтр по regex (поиск в имени и описании)
-        if filters.regex:
-            query = query.filter(
-                or_(
-                    EventInDB.name.op("~*")(filters.regex),
-                    EventInDB.description.op("~*")(filters.regex)
-                )
-            )
+            # Обычный список: готовый запрос для этой комбинации фильтров
+            statement = _event_page_statement(*shape, bool(filters.cursor))
+            order_columns = (EventFeedInDB.created_at, EventFeedInDB.id)
+            key = lambda row: (row.created_at, row.id)
         
-        # Фильтр по временному диапазону
-        if filters.time_from:
-            query = query.filter(EventInDB.starts_at >= filters.time_from)
-        
-        if filters.time_to:
-            query = query.filter(EventInDB.finish_at <= filters.time_to)
-        
-        # Фильтр по избранным
-        if filters.favorite and filters.jwt_token:
-            from models import FavoriteEventsInDB
-            from auth import jwt_decode
-            try:
-                payload = jwt_decode(filters.jwt_token)
-                user_id = payload.get("id")
-                if user_id:
-                    query = query.join(FavoriteEventsInDB, EventInDB.id == FavoriteEventsInDB.event_id)
-                    query = query.filter(FavoriteEventsInDB.user_id == user_id)
-            except Exception:
-                # Если токен невалидный, просто игнорируем фильтр
-                pass
-        
-        # Сортировка по дате создания
-        query = query.order_by(EventInDB.created_at.desc())
-        
-        # Выполнение запроса
-        rows = query.all()
+        # Выборка одной страницы
+        rows, next_cursor = fetch_page(db, statement, params, order_columns, filters.cursor, filters.limit, key)
         
-        # Получение категорий для каждого события
-        event_list = []
-        for event, nko_name, city_name in rows:
-            # Запрос категорий для текущего события
-            categories = (
-                db.query(EventsCategoryInDB.name)
-                .join(EventsCategoriesLinkInDB, EventsCategoryInDB.id == EventsCategoriesLinkInDB.category_id)
-                .filter(EventsCategoriesLinkInDB.events_id == event.id)
-                .all()
-            )
-            categories = [cat[0] for cat in categories]
-            
-            # Извлечение координат из POINT
-            if event.coords and isinstance(event.coords, (tuple, list)) and len(event.coords) == 2:
-                latitude, longitude = float(event.coords[0]), float(event.coords[1])
-            else:
-                latitude, longitude = None, None
-            
-            event_data = EventResponse(
-                id=event.id,
-                nko_id=event.nko_id,
-                nko_name=nko_name,
-                name=event.name,
-                description=event.description,
-                address=event.address,
-                city=city_name,
-                picture=event.picture,
-                latitude=latitude,
-                longitude=longitude,
-                starts_at=event.starts_at.isoformat() if event.starts_at else None,
-                finish_at=event.finish_at.isoformat() if event.finish_at else None,
-                created_by=event.created_by,
-                approved_by=event.approved_by,
-                state=event.state.value if hasattr(event.state, 'value') else str(event.state),
-                meta=event.meta,
-                created_at=event.created_at.isoformat() if event.created_at else None,
-                categories=categories,
-            )
-            event_list.append(event_data)
+        # Названия НКО, города и категорий уже лежат в строках ленты
+        event_list = _event_list_items(rows)
         
-        return event_list
+        return EventPage(items=event_list, next_cursor=next_cursor)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+# Лента upcoming меняется и без записи в таблицы: события выпадают из нее,
+# когда завершаются. Ее ETag меняется не реже, чем раз в столько секунд
+# (столько же ответ GET /event живет в кэше ответов)
+UPCOMING_ETAG_SECONDS = 30
+
+
+def upcoming_time_bucket(request: Request) -> Optional[int]:
+    """
+    Номер интервала времени для ETag ленты upcoming (conditional_get)
+
+    Returns:
+        Номер текущего интервала длиной UPCOMING_ETAG_SECONDS; None, если upcoming не задан
+    """
+    if request.query_params.get("upcoming", "").lower() not in ("1", "on", "t", "true", "y", "yes"):
+        return None
+    return int(time.time() // UPCOMING_ETAG_SECONDS)
+
+
 def fetch_event_by_id(event_id: int, db: Session) -> EventResponse:
     """
     Получение конкретного события по ID
@@ -212,11 +499,10 @@ def fetch_event_by_id(event_id: int, db: Session) -> EventResponse:
     """
     
     try:
-        # Запрос события с JOIN к НКО и городам
+        # Запрос события с JOIN к НКО
         result = (
-            db.query(EventInDB, NKOInDB.name.label("nko_name"), CityInDB.name.label("city_name"))
+            db.query(EventInDB, NKOInDB.name.label("nko_name"))
             .join(NKOInDB, EventInDB.nko_id == NKOInDB.id)
-            .join(CityInDB, EventInDB.city_id == CityInDB.id)
             .filter(EventInDB.id == event_id)
             .first()
         )
@@ -224,43 +510,11 @@ def fetch_event_by_id(event_id: int, db: Session) -> EventResponse:
         if not result:
             raise HTTPException(status_code=404, detail=f"Событие с ID {event_id} не найдено")
         
-        event, nko_name, city_name = result
+        event, nko_name = result
+        city_name = get_reference_data(db).cities.get(event.city_id)
         
-        # Запрос категорий для события
-        categories = (
-            db.query(EventsCategoryInDB.name)
-            .join(EventsCategoriesLinkInDB, EventsCategoryInDB.id == EventsCategoriesLinkInDB.category_id)
-            .filter(EventsCategoriesLinkInDB.events_id == event.id)
-            .all()
-        )
-        categories = [cat[0] for cat in categories]
-        
-        # Извлечение координат из POINT
-        if event.coords and isinstance(event.coords, (tuple, list)) and len(event.coords) == 2:
-            latitude, longitude = float(event.coords[0]), float(event.coords[1])
-        else:
-            latitude, longitude = None, None
-        
-        event_data = EventResponse(
-            id=event.id,
-            nko_id=event.nko_id,
-            nko_name=nko_name,
-            name=event.name,
-            description=event.description,
-            address=event.address,
-            city=city_name,
-            picture=event.picture,
-            latitude=latitude,
-            longitude=longitude,
-            starts_at=event.starts_at.isoformat() if event.starts_at else None,
-            finish_at=event.finish_at.isoformat() if event.finish_at else None,
-            created_by=event.created_by,
-            approved_by=event.approved_by,
-            state=event.state.value if hasattr(event.state, 'value') else str(event.state),
-            meta=event.meta,
-            created_at=event.created_at.isoformat() if event.created_at else None,
-            categories=categories,
-        )
+        categories = _fetch_event_categories([event.id], db)
+        event_data = _build_event_response(event, nko_name, city_name, categories[event.id])
         
         return event_data
     
@@ -270,6 +524,45 @@ def fetch_event_by_id(event_id: int, db: Session) -> EventResponse:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+async def fetch_events_async(filters: EventFilterRequest, db: AsyncSession) -> EventPage:
+    """
+    Асинхронный вариант fetch_events для AsyncSession
+
+    Запрос строится тем же кодом, что и в синхронном варианте, и выполняется
+    через asyncpg без занятия потока из пула.
+    """
+    return await db.run_sync(lambda session: fetch_events(filters, session))
+
+
+async def fetch_event_by_id_async(event_id: int, db: AsyncSession) -> EventResponse:
+    """Асинхронный вариант fetch_event_by_id для AsyncSession"""
+    return await db.run_sync(lambda session: fetch_event_by_id(event_id, session))
+
+
+def event_duration_error(starts_at: datetime, finish_at: Optional[datetime]) -> Optional[str]:
+    """
+    Проверка длительности события
+
+    Лента upcoming ищет идущие события только среди начавшихся не раньше
+    EVENT_FEED_ONGOING_DAYS дней назад, поэтому более длинное событие
+    пропало бы из нее, не закончившись. Такие события не принимаются
+    ни при создании, ни при загрузке (bulk_import). Время без часового
+    пояса считается UTC.
+
+    Returns:
+        Текст ошибки; None, если длительность допустима
+    """
+    if finish_at is None:
+        return None
+    if (starts_at.tzinfo is None) != (finish_at.tzinfo is None):
+        starts_at, finish_at = (
+            value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value for value in (starts_at, finish_at)
+        )
+    if finish_at - starts_at > timedelta(days=settings.event_feed_ongoing_days):
+        return f"Событие не может длиться дольше {settings.event_feed_ongoing_days} дн."
+    return None
+
+
 def create_event(event_data: EventCreateRequest, db: Session) -> EventResponse:
     """
     Создание нового события
@@ -282,40 +575,58 @@ def create_event(event_data: EventCreateRequest, db: Session) -> EventResponse:
         Созданное событие с категориями
 
     Raises:
-        HTTPException: Если НКО не найдено, категории не найдены или произошла ошибка БД
+        HTTPException: Если даты некорректны, НКО не найдено, категории не найдены или произошла ошибка БД
     """
     
     try:
+        try:
+            starts_at = datetime.fromisoformat(event_data.starts_at)
+            finish_at = datetime.fromisoformat(event_data.finish_at) if event_data.finish_at else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некорректная дата начала или окончания события")
+        duration_error = event_duration_error(starts_at, finish_at)
+        if duration_error:
+            raise HTTPException(status_code=400, detail=duration_error)
+
         # Проверяем существование НКО
         nko = db.query(NKOInDB).filter(NKOInDB.id == event_data.nko_id).first()
         if not nko:
             raise HTTPException(status_code=404, detail=f"НКО с ID {event_data.nko_id} не найдено")
             
+        # Город или категории, созданные через другой воркер, ищутся в БД
+        reference = get_reference_data_with(db, lambda reference: (
+            event_data.city in reference.city_ids
+            and all(name in reference.event_category_ids for name in event_data.categories)
+        ))
+        
         # Проверяем существование города
-        city = db.query(CityInDB).filter(CityInDB.name == event_data.city).first()
-        if not city:
+        city_id = reference.city_ids.get(event_data.city)
+        if city_id is None:
             raise HTTPException(status_code=404, detail=f"Город '{event_data.city}' не найден")
         
         # Проверяем существование всех категорий
-        categories = []
+        category_ids = []
         for category_name in event_data.categories:
-            category = db.query(EventsCategoryInDB).filter(EventsCategoryInDB.name == category_name).first()
-            if not category:
+            category_id = reference.event_category_ids.get(category_name)
+            if category_id is None:
                 raise HTTPException(status_code=404, detail=f"Категория '{category_name}' не найдена")
-            categories.append(category)
+            category_ids.append(category_id)
         
         # Создаем координаты если они указаны
         coords = None
         if event_data.latitude is not None and event_data.longitude is not None:
             coords = (event_data.latitude, event_data.longitude)
         
+        # Секция за месяц события создается заранее, если ее еще нет
+        ensure_event_partition(event_data.starts_at, db)
+        
         # Создаем событие
         new_event = EventInDB(
             nko_id=event_data.nko_id,
             name=event_data.name,
             description=event_data.description,
             address=event_data.address,
-            city_id=city.id,
+            city_id=city_id,
             picture=event_data.picture,
             coords=coords,
             starts_at=event_data.starts_at,
@@ -329,13 +640,21 @@ def create_event(event_data: EventCreateRequest, db: Session) -> EventResponse:
         db.flush()  # Получаем ID без коммита
         
         # Добавляем связи с категориями
-        for category in categories:
+        for category_id in category_ids:
             link = EventsCategoriesLinkInDB(
                 events_id=new_event.id,
-                category_id=category.id
+                category_id=category_id
             )
             db.add(link)
         
+        # Учитываем точку в кластерах карты в той же транзакции (только одобренные события)
+        if coords and event_on_map(new_event.state):
+            add_point(MapLayer.event, *coords, db)
+        
+        # Строка ленты событий появляется вместе с событием
+        sync_event_feed([new_event.id], db)
+        
+        bump_versions(db, "events")
         db.commit()
         db.refresh(new_event)
         
@@ -396,8 +715,15 @@ def delete_event(event_id: int, db: Session) -> dict:
         # Удаляем связи с категориями
         db.query(EventsCategoriesLinkInDB).filter(EventsCategoriesLinkInDB.events_id == event_id).delete()
         
+        # Убираем событие из кластеров карты
+        if event.coords and event_on_map(event.state):
+            remove_points(MapLayer.event, [event.coords], db)
+        
+        remove_from_event_feed(db, event_id=event_id)
+        
         # Удаляем само событие
         db.delete(event)
+        bump_versions(db, "events", "favorite_events")
         db.commit()
         
         return {"message": f"Событие с ID {event_id} успешно удалено"}
@@ -445,6 +771,7 @@ def add_event_to_favorites(user_id: int, event_id: int, db: Session) -> dict:
         # Добавляем в избранное
         favorite = FavoriteEventsInDB(user_id=user_id, event_id=event_id)
         db.add(favorite)
+        bump_versions(db, "favorite_events")
         db.commit()
         
         return {"message": f"Мероприятие с ID {event_id} добавлено в избранное"}
@@ -486,6 +813,7 @@ def remove_event_from_favorites(user_id: int, event_id: int, db: Session) -> dic
         
         # Удаляем из избранного
         db.delete(favorite)
+        bump_versions(db, "favorite_events")
         db.commit()
         
         return {"message": f"Мероприятие с ID {event_id} удалено из избранного"}
@@ -514,9 +842,8 @@ def get_favorite_events(user_id: int, db: Session) -> List[EventResponse]:
     try:
         # Запрос избранных мероприятий с JOIN
         query = (
-            db.query(EventInDB, NKOInDB.name.label("nko_name"), CityInDB.name.label("city_name"))
+            db.query(EventInDB, NKOInDB.name.label("nko_name"))
             .join(NKOInDB, EventInDB.nko_id == NKOInDB.id)
-            .join(CityInDB, EventInDB.city_id == CityInDB.id)
             .join(FavoriteEventsInDB, EventInDB.id == FavoriteEventsInDB.event_id)
             .filter(FavoriteEventsInDB.user_id == user_id)
             .order_by(EventInDB.created_at.desc())
@@ -524,45 +851,14 @@ def get_favorite_events(user_id: int, db: Session) -> List[EventResponse]:
         
         rows = query.all()
         
-        # Получение категорий для каждого мероприятия
-        event_list = []
-        for event, nko_name, city_name in rows:
-            # Запрос категорий для текущего мероприятия
-            categories = (
-                db.query(EventsCategoryInDB.name)
-                .join(EventsCategoriesLinkInDB, EventsCategoryInDB.id == EventsCategoriesLinkInDB.category_id)
-                .filter(EventsCategoriesLinkInDB.events_id == event.id)
-                .all()
-            )
-            categories = [cat[0] for cat in categories]
-            
-            # Извлечение координат из POINT
-            if event.coords and isinstance(event.coords, (tuple, list)) and len(event.coords) == 2:
-                latitude, longitude = float(event.coords[0]), float(event.coords[1])
-            else:
-                latitude, longitude = None, None
-            
-            event_data = EventResponse(
-                id=event.id,
-                nko_id=event.nko_id,
-                nko_name=nko_name,
-                name=event.name,
-                description=event.description,
-                address=event.address,
-                city=city_name,
-                picture=event.picture,
-                latitude=latitude,
-                longitude=longitude,
-                starts_at=event.starts_at.isoformat() if event.starts_at else None,
-                finish_at=event.finish_at.isoformat() if event.finish_at else None,
-                created_by=event.created_by,
-                approved_by=event.approved_by,
-                state=event.state.value if hasattr(event.state, 'value') else str(event.state),
-                meta=event.meta,
-                created_at=event.created_at.isoformat() if event.created_at else None,
-                categories=categories,
-            )
-            event_list.append(event_data)
+        # Категории всех событий загружаются одним запросом, города — из кэша
+        cities = get_reference_data(db).cities
+        categories = _fetch_event_categories([event.id for event, _ in rows], db)
+
+        event_list = [
+            _build_event_response(event, nko_name, cities.get(event.city_id), categories[event.id], is_favorite=True)
+            for event, nko_name in rows
+        ]
         
         return event_list
     
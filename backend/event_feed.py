@@ -0,0 +1,340 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import Boolean, Select, Text, and_, cast, delete, exists, func, or_, select, true, union
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+from starlette.concurrency import run_in_threadpool
+
+import database
+from database import dialect_insert
+from models import CityInDB, EventFeedInDB, EventInDB, EventsCategoriesLinkInDB, EventsCategoryInDB, NKOInDB
+from versions import bump_versions
+
+logger = logging.getLogger(__name__)
+
+# Запас при инкрементальной сверке: изменения, закоммиченные транзакциями,
+# начатыми до предыдущей сверки, получают updated_at раньше ее начала
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+class array_overlap(FunctionElement):
+    """
+    Пересечение массива с массивом-параметром: `column && :values`
+
+    В PostgreSQL обслуживается GIN-индексом по массиву. В SQLite (тесты)
+    массивы хранятся как JSON и сравниваются через json_each.
+    """
+
+    type = Boolean()
+    inherit_cache = True
+    name = "array_overlap"
+
+
+@compiles(array_overlap)
+def _compile_array_overlap(element, compiler, **kw):
+    column, values = list(element.clauses)
+    return f"{compiler.process(column, **kw)} && {compiler.process(values, **kw)}"
+
+
+@compiles(array_overlap, "sqlite")
+def _compile_array_overlap_sqlite(element, compiler, **kw):
+    column, values = list(element.clauses)
+    return (
+        f"EXISTS (SELECT 1 FROM json_each({compiler.process(column, **kw)}) AS item "
+        f"WHERE item.value IN (SELECT value FROM json_each({compiler.process(values, **kw)})))"
+    )
+
+
+class array_agg_or_empty(FunctionElement):
+    """
+    Значения группы одним массивом; для пустой группы — пустой массив
+
+    В PostgreSQL это array_agg, в SQLite (тесты) — JSON-список, в котором
+    там хранятся массивы. Порядок элементов задает упорядоченный подзапрос.
+    """
+
+    inherit_cache = True
+    name = "array_agg_or_empty"
+
+
+@compiles(array_agg_or_empty)
+def _compile_array_agg_or_empty(element, compiler, **kw):
+    return f"coalesce(array_agg({compiler.process(element.clauses, **kw)}), '{{}}')"
+
+
+@compiles(array_agg_or_empty, "sqlite")
+def _compile_array_agg_or_empty_sqlite(element, compiler, **kw):
+    return f"json_group_array({compiler.process(element.clauses, **kw)})"
+
+
+class EventFeedStatus(BaseModel):
+    """Расхождение ленты событий с таблицей events"""
+
+    missing: int  # События, которых нет в ленте
+    orphaned: int  # Строки ленты без события
+    outdated: int  # Строки ленты, содержимое которых отличается от исходных таблиц
+    stale: bool
+    last_refreshed_at: Optional[str]
+
+
+# Колонки ленты, которые сверяются с исходными таблицами; (id, starts_at) — ключ строки
+FEED_COLUMNS = (
+    "nko_id", "nko_name", "name", "description", "address", "city_id", "city_name", "picture", "coords",
+    "finish_at", "created_by", "approved_by", "state", "meta", "created_at", "category_ids", "categories",
+)
+
+
+def _event_categories(value):
+    """Категории события массивом, упорядоченным по ID категории"""
+    links = (
+        select(value.label("value"))
+        .select_from(EventsCategoriesLinkInDB)
+        .join(EventsCategoryInDB, EventsCategoryInDB.id == EventsCategoriesLinkInDB.category_id)
+        .where(EventsCategoriesLinkInDB.events_id == EventInDB.id)
+        .order_by(EventsCategoriesLinkInDB.category_id)
+        .correlate(EventInDB)
+        .subquery()
+    )
+    return select(array_agg_or_empty(links.c.value)).scalar_subquery()
+
+
+def _feed_source(event_ids: Optional[List[int]] = None) -> Select:
+    """
+    Строки ленты, собранные из events, nko, cities и категорий
+
+    Один и тот же запрос заполняет ленту и проверяет ее актуальность
+    в PostgreSQL и в SQLite (тесты).
+
+    Args:
+        event_ids: ID событий; None — все события
+    """
+    statement = (
+        select(
+            EventInDB.id,
+            EventInDB.nko_id,
+            NKOInDB.name.label("nko_name"),
+            EventInDB.name,
+            EventInDB.description,
+            EventInDB.address,
+            EventInDB.city_id,
+            CityInDB.name.label("city_name"),
+            EventInDB.picture,
+            EventInDB.coords,
+            EventInDB.starts_at,
+            EventInDB.finish_at,
+            EventInDB.created_by,
+            EventInDB.approved_by,
+            EventInDB.state,
+            EventInDB.meta,
+            EventInDB.created_at,
+            _event_categories(EventsCategoriesLinkInDB.category_id).label("category_ids"),
+            _event_categories(cast(EventsCategoryInDB.name, Text)).label("categories"),
+        )
+        .join(NKOInDB, NKOInDB.id == EventInDB.nko_id)
+        .outerjoin(CityInDB, CityInDB.id == EventInDB.city_id)
+    )
+    # Условие нужно и без фильтра: в SQLite INSERT ... SELECT с ON CONFLICT требует WHERE
+    return statement.where(EventInDB.id.in_(event_ids) if event_ids is not None else true())
+
+
+def _differs(feed, source):
+    """Условие "строка ленты отличается от исходной"; POINT не сравнивается, поэтому координаты сравниваются как текст"""
+    def comparable(column):
+        return cast(column, Text) if column.key == "coords" else column
+
+    return or_(*(comparable(feed[name]).is_distinct_from(comparable(source[name])) for name in FEED_COLUMNS))
+
+
+def _upsert_event_feed(db: Session, event_ids: Optional[List[int]] = None) -> int:
+    """
+    Сверка строк ленты с исходными таблицами
+
+    Вставляет недостающие строки, обновляет только изменившиеся и удаляет
+    строки удаленных событий (в PostgreSQL их удаляет и каскад по внешнему
+    ключу). Чтение ленты при этом не блокируется.
+
+    Args:
+        db: Сессия базы данных
+        event_ids: ID событий; None — вся лента
+
+    Returns:
+        Число добавленных, измененных и удаленных строк
+    """
+    feed = EventFeedInDB.__table__
+    gone = ~exists().where(EventInDB.id == feed.c.id, EventInDB.starts_at == feed.c.starts_at)
+    if event_ids is not None:
+        gone = and_(feed.c.id.in_(event_ids), gone)
+    deleted = db.execute(delete(feed).where(gone)).rowcount
+
+    source = _feed_source(event_ids)
+    statement = dialect_insert(db, EventFeedInDB).from_select(
+        [column.name for column in source.selected_columns] + ["refreshed_at"],
+        source.add_columns(func.now()),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[feed.c.id, feed.c.starts_at],
+        set_={**{name: statement.excluded[name] for name in FEED_COLUMNS}, "refreshed_at": func.now()},
+        where=_differs(feed.c, statement.excluded),
+    )
+    upserted = db.execute(statement).rowcount
+    return max(upserted, 0) + max(deleted, 0)
+
+
+def _changed_event_ids(since: datetime) -> Select:
+    """
+    ID событий, строки ленты которых могли измениться с момента since
+
+    Событие попадает в выборку, если изменилось оно само (в PostgreSQL
+    изменение категорий события также отмечает триггер в events.updated_at),
+    его НКО, город или одна из его категорий. Все условия обслуживаются
+    индексами по updated_at и внешним ключам.
+    """
+    return union(
+        select(EventInDB.id).where(EventInDB.updated_at >= since),
+        select(EventInDB.id).join(NKOInDB, NKOInDB.id == EventInDB.nko_id).where(NKOInDB.updated_at >= since),
+        select(EventInDB.id).join(CityInDB, CityInDB.id == EventInDB.city_id).where(CityInDB.updated_at >= since),
+        select(EventsCategoriesLinkInDB.events_id)
+        .join(EventsCategoryInDB, EventsCategoryInDB.id == EventsCategoriesLinkInDB.category_id)
+        .where(EventsCategoryInDB.updated_at >= since),
+    )
+
+
+def sync_event_feed(event_ids: List[int], db: Session) -> None:
+    """
+    Пересборка строк ленты для набора событий в текущей транзакции
+
+    Вызывается из create_event и при загрузке данных, поэтому лента
+    обновляется атомарно вместе с событиями. Строки всех событий набора
+    собираются одним запросом INSERT ... SELECT, что важно для массовой
+    загрузки (bulk_import).
+
+    Args:
+        event_ids: ID событий
+        db: Сессия базы данных
+    """
+    if not event_ids:
+        return
+
+    db.flush()
+    _upsert_event_feed(db, list(event_ids))
+
+
+def remove_from_event_feed(db: Session, event_id: Optional[int] = None, nko_id: Optional[int] = None) -> None:
+    """Удаление строк ленты события или всех событий НКО (в PostgreSQL их также удаляет каскад)"""
+    query = db.query(EventFeedInDB)
+    if event_id is not None:
+        query = query.filter(EventFeedInDB.id == event_id)
+    if nko_id is not None:
+        query = query.filter(EventFeedInDB.nko_id == nko_id)
+    query.delete(synchronize_session=False)
+
+
+def refresh_event_feed(db: Session, since: Optional[datetime] = None) -> Tuple[int, Optional[datetime]]:
+    """
+    Сверка ленты с исходными таблицами
+
+    Обновляются лишь изменившиеся строки, чтение ленты не блокируется,
+    как при REFRESH MATERIALIZED VIEW CONCURRENTLY. Если задан since,
+    сверяются только события, которые сами или чьи НКО, город и категории
+    изменились с этого момента (по updated_at), иначе — вся лента.
+    В PostgreSQL одновременные сверки исключает advisory-блокировка: если
+    сверку уже выполняет другой воркер, функция сразу возвращает (0, None).
+    Если лента изменилась, увеличивается версия events: сбрасываются ETag
+    и кэш ответов GET /event.
+
+    Args:
+        db: Сессия базы данных
+        since: Время начала предыдущей сверки; None — полная сверка
+
+    Returns:
+        Число добавленных, измененных и удаленных строк и время начала этой сверки
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        locked = db.execute(select(func.pg_try_advisory_xact_lock(func.hashtext("refresh_event_feed")))).scalar()
+        if not locked:
+            db.rollback()
+            return 0, None
+
+    started_at = db.execute(select(func.now())).scalar()
+    if since is None:
+        changed = _upsert_event_feed(db)
+    else:
+        event_ids = db.execute(_changed_event_ids(since)).scalars().all()
+        changed = _upsert_event_feed(db, list(event_ids)) if event_ids else 0
+    if changed:
+        bump_versions(db, "events")
+    db.commit()
+    return changed, started_at
+
+
+def event_feed_status(db: Session) -> EventFeedStatus:
+    """
+    Проверка, отстает ли лента от исходных таблиц
+
+    Считает события без строки в ленте, строки ленты без события
+    (антисоединение по первичным ключам) и строки, содержимое которых
+    разошлось с событием, НКО, городом или категориями. Сравнение идет
+    с тем же запросом, которым лента заполняется.
+    """
+    missing = db.query(func.count(EventInDB.id)).filter(
+        ~exists().where(EventFeedInDB.id == EventInDB.id)
+    ).scalar()
+    orphaned = db.query(func.count(EventFeedInDB.id)).filter(
+        ~exists().where(EventInDB.id == EventFeedInDB.id)
+    ).scalar()
+    source = _feed_source().subquery()
+    feed = EventFeedInDB.__table__
+    outdated = db.execute(
+        select(func.count())
+        .select_from(feed)
+        .join(source, and_(source.c.id == feed.c.id, source.c.starts_at == feed.c.starts_at))
+        .where(_differs(feed.c, source.c))
+    ).scalar()
+    last_refreshed_at = db.execute(select(func.max(EventFeedInDB.refreshed_at))).scalar()
+    if isinstance(last_refreshed_at, datetime):
+        last_refreshed_at = last_refreshed_at.isoformat()
+
+    return EventFeedStatus(
+        missing=missing,
+        orphaned=orphaned,
+        outdated=outdated,
+        stale=bool(missing or orphaned or outdated),
+        last_refreshed_at=last_refreshed_at,
+    )
+
+
+def _refresh_once(since: Optional[datetime]) -> Tuple[int, Optional[datetime]]:
+    db = database.SessionLocal()
+    try:
+        return refresh_event_feed(db, since)
+    finally:
+        db.close()
+
+
+async def run_event_feed_refresher(interval_seconds: float) -> None:
+    """
+    Фоновая сверка ленты событий раз в interval_seconds
+
+    Запускается при старте приложения в каждом воркере; одновременные
+    сверки исключает advisory-блокировка внутри refresh_event_feed().
+    Первая сверка выполняется сразу и целиком: она же заполняет ленту
+    после загрузки данных в новую базу. Следующие сверяют только события,
+    изменившиеся с начала предыдущей успешной сверки (с запасом
+    REFRESH_OVERLAP).
+    """
+    since = None
+    while True:
+        try:
+            changed, started_at = await run_in_threadpool(_refresh_once, since)
+            if started_at is not None:
+                since = started_at - REFRESH_OVERLAP
+            if changed:
+                logger.info(f"Event feed refreshed: {changed} rows changed")
+        except Exception as e:
+            logger.warning(f"Event feed refresh failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import database
+from config import settings
+from versions import bump_versions
+
+logger = logging.getLogger(__name__)
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def ensure_event_partition(starts_at: str, db: Session) -> None:
+    """
+    Создание секции events (и event_feed) за месяц starts_at, если ее еще нет
+
+    Вызывается перед вставкой события: секции на ближайшие месяцы создает
+    обслуживание по расписанию, а событие в далеком будущем или прошлом
+    получает свою секцию здесь. Существующая секция проверяется по каталогу,
+    без блокировок. Вне PostgreSQL ничего не делает.
+
+    Args:
+        starts_at: Время начала события (ISO format)
+        db: Сессия базы данных
+    """
+    if not _is_postgres(db):
+        return
+    db.execute(
+        text("SELECT ensure_events_partition(CAST(:starts_at AS TIMESTAMPTZ))"),
+        {"starts_at": starts_at},
+    )
+
+
+def maintain_event_partitions(db: Session) -> List[Tuple[str, str]]:
+    """
+    Обслуживание секций events по настройкам EVENTS_PARTITION_*
+
+    Создает секции на EVENTS_PARTITION_MONTHS_AHEAD месяцев вперед, а секции
+    старше EVENTS_RETENTION_MONTHS переносит в схему events_archive (или
+    удаляет при EVENTS_ARCHIVE_PARTITIONS=false). Если события ушли из
+    таблицы, увеличиваются версии events и favorite_events.
+
+    Returns:
+        Пары (действие, секция): created, archived или dropped
+    """
+    rows = db.execute(
+        text("SELECT action, partition_name FROM maintain_events_partitions(:ahead, :retain, :keep)"),
+        {
+            "ahead": settings.events_partition_months_ahead,
+            "retain": settings.events_retention_months,
+            "keep": settings.events_archive_partitions,
+        },
+    ).all()
+    changes = [(action, partition) for action, partition in rows]
+    if any(action != "created" for action, _ in changes):
+        bump_versions(db, "events", "favorite_events")
+    db.commit()
+    return changes
+
+
+def _maintain_once() -> List[Tuple[str, str]]:
+    db = database.SessionLocal()
+    try:
+        return maintain_event_partitions(db)
+    finally:
+        db.close()
+
+
+async def run_event_partition_maintenance(interval_seconds: float) -> None:
+    """
+    Обслуживание секций событий при старте и далее раз в interval_seconds
+
+    Одновременный запуск в нескольких воркерах безопасен: функция
+    maintain_events_partitions() берет advisory-блокировку.
+    """
+    while True:
+        try:
+            for action, partition in await run_in_threadpool(_maintain_once):
+                logger.info(f"Events partition {partition}: {action}")
+        except Exception as e:
+            logger.warning(f"Events partition maintenance failed: {e}")
+        await asyncio.sleep(interval_seconds)
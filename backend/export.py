@@ -0,0 +1,332 @@
+"""
+Потоковая выгрузка НКО, событий и новостей в NDJSON, CSV или Parquet
+
+Строки читаются серверным курсором (stream_results) пачками по
+EXPORT_BATCH_SIZE, каждая пачка сразу кодируется и отдается клиенту,
+поэтому память процесса не зависит от размера таблицы. Фильтры те же,
+что у списков GET /nko, GET /event и GET /news; сортировка по ID.
+
+CSV совместим с массовой загрузкой (bulk_import.py): категории через ";",
+meta — JSON. В Parquet каждая пачка записывается отдельной группой строк.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import Row, Select
+from sqlalchemy.orm import Session, sessionmaker
+
+import database
+from bulk_import import CSV_LIST_SEPARATOR
+from config import settings
+from event import (
+    EventFilterRequest,
+    _event_filter_params,
+    _event_filter_shape,
+    _event_list_items,
+    _event_list_statement,
+)
+from geo import apply_geo
+from models import EventFeedInDB, NewsInDB, NKOInDB
+from news import NewsFilterRequest, _news_filter_params, _news_filter_shape, _news_list_items, _news_list_statement
+from nko import (
+    NKOFilterRequest,
+    _fetch_nko_categories,
+    _nko_filter_params,
+    _nko_filter_shape,
+    _nko_list_items,
+    _nko_list_statement,
+)
+from reference import get_reference_data
+from search import search_condition
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportKind(str, Enum):
+    nko = "nko"
+    event = "event"
+    news = "news"
+
+
+# Поля выгрузки и их типы: int, float, str, json, time (ISO 8601), list (список строк)
+EXPORT_FIELDS: Dict[ExportKind, Tuple[Tuple[str, str], ...]] = {
+    ExportKind.nko: (
+        ("id", "int"), ("name", "str"), ("description", "str"), ("logo", "str"), ("address", "str"),
+        ("city", "str"), ("latitude", "float"), ("longitude", "float"), ("meta", "json"),
+        ("created_at", "time"), ("categories", "list"),
+    ),
+    ExportKind.event: (
+        ("id", "int"), ("nko_id", "int"), ("nko_name", "str"), ("name", "str"), ("description", "str"),
+        ("address", "str"), ("city", "str"), ("picture", "str"), ("latitude", "float"), ("longitude", "float"),
+        ("starts_at", "time"), ("finish_at", "time"), ("created_by", "int"), ("approved_by", "int"),
+        ("state", "str"), ("meta", "str"), ("created_at", "time"), ("categories", "list"),
+    ),
+    ExportKind.news: (
+        ("id", "int"), ("title", "str"), ("description", "str"), ("image", "str"), ("city", "str"),
+        ("created_by", "str"), ("approved_by", "str"), ("meta", "str"), ("created_at", "time"),
+    ),
+}
+
+
+class ExportQuery:
+    """Подготовленная выгрузка: запрос, его параметры и преобразование пачки строк в элементы"""
+
+    def __init__(
+        self,
+        kind: ExportKind,
+        statement: Select,
+        params: Dict[str, Any],
+        items: Callable[[List[Row], Session], List[Dict[str, Any]]],
+    ):
+        self.kind = kind
+        self.statement = statement
+        self.params = params
+        self.items = items
+
+    @property
+    def fields(self) -> Tuple[Tuple[str, str], ...]:
+        return EXPORT_FIELDS[self.kind]
+
+
+def export_format(format: str) -> str:
+    """
+    Проверка формата выгрузки: ndjson, csv или parquet (иначе ошибка 400)
+
+    pyarrow для Parquet импортируется только здесь и при записи, чтобы
+    отсутствие пакета не мешало остальным форматам (тогда ошибка 501).
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный формат выгрузки '{format}', ожидается {', '.join(EXPORT_MEDIA_TYPES)}",
+        )
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Выгрузка в Parquet недоступна: не установлен pyarrow")
+    return format
+
+
+def _nko_export(filters: NKOFilterRequest, db: Session) -> ExportQuery:
+    reference = get_reference_data(db)
+    params = _nko_filter_params(filters, reference)
+    params.pop("viewer_id", None)  # В выгрузке нет колонки is_favorite
+    statement = _nko_list_statement(*_nko_filter_shape(params))
+    if filters.q:
+        statement = statement.where(search_condition(NKOInDB.search_vector, filters.q))
+    statement, _ = apply_geo(statement, NKOInDB.coords, filters.near, filters.radius_km, filters.bbox)
+
+    def items(rows: List[Row], session: Session) -> List[Dict[str, Any]]:
+        categories = _fetch_nko_categories([row.id for row in rows], session)
+        return _nko_list_items(rows, reference.cities, categories)
+
+    return ExportQuery(ExportKind.nko, statement.order_by(NKOInDB.id), params, items)
+
+
+def _event_export(filters: EventFilterRequest, db: Session) -> ExportQuery:
+    params = _event_filter_params(filters, get_reference_data(db))
+    params.pop("viewer_id", None)
+    statement = _event_list_statement(*_event_filter_shape(params), upcoming=filters.upcoming)
+    if filters.q:
+        statement = statement.where(search_condition(EventFeedInDB.search_vector, filters.q))
+    statement, _ = apply_geo(statement, EventFeedInDB.coords, filters.near, filters.radius_km, filters.bbox)
+    return ExportQuery(
+        ExportKind.event, statement.order_by(EventFeedInDB.id), params, lambda rows, session: _event_list_items(rows)
+    )
+
+
+def _news_export(filters: NewsFilterRequest, db: Session) -> ExportQuery:
+    reference = get_reference_data(db)
+    params = _news_filter_params(filters, reference)
+    params.pop("viewer_id", None)
+    statement = _news_list_statement(*_news_filter_shape(params))
+    if filters.q:
+        statement = statement.where(search_condition(NewsInDB.search_vector, filters.q))
+
+    def items(rows: List[Row], session: Session) -> List[Dict[str, Any]]:
+        result = _news_list_items(rows, reference.cities)
+        for item in result:
+            item["created_at"] = item["created_at"].isoformat() if item["created_at"] else None
+        return result
+
+    return ExportQuery(ExportKind.news, statement.order_by(NewsInDB.id), params, items)
+
+
+def prepare_export(kind: ExportKind, filters: Any, db: Session) -> ExportQuery:
+    """
+    Подготовка выгрузки: проверка фильтров и построение запроса
+
+    Выполняется до начала ответа, поэтому ошибки фильтров возвращаются
+    обычным кодом 400, а не обрывают поток.
+
+    Args:
+        kind: Что выгружается: nko, event или news
+        filters: NKOFilterRequest, EventFilterRequest или NewsFilterRequest
+        db: Сессия базы данных (для справочников)
+
+    Returns:
+        Запрос выгрузки для export_chunks
+    """
+    builders = {ExportKind.nko: _nko_export, ExportKind.event: _event_export, ExportKind.news: _news_export}
+    return builders[kind](filters, db)
+
+
+def export_session_factory() -> Callable[[], Session]:
+    """
+    Фабрика сессий для выгрузки
+
+    Выгрузка — длинное чтение, поэтому при настроенных репликах
+    (DATABASE_READ_URLS) она идет в реплику. Курсор читается синхронно,
+    так что асинхронные реплики (DATABASE_ASYNC=true) не подходят,
+    и тогда используется основная БД.
+    """
+    if database.read_replicas is not None:
+        factory = database.read_replicas.choose().session_factory
+        if isinstance(factory, sessionmaker):
+            return factory
+    return database.SessionLocal
+
+
+def _export_batches(query: ExportQuery, session_factory: Callable[[], Session]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Пачки элементов выгрузки из серверного курсора
+
+    Сессия открывается на время потока (а не берется из зависимости
+    эндпоинта) и закрывается, когда генератор завершен или брошен клиентом.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(
+            query.statement,
+            query.params,
+            execution_options={"stream_results": True, "yield_per": settings.export_batch_size},
+        )
+        for rows in result.partitions():
+            yield query.items(rows, db)
+    finally:
+        db.close()
+
+
+def _csv_value(value: Any, kind: str) -> Any:
+    if value is None:
+        return ""
+    if kind == "list":
+        return CSV_LIST_SEPARATOR.join(name for name in value if name)
+    if kind == "json":
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _encode_ndjson(batches: Iterator[List[Dict[str, Any]]], fields: Sequence[Tuple[str, str]]) -> Iterator[bytes]:
+    names = [name for name, _ in fields]
+    for items in batches:
+        yield b"".join(orjson.dumps({name: item.get(name) for name in names}) + b"\n" for item in items)
+
+
+def _encode_csv(batches: Iterator[List[Dict[str, Any]]], fields: Sequence[Tuple[str, str]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in fields])
+    for items in batches:
+        writer.writerows([_csv_value(item.get(name), kind) for name, kind in fields] for item in items)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Файл для ParquetWriter, из которого записанные байты забираются по частям
+
+    Parquet пишется последовательно (метаданные — в конце файла), поэтому
+    после каждой группы строк накопленные байты отдаются клиенту.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet_column(values: List[Any], kind: str) -> List[Any]:
+    if kind == "time":
+        return [datetime.fromisoformat(value) if value else None for value in values]
+    if kind == "json":
+        return [json.dumps(value, ensure_ascii=False) if value is not None else None for value in values]
+    return values
+
+
+def _encode_parquet(batches: Iterator[List[Dict[str, Any]]], fields: Sequence[Tuple[str, str]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "str": pa.string(),
+        "json": pa.string(),
+        "time": pa.timestamp("us", tz="UTC"),
+        "list": pa.list_(pa.string()),
+    }
+    schema = pa.schema([(name, types[kind]) for name, kind in fields])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for items in batches:
+            columns = [_parquet_column([item.get(name) for item in items], kind) for name, kind in fields]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_chunks(
+    query: ExportQuery, format: str, session_factory: Optional[Callable[[], Session]] = None
+) -> Iterator[bytes]:
+    """
+    Тело ответа выгрузки: байты NDJSON, CSV или Parquet по одной пачке строк
+
+    Args:
+        query: Выгрузка из prepare_export
+        format: ndjson, csv или parquet
+        session_factory: Фабрика сессий (по умолчанию export_session_factory())
+
+    Returns:
+        Генератор частей тела для StreamingResponse
+    """
+    batches = _export_batches(query, session_factory or export_session_factory())
+    encoders = {"ndjson": _encode_ndjson, "csv": _encode_csv, "parquet": _encode_parquet}
+    return encoders[format](batches, query.fields)
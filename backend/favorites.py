@@ -0,0 +1,263 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import Select, and_, bindparam, delete, literal, select, union_all
+from sqlalchemy.orm import Session, aliased
+
+from config import settings
+from database import dialect_insert
+from models import EventInDB, FavoriteEventsInDB, FavoriteNewsInDB, FavoriteNKOInDB, NewsInDB, NKOInDB
+from versions import bump_versions, get_versions
+
+# Виды избранного: таблица избранного, ее колонка ID записи, ID записи и имя таблицы для версий
+FAVORITE_TABLES = {
+    "nko": (FavoriteNKOInDB, FavoriteNKOInDB.nko_id, NKOInDB.id, "favorite_nko"),
+    "event": (FavoriteEventsInDB, FavoriteEventsInDB.event_id, EventInDB.id, "favorite_events"),
+    "news": (FavoriteNewsInDB, FavoriteNewsInDB.news_id, NewsInDB.id, "favorite_news"),
+}
+
+# Не больше ID одного вида в одном запросе
+MAX_FAVORITE_IDS = 1000
+
+
+class FavoriteIds(BaseModel):
+    """ID записей по видам избранного"""
+
+    nko: List[int] = Field(default_factory=list, max_length=MAX_FAVORITE_IDS)
+    event: List[int] = Field(default_factory=list, max_length=MAX_FAVORITE_IDS)
+    news: List[int] = Field(default_factory=list, max_length=MAX_FAVORITE_IDS)
+
+
+class FavoritesMembership(BaseModel):
+    """Флаги «в избранном» в порядке переданных ID"""
+
+    nko: List[bool]
+    event: List[bool]
+    news: List[bool]
+
+
+class FavoritesChange(BaseModel):
+    """Итог пакетного изменения избранного"""
+
+    changed: FavoriteIds  # Добавленные (удаленные) ID
+    skipped: FavoriteIds  # Уже были в избранном (не были), а при добавлении — и несуществующие записи
+
+
+def with_favorite_flag(statement: Select, favorite_model, id_column, entity_column, favorite_filter: bool = False) -> Select:
+    """
+    Колонка is_favorite в запросе списка: в избранном ли строка у пользователя :viewer_id
+
+    Флаг вычисляется в том же запросе через LEFT JOIN с таблицей избранного
+    по ее первичному ключу (user_id, <entity>_id), поэтому отдельный запрос
+    списка избранного для отметок на карточках не нужен. Если список уже
+    отфильтрован по избранному (INNER JOIN), флаг всегда истинен и
+    соединение не добавляется.
+
+    Args:
+        statement: Запрос списка
+        favorite_model: Модель таблицы избранного (FavoriteNKOInDB, ...)
+        id_column: Колонка ID записи в запросе (NKOInDB.id, ...)
+        entity_column: Имя колонки ID записи в таблице избранного (nko_id, ...)
+        favorite_filter: Запрос уже отфильтрован по избранному пользователя
+
+    Returns:
+        Запрос с дополнительной колонкой is_favorite
+    """
+    if favorite_filter:
+        return statement.add_columns(literal(True).label("is_favorite"))
+
+    viewer_favorite = aliased(favorite_model, name="viewer_favorite")
+    return statement.outerjoin(
+        viewer_favorite,
+        and_(
+            getattr(viewer_favorite, entity_column) == id_column,
+            viewer_favorite.user_id == bindparam("viewer_id"),
+        ),
+    ).add_columns(viewer_favorite.user_id.is_not(None).label("is_favorite"))
+
+
+class FavoriteSets:
+    """Снимок избранного пользователя: множества ID по видам и версии таблиц избранного на момент загрузки"""
+
+    def __init__(self, sets: Dict[str, Set[int]], versions: Dict[str, int]):
+        self.sets = sets
+        self.versions = versions
+
+
+# Таблицы избранного в table_versions: по их счетчикам сверяется кэш
+FAVORITE_VERSION_TABLES = tuple(table for _, _, _, table in FAVORITE_TABLES.values())
+
+# Кэш избранного по пользователям (LRU). Снимок действителен, пока не изменились
+# счетчики favorite_*: их увеличивает любая запись в избранное, в том числе из других воркеров
+_favorite_sets: "OrderedDict[int, FavoriteSets]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def load_favorite_sets(user_id: int, db: Session, versions: Optional[Dict[str, int]] = None) -> FavoriteSets:
+    """
+    Загрузка избранного пользователя из трех таблиц одним запросом (UNION ALL)
+
+    Версии читаются до выборки: если избранное изменится между запросами,
+    снимок окажется помечен более старыми версиями и будет перечитан.
+
+    Args:
+        user_id: ID пользователя
+        db: Сессия базы данных
+        versions: Уже прочитанные версии таблиц избранного
+
+    Returns:
+        Снимок избранного
+    """
+    if versions is None:
+        versions = get_versions(db, FAVORITE_VERSION_TABLES)
+    statement = union_all(*(
+        select(literal(kind).label("kind"), column.label("id")).where(model.user_id == user_id)
+        for kind, (model, column, _, _) in FAVORITE_TABLES.items()
+    ))
+    sets: Dict[str, Set[int]] = {kind: set() for kind in FAVORITE_TABLES}
+    for kind, entity_id in db.execute(statement):
+        sets[kind].add(entity_id)
+    return FavoriteSets(sets, versions)
+
+
+def get_favorite_sets(user_id: int, db: Session) -> FavoriteSets:
+    """
+    Избранное пользователя из кэша
+
+    Снимок сверяется со счетчиками favorite_* одним запросом к table_versions
+    по первичному ключу; если счетчики изменились, избранное перечитывается.
+
+    Args:
+        user_id: ID пользователя
+        db: Сессия базы данных
+    """
+    versions = get_versions(db, FAVORITE_VERSION_TABLES)
+    with _lock:
+        entry = _favorite_sets.get(user_id)
+        if entry is not None:
+            _favorite_sets.move_to_end(user_id)
+    if entry is not None and entry.versions == versions:
+        return entry
+
+    entry = load_favorite_sets(user_id, db, versions)
+    with _lock:
+        _favorite_sets[user_id] = entry
+        _favorite_sets.move_to_end(user_id)
+        while len(_favorite_sets) > settings.favorites_cache_max_users:
+            _favorite_sets.popitem(last=False)
+    return entry
+
+
+def invalidate_favorite_sets() -> None:
+    """Сброс кэша избранного всех пользователей"""
+    with _lock:
+        _favorite_sets.clear()
+
+
+def favorites_contains(user_id: int, ids: FavoriteIds, db: Session) -> FavoritesMembership:
+    """
+    Проверка, какие записи в избранном пользователя
+
+    Отвечает из кэша избранного: пока избранное не менялось, это один
+    запрос версий к table_versions.
+
+    Args:
+        user_id: ID пользователя
+        ids: ID записей по видам
+        db: Сессия базы данных
+
+    Returns:
+        Флаги в порядке переданных ID
+    """
+    sets = get_favorite_sets(user_id, db).sets
+    return FavoritesMembership(**{
+        kind: [entity_id in sets[kind] for entity_id in getattr(ids, kind)]
+        for kind in FAVORITE_TABLES
+    })
+
+
+def _favorite_ids(db: Session, user_id: int, kind: str, ids: Set[int]) -> Set[int]:
+    """ID из набора, которые уже в избранном пользователя"""
+    model, column, _, _ = FAVORITE_TABLES[kind]
+    return set(db.execute(select(column).where(model.user_id == user_id, column.in_(ids))).scalars())
+
+
+def _change_favorites(user_id: int, ids: FavoriteIds, db: Session, add: bool) -> FavoritesChange:
+    changed: Dict[str, List[int]] = {}
+    skipped: Dict[str, List[int]] = {}
+    tables = []
+    for kind, (model, column, entity_id, table) in FAVORITE_TABLES.items():
+        requested = set(getattr(ids, kind))
+        if not requested:
+            changed[kind], skipped[kind] = [], []
+            continue
+        present = _favorite_ids(db, user_id, kind, requested)
+        if add:
+            existing = set(db.execute(select(entity_id).where(entity_id.in_(requested))).scalars())
+            target = existing - present
+            if target:
+                db.execute(
+                    dialect_insert(db, model)
+                    .values([{"user_id": user_id, column.key: value} for value in sorted(target)])
+                    .on_conflict_do_nothing()
+                )
+        else:
+            target = present
+            if target:
+                db.execute(
+                    delete(model)
+                    .where(model.user_id == user_id, column.in_(target))
+                    .execution_options(synchronize_session=False)
+                )
+        if target:
+            tables.append(table)
+        changed[kind] = sorted(target)
+        skipped[kind] = sorted(requested - target)
+
+    if tables:
+        bump_versions(db, *tables)
+    db.commit()
+    return FavoritesChange(changed=FavoriteIds(**changed), skipped=FavoriteIds(**skipped))
+
+
+def add_favorites(user_id: int, ids: FavoriteIds, db: Session) -> FavoritesChange:
+    """
+    Пакетное добавление НКО, событий и новостей в избранное одной транзакцией
+
+    Записи, которые уже в избранном или не существуют, пропускаются.
+
+    Args:
+        user_id: ID пользователя
+        ids: ID записей по видам
+        db: Сессия базы данных
+
+    Returns:
+        Добавленные и пропущенные ID
+    """
+    try:
+        return _change_favorites(user_id, ids, db, add=True)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+def remove_favorites(user_id: int, ids: FavoriteIds, db: Session) -> FavoritesChange:
+    """
+    Пакетное удаление НКО, событий и новостей из избранного одной транзакцией
+
+    Args:
+        user_id: ID пользователя
+        ids: ID записей по видам
+        db: Сессия базы данных
+
+    Returns:
+        Удаленные ID и ID, которых не было в избранном
+    """
+    try:
+        return _change_favorites(user_id, ids, db, add=False)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
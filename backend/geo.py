@@ -0,0 +1,143 @@
+import math
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Float, func, literal, or_
+from sqlalchemy.orm import Query
+
+# Координаты хранятся в POINT как (широта, долгота)
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+MAX_RADIUS_KM = 500.0
+
+
+def _parse_floats(value: str, count: int, name: str) -> Tuple[float, ...]:
+    try:
+        numbers = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        numbers = ()
+    if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+        raise HTTPException(status_code=400, detail=f"Параметр {name} должен содержать {count} числа через запятую")
+    return numbers
+
+
+def parse_near(near: str) -> Tuple[float, float]:
+    """Разбор параметра near=lat,lon"""
+    latitude, longitude = _parse_floats(near, 2, "near")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise HTTPException(status_code=400, detail="Координаты near вне допустимого диапазона")
+    return latitude, longitude
+
+
+def parse_bbox(bbox: str, crosses_antimeridian: bool = False) -> Tuple[float, float, float, float]:
+    """
+    Разбор параметра bbox=min_lat,min_lon,max_lat,max_lon
+
+    Args:
+        bbox: Строка параметра
+        crosses_antimeridian: Разрешить min_lon > max_lon — окно, пересекающее меридиан ±180°
+    """
+    min_lat, min_lon, max_lat, max_lon = _parse_floats(bbox, 4, "bbox")
+    if min_lat > max_lat or (min_lon > max_lon and not crosses_antimeridian):
+        raise HTTPException(status_code=400, detail="В bbox минимальные координаты больше максимальных")
+    if not (-90 <= min_lat and max_lat <= 90 and -180 <= min(min_lon, max_lon) and max(min_lon, max_lon) <= 180):
+        raise HTTPException(status_code=400, detail="Координаты bbox вне допустимого диапазона")
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def radius_boxes(latitude: float, longitude: float, radius_km: float) -> List[Tuple[float, float, float, float]]:
+    """
+    Прямоугольники в градусах, покрывающие окружность радиуса radius_km
+
+    Широта ограничивается полюсами; если окружность захватывает полюс,
+    покрываются все долготы. Окружность, пересекающая антимеридиан,
+    покрывается двумя прямоугольниками по разные стороны от него.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+
+    lon_delta = radius_km / (KM_PER_DEGREE * math.cos(math.radians(max(abs(min_lat), abs(max_lat)))))
+    if lon_delta >= 180.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+    if min_lon < -180.0:
+        return [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def _point(latitude: float, longitude: float):
+    return func.point(literal(latitude, Float), literal(longitude, Float))
+
+
+def _box(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    return func.box(_point(min_lat, min_lon), _point(max_lat, max_lon))
+
+
+def haversine_km(coords_column, latitude: float, longitude: float):
+    """SQL-выражение расстояния по большому кругу от coords до точки, в километрах"""
+    lat1 = func.radians(coords_column[0], type_=Float)
+    lon1 = func.radians(coords_column[1], type_=Float)
+    lat2, lon2 = math.radians(latitude), math.radians(longitude)
+    a = (
+        func.power(func.sin((lat1 - lat2) * 0.5, type_=Float), 2, type_=Float)
+        + func.cos(lat1, type_=Float) * math.cos(lat2)
+        * func.power(func.sin((lon1 - lon2) * 0.5, type_=Float), 2, type_=Float)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a, type_=Float)), type_=Float)
+
+
+def apply_geo(
+    query: Query,
+    coords_column,
+    near: Optional[str],
+    radius_km: Optional[float],
+    bbox: Optional[str],
+) -> Tuple[Query, Optional[object]]:
+    """
+    Добавление геофильтров к запросу
+
+    bbox и радиус превращаются в условие `coords <@ box(...)`, которое
+    обслуживается GiST-индексом и отбирает кандидатов; радиус затем
+    уточняется точным расстоянием. near требует radius_km (не больше
+    MAX_RADIUS_KM): сортируются только кандидаты из индекса, а не весь
+    каталог. В запрос добавляется колонка `distance_km` (по большому кругу),
+    и по тому же выражению идет сортировка: планарное `coords <-> point`
+    в градусах на широте 58° почти вдвое завышает расстояния по долготе
+    и дает порядок, не совпадающий с показанными расстояниями.
+
+    Args:
+        query: Исходный запрос
+        coords_column: Колонка POINT сущности
+        near: Центр поиска "lat,lon"
+        radius_km: Радиус поиска в километрах (обязателен вместе с near)
+        bbox: Прямоугольник "min_lat,min_lon,max_lat,max_lon"
+
+    Returns:
+        Запрос с фильтрами и выражение расстояния для сортировки (None без near)
+    """
+    if bbox:
+        query = query.filter(coords_column.op("<@")(_box(*parse_bbox(bbox))))
+
+    if radius_km is not None and not near:
+        raise HTTPException(status_code=400, detail="Параметр radius_km требует near")
+
+    if not near:
+        return query, None
+
+    latitude, longitude = parse_near(near)
+    if radius_km is None:
+        raise HTTPException(status_code=400, detail="Параметр near требует radius_km")
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"radius_km должен быть в диапазоне (0, {MAX_RADIUS_KM:g}]")
+
+    distance = haversine_km(coords_column, latitude, longitude)
+    query = query.filter(
+        or_(*(coords_column.op("<@")(_box(*box)) for box in radius_boxes(latitude, longitude, radius_km))),
+        distance <= radius_km,
+    ).add_columns(distance.label("distance_km"))
+    return query, distance
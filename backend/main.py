@@ -1,8 +1,10 @@
+import asyncio
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from fastapi import Depends, FastAPI, status, Query
+from fastapi import Depends, FastAPI, File, Request, Response, UploadFile, status, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
@@ -10,53 +12,108 @@ from sqlalchemy.orm import Session
 from auth import (
     User, UserCreate, Token, oauth2_scheme,
     register_user, login_for_access_token,
-    get_current_user, read_users_me, refresh_access_token, RefreshTokenRequest
+    get_current_user, read_users_me, refresh_access_token, RefreshTokenRequest, require_moderator
 )
+from bulk_import import ImportKind, ImportReport, bulk_import, import_format, read_records
+from clusters import MAX_CLUSTER_ZOOM, ClusterResponse, MapLayer, fetch_clusters
 from config import settings
-from database import close_db, get_db, init_db
+import database
+from database import FetchSession, close_db, get_db, get_fetch_db, init_db, run_fetch
 from nko import (
-    NKOFilterRequest, NKOCreateRequest, NKOResponse,
-    fetch_nko, fetch_nko_by_id, create_nko, delete_nko,
+    NKOFilterRequest, NKOCreateRequest, NKOResponse, NKOPage,
+    fetch_nko, fetch_nko_by_id, fetch_nko_async, fetch_nko_by_id_async, create_nko, delete_nko,
     add_nko_to_favorites, remove_nko_from_favorites, get_favorite_nko
 )
-from city import CityCreateRequest, CityResponse, create_city, delete_city, fetch_cities, fetch_city_by_name
+from city import (
+    CityCreateRequest, CityResponse, create_city, delete_city,
+    fetch_cities, fetch_city_by_name, fetch_cities_async, fetch_city_by_name_async
+)
 from event import (
-    EventFilterRequest, EventCreateRequest, EventResponse,
-    fetch_events, fetch_event_by_id, create_event, delete_event,
-    add_event_to_favorites, remove_event_from_favorites, get_favorite_events
+    EventFilterRequest, EventCreateRequest, EventResponse, EventPage,
+    fetch_events, fetch_event_by_id, fetch_events_async, fetch_event_by_id_async, create_event, delete_event,
+    add_event_to_favorites, remove_event_from_favorites, get_favorite_events, upcoming_time_bucket
 )
 from news import (
-    NewsFilterRequest, NewsCreateRequest, NewsResponse,
-    fetch_news, fetch_news_by_id, create_news, delete_news,
+    NewsFilterRequest, NewsCreateRequest, NewsResponse, NewsPage,
+    fetch_news, fetch_news_by_id, fetch_news_async, fetch_news_by_id_async, create_news, delete_news,
     add_news_to_favorites, remove_news_from_favorites, get_favorite_news
 )
+from favorites import (
+    FavoriteIds, FavoritesChange, FavoritesMembership, add_favorites, favorites_contains, remove_favorites
+)
+from export import EXPORT_MEDIA_TYPES, ExportKind, export_chunks, export_format, prepare_export
+from event_feed import EventFeedStatus, event_feed_status, run_event_feed_refresher
+from event_partitions import run_event_partition_maintenance
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from pool_metrics import pool_status
+from reference import load_reference_data
+from replicas import ReadYourWritesMiddleware
+from response_cache import ResponseCacheMiddleware
 from s3 import router as s3_router
+from serialization import (
+    CITY_LIST, CLUSTER_LIST, EVENT_PAGE, NEWS_PAGE, NKO_PAGE, ORJSONResponse, serialized_response
+)
+from tiles import MVT_MEDIA_TYPE, build_tile, tile_etag
+from versions import conditional_get, etag_matches
+
+
+# Фоновые задачи: сверка ленты событий и обслуживание секций events
+_background_tasks: List[asyncio.Task] = []
 
 
 def lifespan_startup():
     """Инициализация при запуске приложения"""
     init_db()
 
-
-def lifespan_shutdown():
+    # Справочники загружаются заранее; если БД еще недоступна,
+    # они будут загружены при первом обращении
+    db = database.SessionLocal()
+    try:
+        load_reference_data(db)
+    except Exception:
+        pass
+    finally:
+        db.close()
+
+    if database.engine.dialect.name == "postgresql":
+        loop = asyncio.get_running_loop()
+        if settings.event_feed_refresh_seconds > 0:
+            _background_tasks.append(loop.create_task(run_event_feed_refresher(settings.event_feed_refresh_seconds)))
+        if settings.events_partition_maintenance_seconds > 0:
+            _background_tasks.append(loop.create_task(
+                run_event_partition_maintenance(settings.events_partition_maintenance_seconds)
+            ))
+
+
+async def lifespan_shutdown():
     """Очистка при остановке приложения"""
-    close_db()
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    await close_db()
 
 
 app = FastAPI(
     title="НКО Добрые дела Росатома API",
     description="Backend API для портала Добрые дела Росатома",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # События жизненного цикла
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     lifespan_startup()
 
 @app.on_event("shutdown")
-def shutdown_event():
-    lifespan_shutdown()
+async def shutdown_event():
+    await lifespan_shutdown()
+
+# Кэш ответов публичных GET-эндпоинтов (CORS добавляется поверх закэшированных ответов)
+app.add_middleware(ResponseCacheMiddleware)
+
+# Окно read-your-writes: после записи клиент какое-то время читает из основной БД
+app.add_middleware(ReadYourWritesMiddleware)
 
 # CORS настройки
 app.add_middleware(
@@ -101,14 +158,36 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 
-@app.get("/nko", response_model=List[NKOResponse])
-def get_nko(
+@app.get("/metrics/pool")
+def get_pool_metrics():
+    """
+    Метрики пулов соединений с БД
+
+    Число выданных соединений, гистограммы занятости пула, переполнения
+    (overflow) и времени ожидания соединения, число медленных ожиданий.
+    """
+    return pool_status()
+
+
+@app.get(
+    "/nko",
+    response_model=NKOPage,
+    dependencies=[Depends(conditional_get("nko", "cities", "favorite_nko"))],
+)
+async def get_nko(
+    response: Response,
     jwt_token: str = "",
     city: Optional[str] = None,
     favorite: Optional[bool] = None,
     category: Optional[List[str]] = Query(None),
     regex: Optional[str] = None,
-    db: Session = Depends(get_db)
+    q: Optional[str] = None,
+    near: Optional[str] = None,
+    radius_km: Optional[float] = None,
+    bbox: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: FetchSession = Depends(get_fetch_db)
 ):
     """
     Получение списка НКО с фильтрацией
@@ -119,31 +198,53 @@ def get_nko(
         favorite: Фильтр по избранным (опционально, требует jwt_token)
         category: Фильтр по категориям (опционально, можно передать несколько раз)
         regex: Регулярное выражение для поиска (опционально)
+        q: Полнотекстовый поиск с ранжированием по релевантности (опционально)
+        near: Центр геопоиска "lat,lon", результаты сортируются по расстоянию (опционально)
+        radius_km: Радиус поиска вокруг near в километрах, не больше 500 (обязателен вместе с near)
+        bbox: Прямоугольник "min_lat,min_lon,max_lat,max_lon" (опционально)
+        limit: Размер страницы (опционально)
+        cursor: Курсор следующей страницы из предыдущего ответа (опционально)
         db: Сессия базы данных
 
     Returns:
-        Список НКО с их категориями
+        Страница НКО с их категориями и курсором следующей страницы
     
     Example:
         GET /nko?jwt_token=&category=Помощь детям&category=Образование
         GET /nko?jwt_token=TOKEN&favorite=true
+        GET /nko?limit=20&cursor=NEXT_CURSOR
+        GET /nko?q=помощь детям
+        GET /nko?near=58.01,56.25&radius_km=5
     """
     filters = NKOFilterRequest(
         jwt_token=jwt_token,
         city=city,
         favorite=favorite,
         category=category,
-        regex=regex
+        regex=regex,
+        q=q,
+        near=near,
+        radius_km=radius_km,
+        bbox=bbox,
+        limit=limit,
+        cursor=cursor
     )
-    return fetch_nko(filters, db)
+    page = await run_fetch(db, fetch_nko, fetch_nko_async, filters)
+    return serialized_response(NKO_PAGE, page, response)
 
 
-@app.get("/city", response_model=List[CityResponse], tags=["City"])
-def get_cities(regex: Optional[str] = None, db: Session = Depends(get_db)):
+@app.get(
+    "/city",
+    response_model=List[CityResponse],
+    tags=["City"],
+    dependencies=[Depends(conditional_get("cities"))],
+)
+async def get_cities(response: Response, regex: Optional[str] = None, db: FetchSession = Depends(get_fetch_db)):
     """
     Получение списка городов с фильтрацией по regex
     """
-    return fetch_cities(regex, db)
+    cities = await run_fetch(db, fetch_cities, fetch_cities_async, regex)
+    return serialized_response(CITY_LIST, cities, response)
 
 
 @app.post("/city", response_model=CityResponse, tags=["City"])
@@ -154,12 +255,17 @@ def add_city(city_data: CityCreateRequest, db: Session = Depends(get_db)):
     return create_city(city_data, db)
 
 
-@app.get("/city/{city_name}", response_model=CityResponse, tags=["City"])
-def get_city_by_name(city_name: str, db: Session = Depends(get_db)):
+@app.get(
+    "/city/{city_name}",
+    response_model=CityResponse,
+    tags=["City"],
+    dependencies=[Depends(conditional_get("cities"))],
+)
+async def get_city_by_name(city_name: str, db: FetchSession = Depends(get_fetch_db)):
     """
     Получение города по имени
     """
-    return fetch_city_by_name(city_name, db)
+    return await run_fetch(db, fetch_city_by_name, fetch_city_by_name_async, city_name)
 
 
 @app.delete("/city/{city_id}", response_model=Dict[str, str], tags=["City"])
@@ -169,8 +275,12 @@ def remove_city(city_id: int, db: Session = Depends(get_db)):
     """
     return delete_city(city_id, db)
 
-@app.get("/nko/{nko_id}", response_model=NKOResponse)
-def get_nko_by_id(nko_id: int, db: Session = Depends(get_db)):
+@app.get(
+    "/nko/{nko_id}",
+    response_model=NKOResponse,
+    dependencies=[Depends(conditional_get("nko", "cities"))],
+)
+async def get_nko_by_id(nko_id: int, db: FetchSession = Depends(get_fetch_db)):
     """
     Получение конкретного НКО по ID
 
@@ -181,7 +291,7 @@ def get_nko_by_id(nko_id: int, db: Session = Depends(get_db)):
     Returns:
         Данные НКО с категориями
     """
-    return fetch_nko_by_id(nko_id, db)
+    return await run_fetch(db, fetch_nko_by_id, fetch_nko_by_id_async, nko_id)
 
 
 # Auth endpoints
@@ -240,20 +350,38 @@ def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     return read_users_me(current_user)
 
 
-@app.get("/event", response_model=List[EventResponse], tags=["Events"])
-def get_events(
+@app.get(
+    "/event",
+    response_model=EventPage,
+    tags=["Events"],
+    dependencies=[Depends(conditional_get(
+        "events", "nko", "cities", "favorite_events", time_bucket=upcoming_time_bucket
+    ))],
+)
+async def get_events(
+    response: Response,
     jwt_token: str = "",
     nko_id: Optional[List[int]] = Query(None),
     city: Optional[str] = None,
     favorite: Optional[bool] = None,
     category: Optional[List[str]] = Query(None),
     regex: Optional[str] = None,
+    q: Optional[str] = None,
     time_from: Optional[str] = None,
     time_to: Optional[str] = None,
-    db: Session = Depends(get_db)
+    upcoming: bool = False,
+    near: Optional[str] = None,
+    radius_km: Optional[float] = None,
+    bbox: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: FetchSession = Depends(get_fetch_db)
 ):
     """
-    Получение списка событий с фильтрацией
+    Публичный список событий с фильтрацией
+
+    Возвращает только одобренные события; все состояния видны модераторам
+    через GET /moderation/event.
 
     Args:
         jwt_token: JWT токен пользователя (может быть пустой строкой, обязателен только для favorite)
@@ -262,16 +390,27 @@ def get_events(
         favorite: Фильтр по избранным (опционально, требует jwt_token)
         category: Фильтр по категориям (опционально, можно передать несколько раз)
         regex: Регулярное выражение для поиска (опционально)
+        q: Полнотекстовый поиск с ранжированием по релевантности (опционально)
         time_from: Фильтр по времени начала события (ISO format, опционально)
         time_to: Фильтр по времени окончания события (ISO format, опционально)
+        upcoming: Только незавершенные события в порядке начала — лента портала (опционально)
+        near: Центр геопоиска "lat,lon", результаты сортируются по расстоянию (опционально)
+        radius_km: Радиус поиска вокруг near в километрах, не больше 500 (обязателен вместе с near)
+        bbox: Прямоугольник "min_lat,min_lon,max_lat,max_lon" (опционально)
+        limit: Размер страницы (опционально)
+        cursor: Курсор следующей страницы из предыдущего ответа (опционально)
         db: Сессия базы данных
 
     Returns:
-        Список событий с их категориями
+        Страница событий с их категориями и курсором следующей страницы
     
     Example:
+        GET /event?upcoming=true&city=Москва
         GET /event?jwt_token=&nko_id=1&nko_id=2&city=Москва&category=Спорт&time_from=2024-01-01T00:00:00
         GET /event?jwt_token=TOKEN&favorite=true
+        GET /event?limit=20&cursor=NEXT_CURSOR
+        GET /event?q=субботник
+        GET /event?bbox=57.9,56.0,58.1,56.4
     """
     filters = EventFilterRequest(
         jwt_token=jwt_token,
@@ -280,14 +419,106 @@ def get_events(
         favorite=favorite,
         category=category,
         regex=regex,
+        q=q,
+        time_from=time_from,
+        time_to=time_to,
+        state="approved",
+        upcoming=upcoming,
+        near=near,
+        radius_km=radius_km,
+        bbox=bbox,
+        limit=limit,
+        cursor=cursor
+    )
+    page = await run_fetch(db, fetch_events, fetch_events_async, filters)
+    return serialized_response(EVENT_PAGE, page, response)
+
+
+@app.get("/moderation/event", response_model=EventPage, tags=["Events"])
+def get_events_for_moderation(
+    response: Response,
+    state: Optional[str] = None,
+    nko_id: Optional[List[int]] = Query(None),
+    city: Optional[str] = None,
+    category: Optional[List[str]] = Query(None),
+    regex: Optional[str] = None,
+    q: Optional[str] = None,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    upcoming: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """
+    Список событий во всех состояниях для модераторов и администраторов
+
+    Читает основную БД, а не реплики, и не кэшируется.
+
+    Args:
+        state: Фильтр по состоянию: draft, review, approved, rejected (опционально, по умолчанию все)
+        nko_id: Фильтр по НКО (опционально, можно передать несколько раз)
+        city: Фильтр по городу (опционально)
+        category: Фильтр по категориям (опционально, можно передать несколько раз)
+        regex: Регулярное выражение для поиска (опционально)
+        q: Полнотекстовый поиск (опционально)
+        time_from: Фильтр по времени начала события (ISO format, опционально)
+        time_to: Фильтр по времени окончания события (ISO format, опционально)
+        upcoming: Только незавершенные события в порядке начала (опционально)
+        limit: Размер страницы (опционально)
+        cursor: Курсор следующей страницы из предыдущего ответа (опционально)
+        token: Токен модератора или администратора
+        db: Сессия базы данных
+
+    Returns:
+        Страница событий с их категориями и курсором следующей страницы
+
+    Example:
+        GET /moderation/event?state=review
+    """
+    require_moderator(token, db)
+    filters = EventFilterRequest(
+        state=state,
+        nko_id=nko_id,
+        city=city,
+        category=category,
+        regex=regex,
+        q=q,
         time_from=time_from,
-        time_to=time_to
+        time_to=time_to,
+        upcoming=upcoming,
+        limit=limit,
+        cursor=cursor
     )
-    return fetch_events(filters, db)
+    return serialized_response(EVENT_PAGE, fetch_events(filters, db), response)
+
+
+@app.get("/event/feed/status", response_model=EventFeedStatus, tags=["Events"])
+def get_event_feed_status(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    Состояние ленты событий event_feed для модераторов и администраторов
+
+    Сверяет всю ленту с исходными таблицами, поэтому закрыто от анонимных запросов.
 
+    Args:
+        token: Токен модератора или администратора
+        db: Сессия базы данных
+
+    Returns:
+        Число событий без строки в ленте, лишних и устаревших строк ленты и время последнего обновления
+    """
+    require_moderator(token, db)
+    return event_feed_status(db)
 
-@app.get("/event/{event_id}", response_model=EventResponse, tags=["Events"])
-def get_event_by_id(event_id: int, db: Session = Depends(get_db)):
+
+@app.get(
+    "/event/{event_id}",
+    response_model=EventResponse,
+    tags=["Events"],
+    dependencies=[Depends(conditional_get("events", "nko", "cities"))],
+)
+async def get_event_by_id(event_id: int, db: FetchSession = Depends(get_fetch_db)):
     """
     Получение конкретного события по ID
 
@@ -298,7 +529,7 @@ def get_event_by_id(event_id: int, db: Session = Depends(get_db)):
     Returns:
         Данные события с категориями
     """
-    return fetch_event_by_id(event_id, db)
+    return await run_fetch(db, fetch_event_by_id, fetch_event_by_id_async, event_id)
 
 
 @app.post("/event", response_model=EventResponse, status_code=status.HTTP_201_CREATED, tags=["Events"])
@@ -306,6 +537,9 @@ def add_event(event_data: EventCreateRequest, db: Session = Depends(get_db)):
     """
     Создание нового события
 
+    Событие не может длиться дольше EVENT_FEED_ONGOING_DAYS дней: иначе оно
+    выпало бы из ленты upcoming, не закончившись.
+
     Args:
         event_data: Данные для создания события
         db: Сессия базы данных
@@ -330,6 +564,64 @@ def remove_event(event_id: int, db: Session = Depends(get_db)):
     """
     return delete_event(event_id, db)
 
+
+@app.get("/map/clusters", response_model=List[ClusterResponse], tags=["Map"])
+def get_map_clusters(
+    response: Response,
+    layer: MapLayer,
+    bbox: str,
+    zoom: int = Query(..., ge=0, le=MAX_CLUSTER_ZOOM),
+    db: Session = Depends(get_db),
+):
+    """
+    Кластеры НКО или событий в окне карты
+
+    Args:
+        layer: Слой карты: nko или event (только одобренные события)
+        bbox: Окно карты "min_lat,min_lon,max_lat,max_lon"; min_lon > max_lon — окно через меридиан ±180°
+        zoom: Уровень масштаба карты (0-16)
+        db: Сессия базы данных
+
+    Returns:
+        Список кластеров с числом точек, центроидом и bbox
+
+    Examples:
+        - /map/clusters?layer=nko&bbox=57.9,55.9,58.1,56.4&zoom=10
+    """
+    return serialized_response(CLUSTER_LIST, fetch_clusters(layer, bbox, zoom, db), response)
+
+
+@app.get(
+    "/tiles/{layer}/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {MVT_MEDIA_TYPE: {}}}, 304: {"description": "Тайл не изменился"}},
+    tags=["Map"],
+)
+def get_map_tile(layer: MapLayer, z: int, x: int, y: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Векторный тайл (Mapbox Vector Tile) со слоем НКО или событий
+
+    Точки содержат атрибуты id, name и categories; события — только одобренные.
+    На уровнях ниже 10 и в тайлах больше чем с 1000 точек вместо точек
+    отдаются центроиды кластеров с атрибутом count. ETag меняется только при изменении точек внутри тайла, поэтому
+    клиент перепроверяет тайл запросом с If-None-Match и получает 304.
+
+    Args:
+        layer: Слой карты: nko или event
+        z, x, y: Координаты тайла в схеме XYZ
+        request: HTTP-запрос (для заголовка If-None-Match)
+        db: Сессия базы данных
+
+    Examples:
+        - /tiles/nko/10/671/303.mvt
+    """
+    etag = tile_etag(layer, z, x, y, db)
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(build_tile(layer, z, x, y, db), media_type=MVT_MEDIA_TYPE, headers=headers)
+
 # Favorites endpoints
 @app.post("/nko/{nko_id}/favorite", tags=["Favorites"])
 def add_nko_favorite(
@@ -375,14 +667,174 @@ def remove_event_favorite(
     return remove_event_from_favorites(current_user.id, event_id, db)
 
 
-# News endpoints
-@app.get("/news", response_model=List[NewsResponse], tags=["News"])
-def get_news_list(
+@app.post("/favorites/contains", response_model=FavoritesMembership, tags=["Favorites"])
+def check_favorites(
+    ids: FavoriteIds,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """
+    Проверка, какие НКО, события и новости в избранном пользователя
+
+    Ответ строится по кэшу избранного пользователя в процессе, без выборки
+    списков избранного.
+
+    Args:
+        ids: ID по видам: {"nko": [...], "event": [...], "news": [...]}, до 1000 каждого вида
+        token: Токен пользователя
+        db: Сессия базы данных
+
+    Returns:
+        Флаги «в избранном» в порядке переданных ID
+
+    Example:
+        POST /favorites/contains {"nko": [1, 2], "event": [7]} -> {"nko": [true, false], "event": [true], "news": []}
+    """
+    current_user = get_current_user(token, db)
+    return favorites_contains(current_user.id, ids, db)
+
+
+@app.post("/favorites/add", response_model=FavoritesChange, tags=["Favorites"])
+def add_favorites_batch(
+    ids: FavoriteIds,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Пакетное добавление в избранное одной транзакцией; уже добавленные и несуществующие ID пропускаются"""
+    current_user = get_current_user(token, db)
+    return add_favorites(current_user.id, ids, db)
+
+
+@app.post("/favorites/remove", response_model=FavoritesChange, tags=["Favorites"])
+def remove_favorites_batch(
+    ids: FavoriteIds,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Пакетное удаление из избранного одной транзакцией; ID не из избранного пропускаются"""
+    current_user = get_current_user(token, db)
+    return remove_favorites(current_user.id, ids, db)
+
+
+@app.post("/import/{kind}", response_model=ImportReport, tags=["Import"])
+def import_records(
+    kind: ImportKind,
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """
+    Массовая загрузка НКО или событий из файла JSONL или CSV
+
+    Поля записей те же, что у POST /nko и POST /event. Строки с ошибками
+    пропускаются, остальные загружаются одной транзакцией.
+
+    Args:
+        kind: Что загружается: nko или event
+        file: Файл JSONL (одна запись в строке) или CSV с заголовком
+        format: jsonl или csv (опционально, по умолчанию по расширению файла)
+        token: Токен модератора или администратора
+        db: Сессия базы данных
+
+    Returns:
+        Число прочитанных и загруженных строк и ошибки по номерам строк
+    """
+    require_moderator(token, db)
+    return bulk_import(kind, read_records(file.file, import_format(file.filename, format)), db)
+
+
+@app.get("/export/{kind}", tags=["Export"])
+def export_records(
+    kind: ExportKind,
+    format: str = "ndjson",
     jwt_token: str = "",
     city: Optional[str] = None,
     favorite: Optional[bool] = None,
+    category: Optional[List[str]] = Query(None),
+    nko_id: Optional[List[int]] = Query(None),
     regex: Optional[str] = None,
+    q: Optional[str] = None,
+    time_from: Optional[str] = None,
+    time_to: Optional[str] = None,
+    upcoming: bool = False,
+    near: Optional[str] = None,
+    radius_km: Optional[float] = None,
+    bbox: Optional[str] = None,
     db: Session = Depends(get_db)
+):
+    """
+    Потоковая выгрузка всех НКО, событий или новостей, подходящих под фильтры
+
+    Фильтры те же, что у GET /nko, GET /event и GET /news (параметры, которых
+    у списка нет, не учитываются); события — только одобренные. Строки
+    читаются серверным курсором и отдаются по мере чтения, память сервера
+    не растет с размером выгрузки.
+
+    Args:
+        kind: Что выгружается: nko, event или news
+        format: ndjson (по умолчанию), csv или parquet
+        jwt_token: JWT токен пользователя (обязателен только для favorite)
+        city: Фильтр по городу (опционально)
+        favorite: Фильтр по избранным (опционально, требует jwt_token)
+        category: Фильтр по категориям НКО или событий (опционально, можно передать несколько раз)
+        nko_id: Фильтр событий по НКО (опционально, можно передать несколько раз)
+        regex: Регулярное выражение для поиска (опционально)
+        q: Полнотекстовый поиск (опционально)
+        time_from: Фильтр событий по времени начала (ISO format, опционально)
+        time_to: Фильтр событий по времени окончания (ISO format, опционально)
+        upcoming: Только незавершенные события (опционально)
+        near: Центр геопоиска "lat,lon" для НКО и событий (опционально)
+        radius_km: Радиус поиска вокруг near в километрах, не больше 500 (обязателен вместе с near)
+        bbox: Прямоугольник "min_lat,min_lon,max_lat,max_lon" (опционально)
+        db: Сессия базы данных
+
+    Returns:
+        Файл NDJSON, CSV или Parquet, передаваемый частями
+
+    Example:
+        GET /export/nko?format=csv&city=Пермь
+        GET /export/event?format=parquet&time_from=2025-01-01T00:00:00
+    """
+    format = export_format(format)
+    if kind == ExportKind.nko:
+        filters = NKOFilterRequest(
+            jwt_token=jwt_token, city=city, favorite=favorite, category=category, regex=regex, q=q,
+            near=near, radius_km=radius_km, bbox=bbox,
+        )
+    elif kind == ExportKind.event:
+        filters = EventFilterRequest(
+            jwt_token=jwt_token, nko_id=nko_id, city=city, favorite=favorite, category=category, regex=regex, q=q,
+            time_from=time_from, time_to=time_to, state="approved", upcoming=upcoming,
+            near=near, radius_km=radius_km, bbox=bbox,
+        )
+    else:
+        filters = NewsFilterRequest(jwt_token=jwt_token, city=city, favorite=favorite, regex=regex, q=q)
+    query = prepare_export(kind, filters, db)
+    return StreamingResponse(
+        export_chunks(query, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{kind.value}.{format}"'},
+    )
+
+
+# News endpoints
+@app.get(
+    "/news",
+    response_model=NewsPage,
+    tags=["News"],
+    dependencies=[Depends(conditional_get("news", "cities", "favorite_news"))],
+)
+async def get_news_list(
+    response: Response,
+    jwt_token: str = "",
+    city: Optional[str] = None,
+    favorite: Optional[bool] = None,
+    regex: Optional[str] = None,
+    q: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: FetchSession = Depends(get_fetch_db)
 ):
     """
     Получение списка новостей с фильтрацией
@@ -392,26 +844,40 @@ def get_news_list(
         city: Фильтр по городу (опционально)
         favorite: Фильтр по избранным (опционально, требует jwt_token)
         regex: Регулярное выражение для поиска (опционально)
+        q: Полнотекстовый поиск с ранжированием по релевантности (опционально)
+        limit: Размер страницы (опционально)
+        cursor: Курсор следующей страницы из предыдущего ответа (опционально)
         db: Сессия базы данных
 
     Returns:
-        Список новостей
+        Страница новостей и курсор следующей страницы
     
     Example:
         GET /news?jwt_token=&city=Москва
         GET /news?jwt_token=TOKEN&favorite=true
+        GET /news?limit=20&cursor=NEXT_CURSOR
+        GET /news?q=волонтеры
     """
     filters = NewsFilterRequest(
         jwt_token=jwt_token,
         city=city,
         favorite=favorite,
-        regex=regex
+        regex=regex,
+        q=q,
+        limit=limit,
+        cursor=cursor
     )
-    return fetch_news(filters, db)
+    page = await run_fetch(db, fetch_news, fetch_news_async, filters)
+    return serialized_response(NEWS_PAGE, page, response)
 
 
-@app.get("/news/{news_id}", response_model=NewsResponse, tags=["News"])
-def get_news_by_id(news_id: int, db: Session = Depends(get_db)):
+@app.get(
+    "/news/{news_id}",
+    response_model=NewsResponse,
+    tags=["News"],
+    dependencies=[Depends(conditional_get("news", "cities"))],
+)
+async def get_news_by_id(news_id: int, db: FetchSession = Depends(get_fetch_db)):
     """
     Получение конкретной новости по ID
 
@@ -422,7 +888,7 @@ def get_news_by_id(news_id: int, db: Session = Depends(get_db)):
     Returns:
         Данные новости
     """
-    return fetch_news_by_id(news_id, db)
+    return await run_fetch(db, fetch_news_by_id, fetch_news_by_id_async, news_id)
 
 
 @app.post("/news", response_model=NewsResponse, status_code=status.HTTP_201_CREATED, tags=["News"])
@@ -3,17 +3,26 @@ from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import Column, Integer, String, Text, SmallInteger, BigInteger, ForeignKey
-from sqlalchemy.dialects.postgresql import ENUM, JSONB
-from sqlalchemy.types import TIMESTAMP, UserDefinedType
+from sqlalchemy import JSON, Column, Computed, Float, Integer, String, Text, SmallInteger, BigInteger, ForeignKey, func, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY, ENUM, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.expression import BinaryExpression
+from sqlalchemy.types import TIMESTAMP, TypeDecorator, UserDefinedType
 
 from database import Base
+from search import search_vector_expression
 
 
 # Кастомный тип для PostgreSQL POINT
 class Point(UserDefinedType):
     cache_ok = True
     
+    class comparator_factory(UserDefinedType.Comparator):
+        def __getitem__(self, index):
+            """Координата точки в SQL: coords[0] — широта, coords[1] — долгота"""
+            return BinaryExpression(self.expr, literal_column(str(int(index))), operators.getitem, type_=Float)
+    
     def get_col_spec(self):
         return "POINT"
     
@@ -38,6 +47,22 @@ class Point(UserDefinedType):
         return process
 
 
+class PortableArray(TypeDecorator):
+    """Массив PostgreSQL; в других СУБД (SQLite в тестах) хранится как JSON-список"""
+
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self, item_type):
+        super().__init__()
+        self.item_type = item_type
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(ARRAY(self.item_type))
+        return dialect.type_descriptor(JSON())
+
+
 class UsersRoles(str, Enum):
     nko = "nko"
     admin = "admin"
@@ -75,6 +100,7 @@ class CityInDB(Base):
     __tablename__ = "cities"
     id = Column(SmallInteger, primary_key=True, index=True)
     name = Column(String(100), nullable=False, unique=True)
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
 
 class NKOInDB(Base):
@@ -88,6 +114,9 @@ class NKOInDB(Base):
     coords = Column(Point, nullable=False)
     meta = Column(JSONB)
     created_at = Column(TIMESTAMP(timezone=True), server_default="now()")
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    # Генерируется PostgreSQL, в обычных выборках не загружается
+    search_vector = deferred(Column(TSVECTOR, Computed(search_vector_expression("name", "description"))))
 
 
 class NKOCategoriesLinkInDB(Base):
@@ -107,6 +136,7 @@ class EventsCategoryInDB(Base):
     id = Column(SmallInteger, primary_key=True, index=True)
     name = Column(String(100), nullable=False, unique=True)
     description = Column(String(255), nullable=False, unique=True)
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
 
 class EventInDB(Base):
@@ -119,16 +149,54 @@ class EventInDB(Base):
     city_id = Column(SmallInteger, ForeignKey("cities.id"), nullable=False)
     picture = Column(Text)
     coords = Column(Point)
-    starts_at = Column(TIMESTAMP(timezone=True))
+    # Ключ секционирования по месяцам; в PostgreSQL первичный ключ — (id, starts_at)
+    starts_at = Column(TIMESTAMP(timezone=True), nullable=False)
     finish_at = Column(TIMESTAMP(timezone=True))
     created_by = Column(BigInteger, ForeignKey("users.id"), nullable=False)
     approved_by = Column(BigInteger, ForeignKey("users.id"))
     state = Column(ENUM(EventsStates, name="events_states", create_type=False), nullable=False)
     meta = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default="now()")
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    # Генерируется PostgreSQL, в обычных выборках не загружается
+    search_vector = deferred(Column(TSVECTOR, Computed(search_vector_expression("name", "description"))))
+
+
+class EventFeedInDB(Base):
+    """
+    Денормализованная лента событий для GET /event
+
+    Строка хранит событие вместе с названиями НКО, города и категорий.
+    Поддерживается бэкендом при создании и удалении событий и периодически
+    сверяется с исходными таблицами (refresh_event_feed в backend/event_feed.py).
+    """
+    __tablename__ = "event_feed"
+    id = Column(BigInteger, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    nko_id = Column(BigInteger, nullable=False)
+    nko_name = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False)
+    description = Column(Text)
+    address = Column(Text)
+    city_id = Column(SmallInteger, nullable=False)
+    city_name = Column(String(100))
+    picture = Column(Text)
+    coords = Column(Point)
+    # Первичный ключ (id, starts_at), как и в PostgreSQL: по нему лента сверяется с events
+    starts_at = Column(TIMESTAMP(timezone=True), primary_key=True)
+    finish_at = Column(TIMESTAMP(timezone=True))
+    created_by = Column(BigInteger, nullable=False)
+    approved_by = Column(BigInteger)
+    state = Column(ENUM(EventsStates, name="events_states", create_type=False), nullable=False)
+    meta = Column(Text)
+    created_at = Column(TIMESTAMP(timezone=True))
+    category_ids = Column(PortableArray(SmallInteger), nullable=False)
+    categories = Column(PortableArray(Text), nullable=False)
+    refreshed_at = Column(TIMESTAMP(timezone=True), server_default="now()")
+    search_vector = deferred(Column(TSVECTOR, Computed(search_vector_expression("name", "description"))))
 
 
 class EventsCategoriesLinkInDB(Base):
+    # В PostgreSQL ссылка на событие включает event_starts_at, его заполняет триггер
     __tablename__ = "events_categories_link"
     events_id = Column(BigInteger, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
     category_id = Column(SmallInteger, ForeignKey("events_categories.id", ondelete="RESTRICT"), primary_key=True)
@@ -140,6 +208,7 @@ class FavoriteNewsInDB(Base):
 
 
 class FavoriteEventsInDB(Base):
+    # В PostgreSQL ссылка на событие включает event_starts_at, его заполняет триггер
     __tablename__ = "favorite_events"
     user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     event_id = Column(BigInteger, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
@@ -162,4 +231,30 @@ class NewsInDB(Base):
     approved_by = Column(BigInteger, ForeignKey("users.id"))
     meta = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default="now()")
-
+    # Генерируется PostgreSQL, в обычных выборках не загружается
+    search_vector = deferred(Column(TSVECTOR, Computed(search_vector_expression("title", "description"))))
+
+
+
+class MapClusterInDB(Base):
+    """Предрасчитанная иерархическая сетка кластеров для карты (см. clusters.py)"""
+    __tablename__ = "map_clusters"
+    layer = Column(String(16), primary_key=True)
+    zoom = Column(SmallInteger, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+    sum_lat = Column(Float, nullable=False)
+    sum_lon = Column(Float, nullable=False)
+    min_lat = Column(Float, nullable=False)
+    min_lon = Column(Float, nullable=False)
+    max_lat = Column(Float, nullable=False)
+    max_lon = Column(Float, nullable=False)
+    version = Column(BigInteger, nullable=False)  # Время последнего изменения ячейки, мкс
+
+
+class TableVersionInDB(Base):
+    """Счетчики изменений таблиц для ETag ответов (см. versions.py)"""
+    __tablename__ = "table_versions"
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False)
@@ -1,11 +1,19 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 
-from auth import get_current_user
-from models import NewsInDB, CityInDB, UserInDB
+from auth import favorite_user_id, get_current_user
+from favorites import with_favorite_flag
+from pagination import DEFAULT_PAGE_SIZE, fetch_page, keyset_statement
+from reference import ReferenceData, get_reference_data
+from versions import bump_versions
+from search import apply_search, validate_trigram_regex
+from models import NewsInDB, UserInDB, FavoriteNewsInDB
 
 
 class NewsFilterRequest(BaseModel):
@@ -13,6 +21,9 @@ class NewsFilterRequest(BaseModel):
     city: Optional[str] = None
     favorite: Optional[bool] = None
     regex: Optional[str] = None
+    q: Optional[str] = None  # Полнотекстовый поиск с ранжированием
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: Optional[str] = None  # Курсор следующей страницы из предыдущего ответа
 
 
 class NewsCreateRequest(BaseModel):
@@ -33,12 +44,171 @@ class NewsResponse(BaseModel):
     approved_by: Optional[str] = None
     meta: Optional[str] = None
     created_at: datetime
+    snippet: Optional[str] = None  # Фрагмент с подсветкой, только при поиске по q
+    is_favorite: Optional[bool] = None  # В избранном у пользователя jwt_token; None без токена
 
     class Config:
         from_attributes = True
 
 
-def fetch_news(filters: NewsFilterRequest, db: Session) -> List[NewsResponse]:
+class NewsPage(BaseModel):
+    items: List[NewsResponse]
+    next_cursor: Optional[str] = None  # None, если страница последняя
+
+
+# Колонки строк выгрузки: все колонки новости без генерируемого search_vector
+NEWS_LIST_COLUMNS = tuple(column for column in NewsInDB.__table__.c if column.key != "search_vector")
+
+
+def _news_query(db: Session, *entities):
+    """
+    Базовый запрос новостей вместе с автором и модератором
+
+    Имена подтягиваются через LEFT JOIN с псевдонимами таблицы users,
+    поэтому число запросов не зависит от количества новостей.
+    Названия городов берутся из кэша справочников.
+
+    Args:
+        db: Сессия базы данных
+        entities: Что выбирать из новостей (по умолчанию сущность NewsInDB)
+    """
+    creator = aliased(UserInDB)
+    approver = aliased(UserInDB)
+    return (
+        db.query(
+            *(entities or (NewsInDB,)),
+            creator.full_name.label("created_by_name"),
+            approver.full_name.label("approved_by_name"),
+        )
+        .outerjoin(creator, NewsInDB.created_by == creator.id)
+        .outerjoin(approver, NewsInDB.approved_by == approver.id)
+    )
+
+
+def _build_news_response(
+    news: NewsInDB,
+    created_by_name: Optional[str],
+    approved_by_name: Optional[str],
+    cities: Dict[int, str],
+    snippet: Optional[str] = None,
+    is_favorite: Optional[bool] = None,
+) -> NewsResponse:
+    """Формирование ответа из строки запроса _news_query и справочника городов"""
+    return NewsResponse(
+        id=news.id,
+        title=news.title,
+        description=news.description,
+        image=news.image,
+        city=cities.get(news.city_id),
+        created_by=created_by_name,
+        approved_by=approved_by_name,
+        meta=news.meta,
+        created_at=news.created_at,
+        snippet=snippet,
+        is_favorite=is_favorite,
+    )
+
+
+def _news_list_items(rows: List[Row], cities: Dict[int, str]) -> List[Dict[str, Any]]:
+    """
+    Элементы страницы новостей из строк _news_list_statement
+
+    Колонки поиска (snippet) и is_favorite попадают в ответ, служебный rank
+    отбрасывается как лишнее поле.
+    """
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        item["city"] = cities.get(item.pop("city_id"))
+        item["created_by"] = item.pop("created_by_name")
+        item["approved_by"] = item.pop("approved_by_name")
+        items.append(item)
+    return items
+
+
+def _news_list_statement(city: bool, regex: bool, favorite: bool, viewer: bool = False) -> Select:
+    """
+    Запрос списка новостей с автором и модератором на именованных параметрах
+
+    Структура запроса зависит только от набора фильтров, значения
+    подставляются при выполнении: city_ids, regex, user_id. При viewer
+    в строки добавляется флаг is_favorite для viewer_id.
+    """
+    creator = aliased(UserInDB)
+    approver = aliased(UserInDB)
+    statement = (
+        select(
+            *NEWS_LIST_COLUMNS,
+            creator.full_name.label("created_by_name"),
+            approver.full_name.label("approved_by_name"),
+        )
+        .outerjoin(creator, NewsInDB.created_by == creator.id)
+        .outerjoin(approver, NewsInDB.approved_by == approver.id)
+    )
+
+    # Фильтр по городу (ID городов, подходящих по имени)
+    if city:
+        statement = statement.where(NewsInDB.city_id.in_(bindparam("city_ids", expanding=True)))
+
+    # Фильтр по регулярному выражению (обслуживается триграммным индексом)
+    if regex:
+        statement = statement.where(NewsInDB.title.op("~*")(bindparam("regex")))
+
+    # Фильтр по избранным
+    if favorite:
+        statement = (
+            statement.join(FavoriteNewsInDB, NewsInDB.id == FavoriteNewsInDB.news_id)
+            .where(FavoriteNewsInDB.user_id == bindparam("user_id"))
+        )
+
+    # Отметка избранного пользователя, запросившего список
+    if viewer:
+        statement = with_favorite_flag(statement, FavoriteNewsInDB, NewsInDB.id, "news_id", favorite)
+
+    return statement
+
+
+def _news_filter_params(filters: NewsFilterRequest, reference: ReferenceData) -> Dict[str, Any]:
+    """Значения фильтров списка новостей для параметров запроса _news_list_statement"""
+    params: Dict[str, Any] = {}
+    if filters.city:
+        params["city_ids"] = reference.city_ids_like(filters.city)
+    if filters.regex:
+        params["regex"] = validate_trigram_regex(filters.regex)
+    if filters.jwt_token:
+        user_id = favorite_user_id(filters.jwt_token)
+        if user_id:
+            params["viewer_id"] = user_id
+            if filters.favorite:
+                params["user_id"] = user_id
+    return params
+
+
+def _news_filter_shape(params: Dict[str, Any]) -> Tuple[bool, ...]:
+    """Набор заданных фильтров — аргументы _news_list_statement"""
+    return "city_ids" in params, "regex" in params, "user_id" in params, "viewer_id" in params
+
+
+@lru_cache(maxsize=None)
+def _news_page_statement(city: bool, regex: bool, favorite: bool, viewer: bool, with_cursor: bool) -> Select:
+    """
+    Запрос страницы новостей в порядке создания для набора фильтров
+
+    Объект запроса строится один раз на комбинацию фильтров, поэтому
+    SQLAlchemy берет скомпилированный SQL из кэша, а asyncpg
+    переиспользует подготовленное на сервере выражение.
+    """
+    return keyset_statement(
+        _news_list_statement(city, regex, favorite, viewer),
+        (NewsInDB.created_at, NewsInDB.id),
+        with_cursor,
+    )
+
+
+def fetch_news(filters: NewsFilterRequest, db: Session) -> NewsPage:
     """
     Получение списка новостей с фильтрацией
     
@@ -47,79 +217,29 @@ def fetch_news(filters: NewsFilterRequest, db: Session) -> List[NewsResponse]:
         db: Сессия базы данных
         
     Returns:
-        Список новостей
+        Страница новостей и курсор следующей страницы
     """
-    # Базовый запрос
-    query = db.query(NewsInDB)
-    
-    # Фильтр по городу
-    if filters.city:
-        city = db.query(CityInDB).filter(CityInDB.name.ilike(f"%{filters.city}%")).first()
-        if city:
-            query = query.filter(NewsInDB.city_id == city.id)
-    
-    # Фильтр по избранным
-    if filters.favorite and filters.jwt_token:
-        from models import FavoriteNewsInDB
-        from auth import jwt_decode
-        try:
-            payload = jwt_decode(filters.jwt_token)
-            user_id = payload.get("id")
-            if user_id:
-                favorite_news_ids = db.query(FavoriteNewsInDB.news_id).filter(
-                    FavoriteNewsInDB.user_id == user_id
-                ).all()
-                favorite_news_ids = [id[0] for id in favorite_news_ids]
-                if favorite_news_ids:
-                    query = query.filter(NewsInDB.id.in_(favorite_news_ids))
-                else:
-                    # Если нет избранных, возвращаем пустой список
-                    return []
-        except Exception:
-            # Если токен невалидный, просто игнорируем фильтр
-            pass
-    
-    # Фильтр по регулярному выражению
-    if filters.regex:
-        query = query.filter(NewsInDB.title.op("~*")(filters.regex))
-    
-    # Выполняем запрос
-    news_list = query.all()
-    
-    # Формируем ответ
-    result = []
-    for news in news_list:
-        city_name = None
-        if news.city_id:
-            city = db.query(CityInDB).filter(CityInDB.id == news.city_id).first()
-            if city:
-                city_name = city.name
-        
-        created_by_name = None
-        if news.created_by:
-            creator = db.query(UserInDB).filter(UserInDB.id == news.created_by).first()
-            if creator:
-                created_by_name = creator.full_name
-        
-        approved_by_name = None
-        if news.approved_by:
-            approver = db.query(UserInDB).filter(UserInDB.id == news.approved_by).first()
-            if approver:
-                approved_by_name = approver.full_name
-        
-        result.append(NewsResponse(
-            id=news.id,
-            title=news.title,
-            description=news.description,
-            image=news.image,
-            city=city_name,
-            created_by=created_by_name,
-            approved_by=approved_by_name,
-            meta=news.meta,
-            created_at=news.created_at
-        ))
-    
-    return result
+    reference = get_reference_data(db)
+    params = _news_filter_params(filters, reference)
+    shape = _news_filter_shape(params)
+    
+    # Полнотекстовый поиск: сортировка по релевантности, иначе по дате создания
+    if filters.q:
+        statement, rank = apply_search(
+            _news_list_statement(*shape), NewsInDB.search_vector, NewsInDB.description, filters.q
+        )
+        order_columns = (rank, NewsInDB.id)
+        key = lambda row: (row.rank, row.id)
+        statement = keyset_statement(statement, order_columns, bool(filters.cursor))
+    else:
+        statement = _news_page_statement(*shape, bool(filters.cursor))
+        order_columns = (NewsInDB.created_at, NewsInDB.id)
+        key = lambda row: (row.created_at, row.id)
+    
+    # Выборка одной страницы
+    rows, next_cursor = fetch_page(db, statement, params, order_columns, filters.cursor, filters.limit, key)
+    
+    return NewsPage(items=_news_list_items(rows, reference.cities), next_cursor=next_cursor)
 
 
 def fetch_news_by_id(news_id: int, db: Session) -> NewsResponse:
@@ -133,39 +253,26 @@ def fetch_news_by_id(news_id: int, db: Session) -> NewsResponse:
     Returns:
         Данные новости
     """
-    news = db.query(NewsInDB).filter(NewsInDB.id == news_id).first()
-    if not news:
+    row = _news_query(db).filter(NewsInDB.id == news_id).first()
+    if not row:
         raise ValueError(f"Новость с ID {news_id} не найдена")
     
-    city_name = None
-    if news.city_id:
-        city = db.query(CityInDB).filter(CityInDB.id == news.city_id).first()
-        if city:
-            city_name = city.name
-    
-    created_by_name = None
-    if news.created_by:
-        creator = db.query(UserInDB).filter(UserInDB.id == news.created_by).first()
-        if creator:
-            created_by_name = creator.full_name
-    
-    approved_by_name = None
-    if news.approved_by:
-        approver = db.query(UserInDB).filter(UserInDB.id == news.approved_by).first()
-        if approver:
-            approved_by_name = approver.full_name
-    
-    return NewsResponse(
-        id=news.id,
-        title=news.title,
-        description=news.description,
-        image=news.image,
-        city=city_name,
-        created_by=created_by_name,
-        approved_by=approved_by_name,
-        meta=news.meta,
-        created_at=news.created_at
-    )
+    return _build_news_response(*row, get_reference_data(db).cities)
+
+
+async def fetch_news_async(filters: NewsFilterRequest, db: AsyncSession) -> NewsPage:
+    """
+    Асинхронный вариант fetch_news для AsyncSession
+
+    Запрос строится тем же кодом, что и в синхронном варианте, и выполняется
+    через asyncpg без занятия потока из пула.
+    """
+    return await db.run_sync(lambda session: fetch_news(filters, session))
+
+
+async def fetch_news_by_id_async(news_id: int, db: AsyncSession) -> NewsResponse:
+    """Асинхронный вариант fetch_news_by_id для AsyncSession"""
+    return await db.run_sync(lambda session: fetch_news_by_id(news_id, session))
 
 
 def create_news(news_data: NewsCreateRequest, db: Session) -> NewsResponse:
@@ -190,6 +297,7 @@ def create_news(news_data: NewsCreateRequest, db: Session) -> NewsResponse:
     )
     
     db.add(new_news)
+    bump_versions(db, "news")
     db.commit()
     db.refresh(new_news)
     
@@ -212,6 +320,7 @@ def delete_news(news_id: int, db: Session) -> Dict[str, str]:
         raise ValueError(f"Новость с ID {news_id} не найдена")
     
     db.delete(news)
+    bump_versions(db, "news", "favorite_news")
     db.commit()
     
     return {"message": f"Новость с ID {news_id} успешно удалена"}
@@ -229,8 +338,6 @@ def add_news_to_favorites(user_id: int, news_id: int, db: Session) -> Dict[str,
     Returns:
         Сообщение об успешном добавлении
     """
-    from models import FavoriteNewsInDB
-    
     # Проверяем существование новости
     news = db.query(NewsInDB).filter(NewsInDB.id == news_id).first()
     if not news:
@@ -248,6 +355,7 @@ def add_news_to_favorites(user_id: int, news_id: int, db: Session) -> Dict[str,
     # Добавляем в избранное
     favorite = FavoriteNewsInDB(user_id=user_id, news_id=news_id)
     db.add(favorite)
+    bump_versions(db, "favorite_news")
     db.commit()
     
     return {"message": f"Новость с ID {news_id} добавлена в избранное"}
@@ -265,8 +373,6 @@ def remove_news_from_favorites(user_id: int, news_id: int, db: Session) -> Dict[
     Returns:
         Сообщение об успешном удалении
     """
-    from models import FavoriteNewsInDB
-    
     # Ищем запись в избранном
     favorite = db.query(FavoriteNewsInDB).filter(
         FavoriteNewsInDB.user_id == user_id,
@@ -278,6 +384,7 @@ def remove_news_from_favorites(user_id: int, news_id: int, db: Session) -> Dict[
     
     # Удаляем из избранного
     db.delete(favorite)
+    bump_versions(db, "favorite_news")
     db.commit()
     
     return {"message": f"Новость с ID {news_id} удалена из избранного"}
@@ -294,51 +401,13 @@ def get_favorite_news(user_id: int, db: Session) -> List[NewsResponse]:
     Returns:
         Список избранных новостей
     """
-    from models import FavoriteNewsInDB
-    
-    # Получаем ID избранных новостей
-    favorite_news_ids = db.query(FavoriteNewsInDB.news_id).filter(
-        FavoriteNewsInDB.user_id == user_id
-    ).all()
-    favorite_news_ids = [id[0] for id in favorite_news_ids]
-    
-    if not favorite_news_ids:
-        return []
-    
-    # Получаем новости
-    news_list = db.query(NewsInDB).filter(NewsInDB.id.in_(favorite_news_ids)).all()
-    
-    # Формируем ответ
-    result = []
-    for news in news_list:
-        city_name = None
-        if news.city_id:
-            city = db.query(CityInDB).filter(CityInDB.id == news.city_id).first()
-            if city:
-                city_name = city.name
-        
-        created_by_name = None
-        if news.created_by:
-            creator = db.query(UserInDB).filter(UserInDB.id == news.created_by).first()
-            if creator:
-                created_by_name = creator.full_name
-        
-        approved_by_name = None
-        if news.approved_by:
-            approver = db.query(UserInDB).filter(UserInDB.id == news.approved_by).first()
-            if approver:
-                approved_by_name = approver.full_name
-        
-        result.append(NewsResponse(
-            id=news.id,
-            title=news.title,
-            description=news.description,
-            image=news.image,
-            city=city_name,
-            created_by=created_by_name,
-            approved_by=approved_by_name,
-            meta=news.meta,
-            created_at=news.created_at
-        ))
+    rows = (
+        _news_query(db)
+        .join(FavoriteNewsInDB, NewsInDB.id == FavoriteNewsInDB.news_id)
+        .filter(FavoriteNewsInDB.user_id == user_id)
+        .order_by(NewsInDB.created_at.desc())
+        .all()
+    )
     
-    return result
\ No newline at end of file
+    cities = get_reference_data(db).cities
+    return [_build_news_response(*row, cities, is_favorite=True) for row in rows]
@@ -1,15 +1,25 @@
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import and_, func, or_
+from sqlalchemy import Row, Select, and_, bindparam, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from auth import favorite_user_id
+from clusters import MapLayer, add_point, remove_nko_events, remove_points
 from database import get_db
+from event_feed import remove_from_event_feed
+from favorites import with_favorite_flag
+from pagination import DEFAULT_PAGE_SIZE, fetch_page, keyset_statement
+from reference import ReferenceData, get_reference_data, get_reference_data_with
+from versions import bump_versions
+from geo import apply_geo
+from search import apply_search, validate_trigram_regex
 from models import (
+    FavoriteNKOInDB,
     NKOInDB,
-    CityInDB,
-    NKOCategoryInDB,
     NKOCategoriesLinkInDB,
 )
 
@@ -22,6 +32,12 @@ class NKOFilterRequest(BaseModel):
     favorite: Optional[bool] = None
     category: Optional[List[str]] = None
     regex: Optional[str] = None
+    q: Optional[str] = None  # Полнотекстовый поиск с ранжированием
+    near: Optional[str] = None  # Центр поиска "lat,lon", результаты сортируются по расстоянию
+    radius_km: Optional[float] = None  # Радиус поиска вокруг near
+    bbox: Optional[str] = None  # Прямоугольник "min_lat,min_lon,max_lat,max_lon"
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: Optional[str] = None  # Курсор следующей страницы из предыдущего ответа
 
 
 class NKOCreateRequest(BaseModel):
@@ -52,9 +68,209 @@ class NKOResponse(BaseModel):
     meta: Optional[Dict[str, Any]]
     created_at: Optional[str]
     categories: List[str]
+    snippet: Optional[str] = None  # Фрагмент с подсветкой, только при поиске по q
+    distance_km: Optional[float] = None  # Расстояние до near, только при геопоиске
+    is_favorite: Optional[bool] = None  # В избранном у пользователя jwt_token; None без токена
 
 
-def fetch_nko(filters: NKOFilterRequest, db: Session) -> List[NKOResponse]:
+class NKOPage(BaseModel):
+    """Страница списка НКО"""
+
+    items: List[NKOResponse]
+    next_cursor: Optional[str] = None  # None, если страница последняя
+
+
+def _fetch_nko_categories(nko_ids: List[int], db: Session) -> Dict[int, List[str]]:
+    """
+    Загрузка категорий для набора НКО одним запросом
+
+    Args:
+        nko_ids: ID НКО, для которых нужны категории
+        db: Сессия базы данных
+
+    Returns:
+        Словарь {ID НКО: список названий категорий}
+    """
+    categories: Dict[int, List[str]] = {nko_id: [] for nko_id in nko_ids}
+    if not nko_ids:
+        return categories
+
+    # Названия категорий берутся из кэша справочников
+    names = get_reference_data(db).nko_categories
+    rows = (
+        db.query(NKOCategoriesLinkInDB.nko_id, NKOCategoriesLinkInDB.category_id)
+        .filter(NKOCategoriesLinkInDB.nko_id.in_(nko_ids))
+        .all()
+    )
+    for nko_id, category_id in rows:
+        categories[nko_id].append(names.get(category_id))
+
+    return categories
+
+
+def _build_nko_response(
+    nko: NKOInDB,
+    city_name: Optional[str],
+    categories: List[str],
+    snippet: Optional[str] = None,
+    distance_km: Optional[float] = None,
+    is_favorite: Optional[bool] = None,
+) -> NKOResponse:
+    """Формирование ответа из ORM-объекта НКО без обращений к БД"""
+    # Извлечение координат из POINT
+    # coords уже обработан result_processor и возвращается как tuple
+    if nko.coords and isinstance(nko.coords, (tuple, list)) and len(nko.coords) == 2:
+        latitude, longitude = float(nko.coords[0]), float(nko.coords[1])
+    else:
+        latitude, longitude = 0.0, 0.0
+
+    return NKOResponse(
+        id=nko.id,
+        name=nko.name,
+        description=nko.description,
+        logo=nko.logo,
+        address=nko.address,
+        city=city_name,
+        latitude=latitude,
+        longitude=longitude,
+        meta=nko.meta if nko.meta else None,
+        created_at=nko.created_at.isoformat() if nko.created_at else None,
+        categories=categories,
+        snippet=snippet,
+        distance_km=distance_km,
+        is_favorite=is_favorite,
+    )
+
+
+# Колонки строк списка: все колонки ответа без генерируемого search_vector.
+# Выборка колонок вместо сущности не создает ORM-объекты и не заполняет identity map.
+NKO_LIST_COLUMNS = tuple(column for column in NKOInDB.__table__.c if column.key != "search_vector")
+
+
+def _nko_list_items(
+    rows: List[Row], cities: Dict[int, str], categories: Dict[int, List[str]]
+) -> List[Dict[str, Any]]:
+    """
+    Элементы страницы НКО из строк выборки NKO_LIST_COLUMNS
+
+    Строки распаковываются по позициям прямо в словари ответа; NKOPage
+    проверяет весь список одним вызовом pydantic-core. Дополнительные колонки
+    поиска (snippet, distance_km) попадают в ответ, служебный rank
+    отбрасывается как лишнее поле.
+    """
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        coords = item.pop("coords")
+        item["latitude"], item["longitude"] = (float(coords[0]), float(coords[1])) if coords else (0.0, 0.0)
+        item["city"] = cities.get(item.pop("city_id"))
+        item["meta"] = item["meta"] or None
+        item["created_at"] = item["created_at"].isoformat() if item["created_at"] else None
+        item["categories"] = categories[item["id"]]
+        items.append(item)
+    return items
+
+
+def _nko_list_statement(city: bool, category: bool, regex: bool, favorite: bool, viewer: bool = False) -> Select:
+    """
+    Запрос списка НКО с фильтрами на именованных параметрах
+
+    Структура запроса зависит только от набора фильтров, значения
+    подставляются при выполнении: city_ids, category_ids, regex, user_id.
+    При viewer в строки добавляется флаг is_favorite для viewer_id.
+    """
+    statement = select(*NKO_LIST_COLUMNS)
+
+    # Фильтр по городу (ID городов, подходящих по имени)
+    if city:
+        statement = statement.where(NKOInDB.city_id.in_(bindparam("city_ids", expanding=True)))
+
+    # Фильтр по категориям через подзапрос
+    if category:
+        subquery = select(NKOCategoriesLinkInDB.nko_id).where(
+            NKOCategoriesLinkInDB.category_id.in_(bindparam("category_ids", expanding=True))
+        )
+        statement = statement.where(NKOInDB.id.in_(subquery))
+
+    # Фильтр по regex (поиск в имени и описании, обслуживается триграммными индексами)
+    if regex:
+        statement = statement.where(
+            or_(
+                NKOInDB.name.op("~*")(bindparam("regex")),
+                NKOInDB.description.op("~*")(bindparam("regex"))
+            )
+        )
+
+    # Фильтр по избранным
+    if favorite:
+        statement = (
+            statement.join(FavoriteNKOInDB, NKOInDB.id == FavoriteNKOInDB.nko_id)
+            .where(FavoriteNKOInDB.user_id == bindparam("user_id"))
+        )
+
+    # Отметка избранного пользователя, запросившего список
+    if viewer:
+        statement = with_favorite_flag(statement, FavoriteNKOInDB, NKOInDB.id, "nko_id", favorite)
+
+    return statement
+
+
+def _nko_filter_params(filters: NKOFilterRequest, reference: ReferenceData) -> Dict[str, Any]:
+    """
+    Значения фильтров списка НКО для параметров запроса _nko_list_statement
+
+    Названия городов и категорий переводятся в ID по кэшу справочников.
+    """
+    params: Dict[str, Any] = {}
+    if filters.city:
+        params["city_ids"] = reference.city_ids_like(filters.city)
+    if filters.category and len(filters.category) > 0:
+        params["category_ids"] = [
+            reference.nko_category_ids[name]
+            for name in filters.category
+            if name in reference.nko_category_ids
+        ]
+    if filters.regex:
+        params["regex"] = validate_trigram_regex(filters.regex)
+    if filters.jwt_token:
+        user_id = favorite_user_id(filters.jwt_token)
+        if user_id:
+            params["viewer_id"] = user_id
+            if filters.favorite:
+                params["user_id"] = user_id
+    return params
+
+
+def _nko_filter_shape(params: Dict[str, Any]) -> Tuple[bool, ...]:
+    """Набор заданных фильтров — аргументы _nko_list_statement"""
+    return (
+        "city_ids" in params, "category_ids" in params, "regex" in params, "user_id" in params, "viewer_id" in params
+    )
+
+
+@lru_cache(maxsize=None)
+def _nko_page_statement(
+    city: bool, category: bool, regex: bool, favorite: bool, viewer: bool, with_cursor: bool
+) -> Select:
+    """
+    Запрос страницы НКО в порядке создания для набора фильтров
+
+    Объект запроса строится один раз на комбинацию фильтров (их не больше 64),
+    поэтому SQLAlchemy не пересобирает запрос и берет скомпилированный SQL
+    из кэша по запомненному ключу, а asyncpg переиспользует подготовленное
+    на сервере выражение.
+    """
+    return keyset_statement(
+        _nko_list_statement(city, category, regex, favorite, viewer),
+        (NKOInDB.created_at, NKOInDB.id),
+        with_cursor,
+    )
+
+
+def fetch_nko(filters: NKOFilterRequest, db: Session) -> NKOPage:
     """
     Получение списка НКО с фильтрацией
 
@@ -63,95 +279,55 @@ def fetch_nko(filters: NKOFilterRequest, db: Session) -> List[NKOResponse]:
         db: Сессия базы данных
 
     Returns:
-        Список НКО с их категориями
+        Страница НКО с их категориями и курсором следующей страницы
     """
     
     try:
-        # Базовый запрос с JOIN к городам
-        query = (
-            db.query(NKOInDB, CityInDB.name.label("city_name"))
-            .join(CityInDB, NKOInDB.city_id == CityInDB.id)
-        )
-        
-        # Фильтр по городу (поиск по имени города)
-        if filters.city:
-            query = query.filter(CityInDB.name.ilike(f"%{filters.city}%"))
-        
-        # Фильтр по категориям
-        if filters.category and len(filters.category) > 0:
-            # Подзапрос для фильтрации по категориям
-            subquery = (
-                db.query(NKOCategoriesLinkInDB.nko_id)
-                .join(NKOCategoryInDB, NKOCategoriesLinkInDB.category_id == NKOCategoryInDB.id)
-                .filter(NKOCategoryInDB.name.in_(filters.category))
-            )
-            query = query.filter(NKOInDB.id.in_(subquery))
-        
-        # Фильтр по regex (поиск в имени и описании)
-        if filters.regex:
-            query = query.filter(
-                or_(
-                    NKOInDB.name.op("~*")(filters.regex),
-                    NKOInDB.description.op("~*")(filters.regex)
-                )
-            )
+        reference = get_reference_data(db)
+        params = _nko_filter_params(filters, reference)
+        shape = _nko_filter_shape(params)
         
-        # Фильтр по избранным
-        if filters.favorite and filters.jwt_token:
-            from models import FavoriteNKOInDB
-            from auth import jwt_decode
-            try:
-                payload = jwt_decode(filters.jwt_token)
-                user_id = payload.get("id")
-                if user_id:
-                    query = query.join(FavoriteNKOInDB, NKOInDB.id == FavoriteNKOInDB.nko_id)
-                    query = query.filter(FavoriteNKOInDB.user_id == user_id)
-            except Exception:
-                # Если токен невалидный, просто игнорируем фильтр
-                pass
-        
-        # Сортировка по дате создания
-        query = query.order_by(NKOInDB.created_at.desc())
-        
-        # Выполнение запроса
-        rows = query.all()
-        
-        # Получение категорий для каждого НКО
-        nko_list = []
-        for nko, city_name in rows:
-            # Запрос категорий для текущего НКО
-            categories = (
-                db.query(NKOCategoryInDB.name)
-                .join(NKOCategoriesLinkInDB, NKOCategoryInDB.id == NKOCategoriesLinkInDB.category_id)
-                .filter(NKOCategoriesLinkInDB.nko_id == nko.id)
-                .all()
-            )
-            categories = [cat[0] for cat in categories]
+        if filters.q or filters.near or filters.bbox or filters.radius_km is not None:
+            # Поиск и геофильтры добавляют колонки и меняют сортировку: такой запрос собирается заново
+            statement = _nko_list_statement(*shape)
             
-            # Извлечение координат из POINT
-            # coords уже обработан result_processor и возвращается как tuple
-            if nko.coords and isinstance(nko.coords, (tuple, list)) and len(nko.coords) == 2:
-                latitude, longitude = float(nko.coords[0]), float(nko.coords[1])
-            else:
-                latitude, longitude = 0.0, 0.0
+            rank = None
+            if filters.q:
+                statement, rank = apply_search(statement, NKOInDB.search_vector, NKOInDB.description, filters.q)
             
-            nko_data = NKOResponse(
-                id=nko.id,
-                name=nko.name,
-                description=nko.description,
-                logo=nko.logo,
-                address=nko.address,
-                city=city_name,
-                latitude=latitude,
-                longitude=longitude,
-                meta=nko.meta if nko.meta else None,
-                created_at=nko.created_at.isoformat() if nko.created_at else None,
-                categories=categories,
-            )
-            nko_list.append(nko_data)
+            statement, distance = apply_geo(statement, NKOInDB.coords, filters.near, filters.radius_km, filters.bbox)
+            
+            # Сортировка: по расстоянию, по релевантности или по дате создания
+            descending = True
+            if distance is not None:
+                order_columns = (distance, NKOInDB.id)
+                key = lambda row: (row.distance_km, row.id)
+                descending = False
+            elif rank is not None:
+                order_columns = (rank, NKOInDB.id)
+                key = lambda row: (row.rank, row.id)
+            else:
+                order_columns = (NKOInDB.created_at, NKOInDB.id)
+                key = lambda row: (row.created_at, row.id)
+            statement = keyset_statement(statement, order_columns, bool(filters.cursor), descending)
+        else:
+            # Обычный список: готовый запрос для этой комбинации фильтров
+            statement = _nko_page_statement(*shape, bool(filters.cursor))
+            order_columns = (NKOInDB.created_at, NKOInDB.id)
+            key = lambda row: (row.created_at, row.id)
         
-        return nko_list
+        # Выборка одной страницы
+        rows, next_cursor = fetch_page(db, statement, params, order_columns, filters.cursor, filters.limit, key)
+        
+        # Категории всех НКО загружаются одним запросом
+        categories = _fetch_nko_categories([row.id for row in rows], db)
+
+        nko_list = _nko_list_items(rows, reference.cities, categories)
+        
+        return NKOPage(items=nko_list, next_cursor=next_cursor)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -172,47 +348,14 @@ def fetch_nko_by_id(nko_id: int, db: Session) -> NKOResponse:
     """
     
     try:
-        # Запрос НКО с JOIN к городам
-        result = (
-            db.query(NKOInDB, CityInDB.name.label("city_name"))
-            .join(CityInDB, NKOInDB.city_id == CityInDB.id)
-            .filter(NKOInDB.id == nko_id)
-            .first()
-        )
+        nko = db.query(NKOInDB).filter(NKOInDB.id == nko_id).first()
         
-        if not result:
+        if not nko:
             raise HTTPException(status_code=404, detail=f"НКО с ID {nko_id} не найдено")
         
-        nko, city_name = result
-        
-        # Запрос категорий для НКО
-        categories = (
-            db.query(NKOCategoryInDB.name)
-            .join(NKOCategoriesLinkInDB, NKOCategoryInDB.id == NKOCategoriesLinkInDB.category_id)
-            .filter(NKOCategoriesLinkInDB.nko_id == nko.id)
-            .all()
-        )
-        categories = [cat[0] for cat in categories]
-        
-        # Извлечение координат из POINT
-        if nko.coords and isinstance(nko.coords, (tuple, list)) and len(nko.coords) == 2:
-            latitude, longitude = float(nko.coords[0]), float(nko.coords[1])
-        else:
-            latitude, longitude = 0.0, 0.0
-        
-        nko_data = NKOResponse(
-            id=nko.id,
-            name=nko.name,
-            description=nko.description,
-            logo=nko.logo,
-            address=nko.address,
-            city=city_name,
-            latitude=latitude,
-            longitude=longitude,
-            meta=nko.meta if nko.meta else None,
-            created_at=nko.created_at.isoformat() if nko.created_at else None,
-            categories=categories,
-        )
+        city_name = get_reference_data(db).cities.get(nko.city_id)
+        categories = _fetch_nko_categories([nko.id], db)
+        nko_data = _build_nko_response(nko, city_name, categories[nko.id])
         
         return nko_data
     
@@ -222,6 +365,21 @@ def fetch_nko_by_id(nko_id: int, db: Session) -> NKOResponse:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+async def fetch_nko_async(filters: NKOFilterRequest, db: AsyncSession) -> NKOPage:
+    """
+    Асинхронный вариант fetch_nko для AsyncSession
+
+    Запрос строится тем же кодом, что и в синхронном варианте, и выполняется
+    через asyncpg без занятия потока из пула.
+    """
+    return await db.run_sync(lambda session: fetch_nko(filters, session))
+
+
+async def fetch_nko_by_id_async(nko_id: int, db: AsyncSession) -> NKOResponse:
+    """Асинхронный вариант fetch_nko_by_id для AsyncSession"""
+    return await db.run_sync(lambda session: fetch_nko_by_id(nko_id, session))
+
+
 def create_nko(nko_data: NKOCreateRequest, db: Session) -> NKOResponse:
     """
     Создание нового НКО
@@ -238,18 +396,24 @@ def create_nko(nko_data: NKOCreateRequest, db: Session) -> NKOResponse:
     """
     
     try:
+        # Город или категории, созданные через другой воркер, ищутся в БД
+        reference = get_reference_data_with(db, lambda reference: (
+            nko_data.city in reference.city_ids
+            and all(name in reference.nko_category_ids for name in nko_data.categories)
+        ))
+        
         # Проверяем существование города
-        city = db.query(CityInDB).filter(CityInDB.name == nko_data.city).first()
-        if not city:
+        city_id = reference.city_ids.get(nko_data.city)
+        if city_id is None:
             raise HTTPException(status_code=404, detail=f"Город '{nko_data.city}' не найден")
         
         # Проверяем существование всех категорий
-        categories = []
+        category_ids = []
         for category_name in nko_data.categories:
-            category = db.query(NKOCategoryInDB).filter(NKOCategoryInDB.name == category_name).first()
-            if not category:
+            category_id = reference.nko_category_ids.get(category_name)
+            if category_id is None:
                 raise HTTPException(status_code=404, detail=f"Категория '{category_name}' не найдена")
-            categories.append(category)
+            category_ids.append(category_id)
         
         # Создаем НКО со всеми обязательными полями
         new_nko = NKOInDB(
@@ -257,7 +421,7 @@ def create_nko(nko_data: NKOCreateRequest, db: Session) -> NKOResponse:
             description=nko_data.description,
             logo=nko_data.logo,
             address=nko_data.address,
-            city_id=city.id,
+            city_id=city_id,
             coords=(nko_data.latitude, nko_data.longitude),
             meta=nko_data.meta,
         )
@@ -266,13 +430,17 @@ def create_nko(nko_data: NKOCreateRequest, db: Session) -> NKOResponse:
         db.flush()  # Получаем ID без коммита
         
         # Добавляем связи с категориями
-        for category in categories:
+        for category_id in category_ids:
             link = NKOCategoriesLinkInDB(
                 nko_id=new_nko.id,
-                category_id=category.id
+                category_id=category_id
             )
             db.add(link)
         
+        # Учитываем точку в кластерах карты в той же транзакции
+        add_point(MapLayer.nko, nko_data.latitude, nko_data.longitude, db)
+        
+        bump_versions(db, "nko")
         db.commit()
         db.refresh(new_nko)
         
@@ -326,8 +494,14 @@ def delete_nko(nko_id: int, db: Session) -> dict:
         # Удаляем связи с категориями
         db.query(NKOCategoriesLinkInDB).filter(NKOCategoriesLinkInDB.nko_id == nko_id).delete()
         
+        # Убираем из кластеров карты НКО и его события (удалятся каскадно)
+        remove_points(MapLayer.nko, [nko.coords], db)
+        remove_nko_events(nko_id, db)
+        remove_from_event_feed(db, nko_id=nko_id)
+        
         # Удаляем само НКО
         db.delete(nko)
+        bump_versions(db, "nko", "events", "favorite_nko", "favorite_events")
         db.commit()
         
         return {"message": f"НКО с ID {nko_id} успешно удалено"}
@@ -374,6 +548,7 @@ def add_nko_to_favorites(user_id: int, nko_id: int, db: Session) -> dict:
         # Добавляем в избранное
         favorite = FavoriteNKOInDB(user_id=user_id, nko_id=nko_id)
         db.add(favorite)
+        bump_versions(db, "favorite_nko")
         db.commit()
         
         return {"message": f"НКО с ID {nko_id} добавлено в избранное"}
@@ -415,6 +590,7 @@ def remove_nko_from_favorites(user_id: int, nko_id: int, db: Session) -> dict:
         
         # Удаляем из избранного
         db.delete(favorite)
+        bump_versions(db, "favorite_nko")
         db.commit()
         
         return {"message": f"НКО с ID {nko_id} удалено из избранного"}
@@ -443,8 +619,7 @@ def get_favorite_nko(user_id: int, db: Session) -> List[NKOResponse]:
     try:
         # Запрос избранных НКО с JOIN
         query = (
-            db.query(NKOInDB, CityInDB.name.label("city_name"))
-            .join(CityInDB, NKOInDB.city_id == CityInDB.id)
+            db.query(NKOInDB)
             .join(FavoriteNKOInDB, NKOInDB.id == FavoriteNKOInDB.nko_id)
             .filter(FavoriteNKOInDB.user_id == user_id)
             .order_by(NKOInDB.created_at.desc())
@@ -452,38 +627,14 @@ def get_favorite_nko(user_id: int, db: Session) -> List[NKOResponse]:
         
         rows = query.all()
         
-        # Получение категорий для каждого НКО
-        nko_list = []
-        for nko, city_name in rows:
-            # Запрос категорий для текущего НКО
-            categories = (
-                db.query(NKOCategoryInDB.name)
-                .join(NKOCategoriesLinkInDB, NKOCategoryInDB.id == NKOCategoriesLinkInDB.category_id)
-                .filter(NKOCategoriesLinkInDB.nko_id == nko.id)
-                .all()
-            )
-            categories = [cat[0] for cat in categories]
-            
-            # Извлечение координат из POINT
-            if nko.coords and isinstance(nko.coords, (tuple, list)) and len(nko.coords) == 2:
-                latitude, longitude = float(nko.coords[0]), float(nko.coords[1])
-            else:
-                latitude, longitude = 0.0, 0.0
-            
-            nko_data = NKOResponse(
-                id=nko.id,
-                name=nko.name,
-                description=nko.description,
-                logo=nko.logo,
-                address=nko.address,
-                city=city_name,
-                latitude=latitude,
-                longitude=longitude,
-                meta=nko.meta if nko.meta else None,
-                created_at=nko.created_at.isoformat() if nko.created_at else None,
-                categories=categories,
-            )
-            nko_list.append(nko_data)
+        # Категории всех НКО загружаются одним запросом, города — из кэша
+        cities = get_reference_data(db).cities
+        categories = _fetch_nko_categories([nko.id for nko in rows], db)
+
+        nko_list = [
+            _build_nko_response(nko, cities.get(nko.city_id), categories[nko.id], is_favorite=True)
+            for nko in rows
+        ]
         
         return nko_list
     
@@ -25,6 +25,12 @@ curl -G "http://localhost/api/nko" \
 curl -G "http://localhost/api/nko" \
   --data-urlencode "jwt_token="
 
+# Постраничное получение НКО (next_cursor берется из предыдущего ответа)
+curl -G "http://localhost/api/nko" \
+  --data-urlencode "jwt_token=" \
+  --data-urlencode "limit=20" \
+  --data-urlencode "cursor=NEXT_CURSOR"
+
 # Получение конкретного НКО по ID
 curl -X GET http://localhost/api/nko/1
 
@@ -0,0 +1,123 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, bindparam, tuple_
+from sqlalchemy.orm import Session
+
+# Размер страницы для списковых эндпоинтов
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Кодирование позиции последней записи страницы в непрозрачный курсор
+
+    Args:
+        values: Значения колонок сортировки, например (created_at, id)
+
+    Returns:
+        Курсор в формате base64url
+    """
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    Декодирование курсора, полученного от клиента
+
+    Args:
+        cursor: Курсор из предыдущего ответа
+        columns: Колонки сортировки, по типам которых восстанавливаются значения
+
+    Raises:
+        HTTPException: Если курсор поврежден
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor length mismatch")
+        return [
+            datetime.fromisoformat(value)
+            if value is not None and column.type.python_type is datetime
+            else value
+            for value, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор пагинации")
+
+
+def keyset_statement(
+    statement: Select,
+    columns: Sequence[Any],
+    with_cursor: bool,
+    descending: bool = True,
+) -> Select:
+    """
+    Keyset-пагинация для select() на именованных параметрах
+
+    Позиция курсора и размер страницы не входят в текст запроса
+    (параметры cursor_0..cursor_N и page_limit), поэтому один объект
+    запроса можно переиспользовать для любых страниц. Значения
+    параметров подставляет fetch_page.
+
+    Args:
+        statement: Запрос с уже примененными фильтрами
+        columns: Колонки сортировки, последней должен идти первичный ключ
+        with_cursor: Добавлять ли условие по курсору (для всех страниц, кроме первой)
+        descending: Порядок сортировки (по умолчанию по убыванию)
+    """
+    if with_cursor:
+        position = tuple_(*[
+            bindparam(f"cursor_{index}", type_=column.type) for index, column in enumerate(columns)
+        ])
+        statement = statement.where(tuple_(*columns) < position if descending else tuple_(*columns) > position)
+
+    return (
+        statement.order_by(*[column.desc() if descending else column.asc() for column in columns])
+        .limit(bindparam("page_limit"))
+    )
+
+
+def fetch_page(
+    db: Session,
+    statement: Select,
+    params: Dict[str, Any],
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    key: Callable[[Any], Sequence[Any]],
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Выполнение запроса из keyset_statement и выделение страницы
+
+    Args:
+        db: Сессия базы данных
+        statement: Запрос, построенный keyset_statement (с условием по курсору, если он задан)
+        params: Значения параметров фильтров запроса
+        columns: Колонки сортировки, те же, что в keyset_statement
+        cursor: Курсор предыдущей страницы или None для первой страницы
+        limit: Размер страницы
+        key: Функция, возвращающая значения колонок сортировки для строки результата
+
+    Returns:
+        Строки страницы и курсор следующей страницы (None, если страница последняя)
+    """
+    params = dict(params, page_limit=limit + 1)
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        params.update({f"cursor_{index}": value for index, value in enumerate(values)})
+
+    rows = db.execute(statement, params).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+
+    return rows, next_cursor
@@ -0,0 +1,144 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, List, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм; последняя корзина — все, что больше
+WAIT_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+CONNECTION_BUCKETS = (1, 2, 5, 10, 20, 50)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (совместима по смыслу с Prometheus)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        labels = [f"le_{bound:g}" for bound in self.buckets] + ["le_inf"]
+        return {"buckets": dict(zip(labels, self.counts)), "sum": self.total, "count": self.count}
+
+
+class PoolMetrics:
+    """Состояние и история пула соединений одного движка"""
+
+    def __init__(self, name: str, slow_checkout_seconds: float):
+        self.name = name
+        self.slow_checkout_seconds = slow_checkout_seconds
+        self.checked_out = 0
+        self.slow_checkouts = 0
+        self.checked_out_histogram = Histogram(CONNECTION_BUCKETS)
+        self.overflow_histogram = Histogram(CONNECTION_BUCKETS)
+        self.wait_histogram = Histogram(WAIT_BUCKETS_SECONDS)
+        self._lock = threading.Lock()
+
+    def on_checkout(self, overflow: int) -> None:
+        with self._lock:
+            self.checked_out += 1
+            self.checked_out_histogram.observe(self.checked_out)
+            self.overflow_histogram.observe(max(overflow, 0))
+
+    def on_checkin(self) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def on_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_histogram.observe(seconds)
+            if seconds >= self.slow_checkout_seconds:
+                self.slow_checkouts += 1
+        if seconds >= self.slow_checkout_seconds:
+            logger.warning(
+                f"Slow DB connection checkout on '{self.name}' pool: waited {seconds * 1000:.0f} ms, "
+                f"{self.checked_out} connections checked out"
+            )
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "checked_out": self.checked_out,
+                "slow_checkouts": self.slow_checkouts,
+                "checked_out_histogram": self.checked_out_histogram.snapshot(),
+                "overflow_histogram": self.overflow_histogram.snapshot(),
+                "wait_seconds_histogram": self.wait_histogram.snapshot(),
+            }
+
+
+class _WaitTimingMixin:
+    """Замер времени ожидания соединения: у SQLAlchemy нет события начала checkout"""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.on_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Метрики всех движков процесса по имени
+registry: Dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(engine, name: str, slow_checkout_seconds: float) -> PoolMetrics:
+    """
+    Подключение сбора метрик к пулу движка
+
+    Счетчики соединений собираются из событий пула checkout/checkin,
+    время ожидания — пулами Instrumented*QueuePool (для NullPool не замеряется).
+
+    Args:
+        engine: Синхронный движок SQLAlchemy (для AsyncEngine — engine.sync_engine)
+        name: Имя пула в метриках
+        slow_checkout_seconds: Порог ожидания, после которого пишется предупреждение
+    """
+    metrics = PoolMetrics(name, slow_checkout_seconds)
+    registry[name] = metrics
+    pool = engine.pool
+    if isinstance(pool, _WaitTimingMixin):
+        pool.metrics = metrics
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        overflow = engine.pool.overflow() if hasattr(engine.pool, "overflow") else 0
+        metrics.on_checkout(overflow)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.on_checkin()
+
+    return metrics
+
+
+def pool_status() -> List[Dict[str, object]]:
+    """Снимок метрик всех пулов для эндпоинта мониторинга"""
+    return [{"pool": name, **metrics.snapshot()} for name, metrics in registry.items()]
@@ -0,0 +1,132 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import CityInDB, EventsCategoryInDB, NKOCategoryInDB
+from versions import get_versions
+
+# Таблицы справочников в table_versions. Кэш процесса сверяется с их счетчиками
+# при каждом чтении, поэтому изменения из любого воркера видны сразу и вместе
+# с новым ETag и новым ключом кэша ответов
+REFERENCE_TABLES = ("cities", "nko_categories", "events_categories")
+
+# Ключ Session.info со снимком, уже сверенным с версиями в текущей транзакции:
+# повторные обращения в одном запросе не читают table_versions
+REFERENCE_KEY = "reference_data"
+
+
+class ReferenceData:
+    """Снимок справочников: города, категории НКО и категории событий"""
+
+    def __init__(
+        self,
+        cities: List[Tuple[int, str]],
+        nko_categories: List[Tuple[int, str]],
+        event_categories: List[Tuple[int, str]],
+        versions: Dict[str, int],
+    ):
+        self.cities: Dict[int, str] = dict(cities)
+        self.city_ids: Dict[str, int] = {name: city_id for city_id, name in cities}
+        self.nko_categories: Dict[int, str] = dict(nko_categories)
+        self.nko_category_ids: Dict[str, int] = {name: category_id for category_id, name in nko_categories}
+        self.event_categories: Dict[int, str] = dict(event_categories)
+        self.event_category_ids: Dict[str, int] = {name: category_id for category_id, name in event_categories}
+        self.versions = versions
+
+    def city_ids_like(self, substring: str) -> List[int]:
+        """ID городов, в названии которых встречается подстрока (аналог ILIKE '%...%')"""
+        needle = substring.casefold()
+        return [city_id for city_id, name in self.cities.items() if needle in name.casefold()]
+
+
+_reference: Optional[ReferenceData] = None
+_lock = threading.Lock()
+
+
+def load_reference_data(db: Session, versions: Optional[Dict[str, int]] = None) -> ReferenceData:
+    """
+    Загрузка справочников из БД в кэш процесса
+
+    Версии читаются до справочников: если они изменятся между запросами,
+    снимок окажется помечен более старыми версиями и будет перечитан.
+
+    Args:
+        db: Сессия базы данных
+        versions: Уже прочитанные версии таблиц справочников
+
+    Returns:
+        Новый снимок справочников
+    """
+    global _reference
+    if versions is None:
+        versions = get_versions(db, REFERENCE_TABLES)
+    reference = ReferenceData(
+        cities=db.query(CityInDB.id, CityInDB.name).order_by(CityInDB.id).all(),
+        nko_categories=db.query(NKOCategoryInDB.id, NKOCategoryInDB.name).all(),
+        event_categories=db.query(EventsCategoryInDB.id, EventsCategoryInDB.name).all(),
+        versions=versions,
+    )
+    with _lock:
+        _reference = reference
+    db.info[REFERENCE_KEY] = reference
+    return reference
+
+
+def get_reference_data(db: Session) -> ReferenceData:
+    """
+    Справочники из кэша
+
+    Снимок сверяется со счетчиками справочников одним запросом к
+    table_versions по первичному ключу, один раз за транзакцию; если
+    счетчики изменились, справочники перечитываются.
+
+    Args:
+        db: Сессия базы данных
+    """
+    reference = db.info.get(REFERENCE_KEY)
+    if reference is not None:
+        return reference
+
+    versions = get_versions(db, REFERENCE_TABLES)
+    reference = _reference
+    if reference is None or reference.versions != versions:
+        return load_reference_data(db, versions)
+    db.info[REFERENCE_KEY] = reference
+    return reference
+
+
+def get_reference_data_with(db: Session, contains: Callable[[ReferenceData], bool]) -> ReferenceData:
+    """
+    Справочники для записи: при промахе кэша они перечитываются из БД
+
+    Город или категория, добавленные в БД без увеличения версии (например,
+    SQL-скриптом), в кэш сами не попадут. Для чтения это допустимо, а запись
+    не должна отвечать 404 на существующий город, поэтому промах
+    перепроверяется по свежему снимку (он же обновляет кэш).
+
+    Args:
+        db: Сессия базы данных
+        contains: Проверка, что в снимке есть все нужные записи
+
+    Returns:
+        Снимок справочников; если записей нет и в БД — свежий снимок без них
+    """
+    reference = get_reference_data(db)
+    if not contains(reference):
+        reference = load_reference_data(db)
+    return reference
+
+
+def invalidate_reference_data() -> None:
+    """Сброс кэша справочников процесса (следующее чтение загрузит их заново)"""
+    global _reference
+    with _lock:
+        _reference = None
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_checked_reference(session: Session) -> None:
+    session.info.pop(REFERENCE_KEY, None)
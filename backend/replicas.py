@@ -0,0 +1,95 @@
+import itertools
+import threading
+import time
+from typing import List, Sequence
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import settings
+from pool_metrics import PoolMetrics
+
+# Стратегии выбора реплики (настройка DB_READ_BALANCING)
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+
+# Cookie с моментом (unix time), до которого чтения клиента идут в основную БД
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# Методы, которые не меняют данные и не открывают окно read-your-writes
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReadReplica:
+    """Реплика для чтения: фабрика сессий и метрики ее пула соединений"""
+
+    def __init__(self, name: str, session_factory, metrics: PoolMetrics):
+        self.name = name
+        self.session_factory = session_factory
+        self.metrics = metrics
+
+
+class ReplicaBalancer:
+    """
+    Выбор реплики для очередного запроса чтения
+
+    round_robin — по кругу; least_connections — реплика с наименьшим числом
+    выданных соединений по метрикам пула (при равенстве — по кругу).
+    """
+
+    def __init__(self, replicas: Sequence[ReadReplica], strategy: str = ROUND_ROBIN):
+        if not replicas:
+            raise ValueError("At least one read replica is required")
+        if strategy not in (ROUND_ROBIN, LEAST_CONNECTIONS):
+            raise ValueError(f"Unknown read balancing strategy: {strategy}")
+        self.replicas: List[ReadReplica] = list(replicas)
+        self.strategy = strategy
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self) -> ReadReplica:
+        with self._lock:
+            start = next(self._counter) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        if self.strategy == LEAST_CONNECTIONS:
+            return min(ordered, key=lambda replica: replica.metrics.checked_out)
+        return ordered[0]
+
+
+def reads_from_primary(request: Request) -> bool:
+    """Открыто ли у клиента окно read-your-writes после собственной записи"""
+    try:
+        until = float(request.cookies.get(READ_PRIMARY_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """
+    Окно read-your-writes для чтения с реплик
+
+    После успешного изменяющего запроса клиент получает cookie, и в течение
+    DB_READ_YOUR_WRITES_SECONDS его чтения идут в основную БД, а не в реплику,
+    которая могла еще не получить запись. Cookie работает одинаково во всех
+    воркерах и не требует общего хранилища.
+    """
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        response = await call_next(request)
+        window = settings.db_read_your_writes_seconds
+        if (
+            settings.database_read_url_list
+            and window > 0
+            and request.method not in _SAFE_METHODS
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                READ_PRIMARY_COOKIE,
+                f"{time.time() + window:.3f}",
+                max_age=int(window) + 1,
+                httponly=True,
+                samesite="lax",
+            )
+        return response
@@ -0,0 +1,215 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+import database
+from config import settings
+from versions import SERVED_VERSIONS_KEY, etag_matches, get_versions
+
+logger = logging.getLogger(__name__)
+
+# Кэшируемые маршруты: путь -> (TTL в секундах, таблицы, от которых зависит ответ).
+# Набор таблиц совпадает с conditional_get соответствующего эндпоинта в main.py.
+CACHE_RULES: Dict[str, Tuple[int, Tuple[str, ...]]] = {
+    "/nko": (60, ("nko", "cities", "favorite_nko")),
+    "/event": (30, ("events", "nko", "cities", "favorite_events")),
+    "/news": (60, ("news", "cities", "favorite_news")),
+    "/city": (3600, ("cities",)),
+}
+
+# Заголовки ответа, которые сохраняются вместе с телом
+_STORED_HEADERS = ("content-type", "etag", "cache-control")
+
+
+class MemoryCacheBackend:
+    """
+    LRU-кэш в памяти процесса с ограничением суммарного размера записей
+
+    У каждого воркера свой кэш, но ключи строятся по версиям из table_versions,
+    поэтому запись через любой воркер сразу делает старые записи недоступными.
+    """
+
+    blocking = False  # Вызовы не ждут сети: выполняются прямо в цикле событий
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        entry_size = len(key) + len(value)
+        if entry_size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self.size += entry_size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(key) + len(entry[1])
+
+
+class RedisCacheBackend:
+    """
+    Кэш в Redis (или совместимом сервере): записи общие для всех воркеров
+
+    TTL и вытеснение обеспечивает сервер (maxmemory-policy allkeys-lru).
+    Клиент синхронный: middleware вызывает его в пуле потоков.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._client.set(key, value, ex=ttl)
+
+
+def create_backend(backend: str):
+    """Создание бэкенда кэша по настройке response_cache_backend"""
+    if backend == "redis":
+        return RedisCacheBackend(settings.redis_url)
+    if backend == "memory":
+        return MemoryCacheBackend(settings.response_cache_max_bytes)
+    return None
+
+
+cache_backend = create_backend(settings.response_cache_backend)
+
+
+def _is_personalized(request: Request) -> bool:
+    """Ответы с избранным пользователя не кэшируются"""
+    return bool(request.query_params.get("jwt_token")) or "authorization" in request.headers
+
+
+def _read_versions(tables: Tuple[str, ...]) -> Dict[str, int]:
+    """Версии таблиц из основной БД одним запросом по первичному ключу"""
+    db = database.SessionLocal()
+    try:
+        return get_versions(db, tables)
+    finally:
+        db.close()
+
+
+def _cache_key(request: Request, versions: Dict[str, int]) -> str:
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    state = ",".join(f"{table}:{version}" for table, version in sorted(versions.items()))
+    return f"cache:response:{request.url.path}?{query}|{state}"
+
+
+def _lookup(request: Request, tables: Tuple[str, ...]) -> Tuple[str, Dict[str, int], Optional[bytes]]:
+    """Ключ ответа по текущим версиям таблиц, сами версии и запись кэша по ключу"""
+    versions = _read_versions(tables)
+    key = _cache_key(request, versions)
+    return key, versions, cache_backend.get(key)
+
+
+def _served_at(request: Request, versions: Dict[str, int]) -> bool:
+    """
+    Собран ли ответ по тем же версиям таблиц, что и ключ кэша
+
+    Версии, с которыми работал эндпоинт, запоминает conditional_get. Реплика,
+    еще не получившая последнюю запись, видит более старые версии: такой
+    ответ отдается клиенту, но в кэш под новым ключом не попадает.
+    """
+    served = getattr(request.state, SERVED_VERSIONS_KEY, None)
+    return served is not None and all(served.get(table) == version for table, version in versions.items())
+
+
+async def _call_backend(function, *args):
+    """
+    Вызов бэкенда кэша из middleware
+
+    Сетевой бэкенд (Redis) вызывается в пуле потоков: медленный сервер
+    задерживает только этот запрос, а не весь цикл событий воркера.
+    """
+    if cache_backend.blocking:
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+
+def _encode_entry(response: Response, body: bytes) -> bytes:
+    headers = {name: response.headers[name] for name in _STORED_HEADERS if name in response.headers}
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def _decode_entry(entry: bytes) -> Tuple[Dict[str, str], bytes]:
+    headers, body = entry.split(b"\n", 1)
+    return json.loads(headers), body
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Кэш ответов публичных GET-эндпоинтов из CACHE_RULES
+
+    Ключ — путь, нормализованная строка запроса и версии таблиц ответа
+    из table_versions основной БД. Запись увеличивает версию в той же
+    транзакции, поэтому после коммита старые записи не читаются ни одним
+    воркером (и вытесняются по LRU или TTL).
+    """
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        rule = CACHE_RULES.get(request.url.path)
+        if cache_backend is None or rule is None or request.method != "GET" or _is_personalized(request):
+            return await call_next(request)
+
+        ttl, tables = rule
+        try:
+            # Чтение версий обращается к БД, поэтому выполняется в пуле потоков
+            key, versions, entry = await run_in_threadpool(_lookup, request, tables)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return await call_next(request)
+
+        if entry is not None:
+            headers, body = _decode_entry(entry)
+            headers["X-Cache"] = "HIT"
+            if "etag" in headers and etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+                return Response(status_code=304, headers=headers)
+            return Response(body, status_code=200, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if _served_at(request, versions):
+            try:
+                await _call_backend(cache_backend.set, key, _encode_entry(response, body), ttl)
+            except Exception as e:
+                logger.warning(f"Response cache store failed: {e}")
+
+        headers = dict(response.headers)
+        headers["X-Cache"] = "MISS"
+        return Response(body, status_code=200, headers=headers)
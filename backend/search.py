@@ -0,0 +1,231 @@
+import re
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Float, cast, func, literal_column
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Query
+
+# Конфигурация полнотекстового поиска PostgreSQL (русская морфология)
+SEARCH_CONFIG = "russian"
+
+# Параметры подсветки найденных фрагментов
+HEADLINE_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+# Минимальная длина литерала, из которого pg_trgm может извлечь триграмму
+MIN_TRIGRAM_LENGTH = 3
+
+# Больше повторений не меняют результат анализа: длины серий ограничены MIN_TRIGRAM_LENGTH
+_MAX_ANALYZED_REPEATS = MIN_TRIGRAM_LENGTH + 1
+
+_REGEX_QUANTIFIER = re.compile(r"\{(\d+)(,(\d*))?\}")
+
+
+def search_vector_expression(title_column: str, text_column: str) -> str:
+    """
+    SQL-выражение генерируемой колонки search_vector
+
+    Заголовок получает вес A, текст — вес B. Должно совпадать
+    с определением колонок в database/1_init.sql.
+    """
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({title_column}, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({text_column}, '')), 'B')"
+    )
+
+
+def _search_config():
+    """Конфигурация поиска как значение regconfig (константа, GIN-индекс применим)"""
+    return cast(literal_column(f"'{SEARCH_CONFIG}'"), REGCONFIG)
+
+
+def search_condition(search_vector, q: str):
+    """
+    Условие полнотекстового фильтра `search_vector @@ websearch_to_tsquery(q)` без ранга и сниппета
+
+    Используется выгрузкой (export.py), где порядок по релевантности не нужен.
+    """
+    return search_vector.op("@@")(func.websearch_to_tsquery(_search_config(), q))
+
+
+def apply_search(query: Query, search_vector, text_column, q: str) -> Tuple[Query, object]:
+    """
+    Добавление полнотекстового фильтра, ранга и сниппета к запросу
+
+    Фильтр `search_vector @@ tsquery` обслуживается GIN-индексом.
+    В запрос добавляются колонки `rank` и `snippet`. ts_rank возвращает
+    real, а ранг попадает в курсор пагинации, поэтому он приводится
+    к double precision: иначе значение из курсора не совпадет с рангом
+    строки и записи с одинаковым рангом на границе страниц задвоятся.
+
+    Args:
+        query: Исходный запрос
+        search_vector: Колонка tsvector сущности
+        text_column: Колонка, из которой строится сниппет
+        q: Поисковая строка в синтаксисе websearch_to_tsquery
+
+    Returns:
+        Запрос с фильтром и выражение ранга для сортировки
+    """
+    config = _search_config()
+    ts_query = func.websearch_to_tsquery(config, q)
+    rank = cast(func.ts_rank(search_vector, ts_query), Float)
+    snippet = func.ts_headline(config, func.coalesce(text_column, ""), ts_query, HEADLINE_OPTIONS)
+
+    query = (
+        query.filter(search_vector.op("@@")(ts_query))
+        .add_columns(rank.label("rank"), snippet.label("snippet"))
+    )
+    return query, rank
+
+
+# Анализ regex для триграммного индекса. Каждый вариант совпадения описывается
+# кортежем (префикс, суффикс, самая длинная серия, целиком литерал): длины серий
+# буквенно-цифровых символов, обязательно присутствующих в тексте, ограниченные
+# MIN_TRIGRAM_LENGTH. Поэтому множество вариантов любого узла мало
+_EMPTY = (0, 0, 0, True)
+_BREAK = (0, 0, 0, False)  # Символ, не входящий в триграммы: класс, точка, пунктуация
+
+
+def _cap(length: int) -> int:
+    return min(length, MIN_TRIGRAM_LENGTH)
+
+
+def _concat(left: set, right: set) -> set:
+    result = set()
+    for a_prefix, a_suffix, a_longest, a_full in left:
+        for b_prefix, b_suffix, b_longest, b_full in right:
+            prefix = _cap(a_prefix + b_prefix) if a_full else a_prefix
+            suffix = _cap(b_suffix + a_suffix) if b_full else b_suffix
+            longest = max(a_longest, b_longest, _cap(a_suffix + b_prefix), prefix, suffix)
+            result.add((prefix, suffix, longest, a_full and b_full))
+    return result
+
+
+def _repeat(node: set, low: int, high: Optional[int]) -> set:
+    """Варианты X{low,high}; high=None — без верхней границы"""
+    low = min(low, _MAX_ANALYZED_REPEATS)
+    high = _MAX_ANALYZED_REPEATS + low if high is None else min(high, low + _MAX_ANALYZED_REPEATS)
+    current = {_EMPTY}
+    for _ in range(low):
+        current = _concat(current, node)
+    result = set(current)
+    for _ in range(low, high):
+        current = _concat(current, node)
+        result |= current
+    return result
+
+
+class _RegexAnalyzer:
+    """Разбор регулярного выражения PostgreSQL (ARE) с альтернативами, группами и квантификаторами"""
+
+    def __init__(self, regex: str):
+        self.regex = regex
+        self.position = 0
+
+    def error(self):
+        raise HTTPException(status_code=400, detail="Некорректное регулярное выражение")
+
+    def peek(self) -> Optional[str]:
+        return self.regex[self.position] if self.position < len(self.regex) else None
+
+    def parse(self) -> set:
+        result = self.alternation()
+        if self.peek() is not None:
+            self.error()
+        return result
+
+    def alternation(self) -> set:
+        result = self.sequence()
+        while self.peek() == "|":
+            self.position += 1
+            result |= self.sequence()
+        return result
+
+    def sequence(self) -> set:
+        result = {_EMPTY}
+        while self.peek() not in (None, "|", ")"):
+            result = _concat(result, self.quantified(self.atom()))
+        return result
+
+    def quantified(self, node: set) -> set:
+        while True:
+            char = self.peek()
+            if char in ("?", "*", "+"):
+                self.position += 1
+                node = _repeat(node, 0 if char != "+" else 1, 1 if char == "?" else None)
+            elif char == "{" and (match := _REGEX_QUANTIFIER.match(self.regex, self.position)):
+                self.position = match.end()
+                low = int(match.group(1))
+                high = low if match.group(2) is None else (int(match.group(3)) if match.group(3) else None)
+                node = _repeat(node, low, high)
+            else:
+                return node
+            if self.peek() == "?":  # Ленивый квантификатор
+                self.position += 1
+
+    def atom(self) -> set:
+        char = self.regex[self.position]
+        self.position += 1
+        if char == "(":
+            lookaround = False
+            if self.regex.startswith("?", self.position):
+                lookaround = not self.regex.startswith("?:", self.position)
+                self.position += 2 if self.regex.startswith(("?:", "?=", "?!"), self.position) else 3
+            result = self.alternation()
+            if self.peek() != ")":
+                self.error()
+            self.position += 1
+            return {_EMPTY} if lookaround else result
+        if char == "[":
+            self.bracket()
+            return {_BREAK}
+        if char == "\\":
+            if self.position >= len(self.regex):
+                self.error()
+            escaped = self.regex[self.position]
+            self.position += 1
+            # \m, \M, \y, \Y, \A, \Z — границы, не занимающие символов
+            return {_EMPTY} if escaped in "mMyYAZ" else {_BREAK}
+        if char in ("^", "$"):
+            return {_EMPTY}
+        if char in ("*", "+", "?", ")"):
+            self.error()
+        return {(1, 1, 1, True)} if char.isalnum() else {_BREAK}
+
+    def bracket(self) -> None:
+        if self.peek() == "^":
+            self.position += 1
+        if self.peek() == "]":
+            self.position += 1
+        while self.peek() != "]":
+            if self.peek() is None:
+                self.error()
+            if self.regex.startswith(("[:", "[.", "[="), self.position):
+                end = self.regex.find(self.regex[self.position + 1] + "]", self.position + 2)
+                if end < 0:
+                    self.error()
+                self.position = end + 2
+            else:
+                self.position += 2 if self.peek() == "\\" else 1
+        self.position += 1
+
+
+def validate_trigram_regex(regex: str) -> str:
+    """
+    Проверка, что regex может быть обслужен триграммным индексом
+
+    Любое совпадение должно содержать обязательный литерал не короче
+    MIN_TRIGRAM_LENGTH символов подряд, иначе PostgreSQL выполнит полное
+    сканирование таблицы. Выражение разбирается с учетом групп,
+    альтернатив и квантификаторов: `(ab|cd)efg` подходит, а `(abc)?` — нет.
+
+    Raises:
+        HTTPException: Если выражение некорректно или слишком короткое для индекса
+    """
+    if any(longest < MIN_TRIGRAM_LENGTH for _, _, longest, _ in _RegexAnalyzer(regex).parse()):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Поисковое выражение должно содержать не менее {MIN_TRIGRAM_LENGTH} символов подряд",
+        )
+    return regex
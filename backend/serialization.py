@@ -0,0 +1,54 @@
+from typing import Any, List
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from city import CityResponse
+from clusters import ClusterResponse
+from event import EventPage
+from news import NewsPage
+from nko import NKOPage
+
+# Один TypeAdapter на тип спискового ответа: схема сериализации строится один раз при импорте
+NKO_PAGE = TypeAdapter(NKOPage)
+EVENT_PAGE = TypeAdapter(EventPage)
+NEWS_PAGE = TypeAdapter(NewsPage)
+CITY_LIST = TypeAdapter(List[CityResponse])
+CLUSTER_LIST = TypeAdapter(List[ClusterResponse])
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON-ответ, кодируемый orjson
+
+    Уже сериализованное тело (bytes из serialized_response) отдается как есть.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content)
+
+
+def serialized_response(adapter: TypeAdapter, value: Any, response: Response) -> ORJSONResponse:
+    """
+    Ответ списочного эндпоинта за один проход сериализации
+
+    Функции выборки уже возвращают провалидированные Pydantic-модели, поэтому
+    повторная проверка по response_model и jsonable_encoder не нужны: модели
+    сразу превращаются в JSON в pydantic-core. response_model у маршрута
+    остается для схемы OpenAPI.
+
+    Args:
+        adapter: TypeAdapter типа ответа (NKO_PAGE, CITY_LIST, ...)
+        value: Результат функции выборки
+        response: Response маршрута с заголовками, выставленными зависимостями (ETag)
+
+    Returns:
+        Готовый ответ; FastAPI отдает его без дополнительной обработки
+    """
+    result = ORJSONResponse(adapter.dump_json(value))
+    result.raw_headers.extend(response.headers.raw)
+    return result
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from city import fetch_cities, fetch_cities_async
+from conftest import register_text_search
+from database import Base, run_fetch
+from event import EventFilterRequest, fetch_events_async
+from nko import NKOFilterRequest, fetch_nko, fetch_nko_async, fetch_nko_by_id_async
+from news import NewsFilterRequest, fetch_news_async
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Файловая БД, чтобы синхронный и асинхронный движки видели одни данные
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    event.listen(engine, "connect", register_text_search)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_session_factory(engine):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{engine.url.database}")
+    event.listen(async_engine.sync_engine, "connect", register_text_search)
+    yield async_sessionmaker(async_engine, expire_on_commit=False)
+    asyncio.run(async_engine.dispose())
+
+
+def test_async_fetch_matches_sync(db, seed, async_session_factory):
+    seed(5)
+
+    async def fetch_all():
+        async with async_session_factory() as session:
+            return (
+                await fetch_nko_async(NKOFilterRequest(limit=3), session),
+                await fetch_nko_by_id_async(2, session),
+                await fetch_events_async(EventFilterRequest(), session),
+                await fetch_news_async(NewsFilterRequest(city="Пермь"), session),
+                await run_fetch(session, fetch_cities, fetch_cities_async, None),
+            )
+
+    nko_page, nko, events, news, cities = asyncio.run(fetch_all())
+
+    assert nko_page == fetch_nko(NKOFilterRequest(limit=3), db)
+    assert nko.name == "НКО 2"
+    assert len(events.items) == 5
+    assert len(news.items) == 5
+    assert [city.name for city in cities] == ["Пермь"]
+
+
+def test_run_fetch_uses_threadpool_for_sync_session(db, seed):
+    seed(2)
+
+    cities = asyncio.run(run_fetch(db, fetch_cities, fetch_cities_async, None))
+
+    assert [city.name for city in cities] == ["Пермь"]
+
+
+def test_async_time_filter_is_bound_as_datetime(db, seed, async_session_factory):
+    seed(5)
+    # Событие i идет с i:00 до (i + 2):00 UTC 1 января 2024; 06:00+03:00 — это 03:00 UTC
+    filters = EventFilterRequest(time_from="2024-01-01T06:00:00+03:00", time_to="2024-01-01T06:00:00")
+
+    async def fetch():
+        async with async_session_factory() as session:
+            return await fetch_events_async(filters, session)
+
+    assert isinstance(filters.time_from, datetime)
+    assert [event.id for event in asyncio.run(fetch()).items] == [4, 3]
+
+
+def test_invalid_time_filter_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        EventFilterRequest(time_from="вчера")
+
+    assert error.value.status_code == 400
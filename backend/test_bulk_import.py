@@ -0,0 +1,67 @@
+import io
+import json
+
+from bulk_import import ImportKind, bulk_import, read_records
+from event import EventFilterRequest, fetch_events
+from models import MapClusterInDB, NKOCategoriesLinkInDB, NKOInDB
+
+
+def _records(text, fmt):
+    return read_records(io.BytesIO(text.encode()), fmt)
+
+
+def test_nko_csv_import_resolves_references_and_reports_bad_rows(db, seed):
+    seed(2)
+    text = (
+        "name,address,city,latitude,longitude,categories,meta\n"
+        'Фонд 1,ул. Мира,Пермь,58.01,56.2,Помощь детям;Образование,"{""site"": ""fond.ru""}"\n'
+        "Фонд 2,ул. Мира,Казань,55.8,49.1,Образование,\n"
+        "Фонд 3,ул. Мира,Пермь,58.02,56.3,Спорт,\n"
+        "Фонд 4,ул. Мира,Пермь,,56.3,Образование,\n"
+        "Фонд 5,ул. Мира,Пермь,58.03,56.4,,\n"
+    )
+
+    report = bulk_import(ImportKind.nko, _records(text, "csv"), db)
+
+    assert (report.total, report.imported, report.failed) == (5, 2, 3)
+    assert [error.row for error in report.errors] == [2, 3, 4]
+    assert report.errors[0].error == "Город 'Казань' не найден"
+    assert report.errors[1].error == "Категория 'Спорт' не найдена"
+    assert report.errors[2].error.startswith("latitude:")
+
+    imported = db.query(NKOInDB).filter(NKOInDB.name.in_(["Фонд 1", "Фонд 5"])).order_by(NKOInDB.id).all()
+    assert [nko.meta for nko in imported] == [{"site": "fond.ru"}, None]
+    assert imported[0].coords == (58.01, 56.2)
+    assert db.query(NKOCategoriesLinkInDB).filter(NKOCategoriesLinkInDB.nko_id == imported[0].id).count() == 2
+    assert db.query(MapClusterInDB).filter(MapClusterInDB.layer == "nko", MapClusterInDB.zoom == 0).one().count == 2
+
+
+def test_event_jsonl_import_fills_event_feed(db, seed):
+    seed(2)
+    event = {
+        "nko_id": 1, "name": "Субботник", "city": "Пермь", "created_by": 1, "state": "approved",
+        "starts_at": "2025-05-01T10:00:00+00:00", "finish_at": "2025-05-01T12:00:00+00:00",
+        "categories": ["Экология"],
+    }
+    lines = [
+        json.dumps(event, ensure_ascii=False),
+        "",
+        json.dumps(dict(event, nko_id=99), ensure_ascii=False),
+        json.dumps(dict(event, state="deleted"), ensure_ascii=False),
+        json.dumps(dict(event, finish_at="2025-04-01T00:00:00+00:00"), ensure_ascii=False),
+        "{broken",
+        json.dumps(dict(event, finish_at="2025-08-01T00:00:00+00:00"), ensure_ascii=False),
+    ]
+
+    report = bulk_import(ImportKind.event, _records("\n".join(lines) + "\n", "jsonl"), db)
+
+    assert (report.total, report.imported) == (6, 1)
+    assert {error.row: error.error for error in report.errors} == {
+        3: "НКО с ID 99 не найдено",
+        4: "state: неизвестное состояние 'deleted'",
+        5: "finish_at раньше starts_at",
+        6: next(error.error for error in report.errors if error.row == 6),
+        7: "Событие не может длиться дольше 31 дн.",
+    }
+    items = fetch_events(EventFilterRequest(category=["Экология"]), db).items
+    assert [(item.name, item.categories) for item in items if item.name == "Субботник"] == [("Субботник", ["Экология"])]
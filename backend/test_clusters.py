@@ -0,0 +1,87 @@
+import io
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from bulk_import import ImportKind, bulk_import, read_records
+from clusters import MAX_CLUSTER_ZOOM, MapLayer, add_point, cell_for, fetch_clusters, remove_nko_events, remove_points
+from models import EventInDB, MapClusterInDB
+
+
+def test_cell_for_matches_tile_grid():
+    # На нулевом уровне 8x8 ячеек; Пермь — северо-восточный квадрант
+    assert cell_for(58.0, 56.0, 0) == (5, 2)
+    assert cell_for(-90, -180, 0) == (0, 7)
+
+
+def test_points_are_merged_into_clusters(db):
+    add_point(MapLayer.nko, 58.0, 56.0, db)
+    add_point(MapLayer.nko, 58.002, 56.004, db)
+    add_point(MapLayer.nko, 59.5, 60.5, db)
+    add_point(MapLayer.event, 58.0, 56.0, db)
+    db.commit()
+
+    # Каждая точка учитывается на всех уровнях масштаба
+    assert db.query(MapClusterInDB).filter(MapClusterInDB.layer == "nko").count() >= MAX_CLUSTER_ZOOM + 1
+
+    clusters = fetch_clusters(MapLayer.nko, "57,55,60,61", 0, db)
+    assert [cluster.count for cluster in clusters] == [3]
+    assert clusters[0].bbox == [58.0, 56.0, 59.5, 60.5]
+    assert clusters[0].latitude == pytest.approx((58.0 + 58.002 + 59.5) / 3)
+
+    counts = sorted(cluster.count for cluster in fetch_clusters(MapLayer.nko, "57,55,60,61", 6, db))
+    assert counts == [1, 2]
+
+
+def test_removed_points_leave_clusters(db):
+    add_point(MapLayer.event, 58.0, 56.0, db)
+    add_point(MapLayer.event, 58.5, 56.5, db)
+    remove_points(MapLayer.event, [(58.0, 56.0)], db)
+    db.commit()
+
+    clusters = fetch_clusters(MapLayer.event, "57,55,60,61", 4, db)
+    assert [cluster.count for cluster in clusters] == [1]
+    assert clusters[0].latitude == pytest.approx(58.5)
+
+    remove_points(MapLayer.event, [(58.5, 56.5)], db)
+    db.commit()
+    assert db.query(MapClusterInDB).count() == 0
+
+
+def test_large_viewport_is_rejected(db):
+    with pytest.raises(HTTPException) as error:
+        fetch_clusters(MapLayer.nko, "-80,-170,80,170", 12, db)
+
+    assert error.value.status_code == 400
+
+
+def test_only_approved_events_are_clustered(db, seed):
+    seed(1)
+    db.query(EventInDB).update({"coords": None})
+    db.commit()
+    event = {
+        "nko_id": 1, "name": "Субботник", "city": "Пермь", "created_by": 1, "categories": [],
+        "latitude": 58.0, "longitude": 56.0, "starts_at": "2030-01-01T10:00:00+00:00",
+    }
+    lines = [json.dumps(dict(event, state=state), ensure_ascii=False) for state in ("approved", "draft", "review")]
+
+    bulk_import(ImportKind.event, read_records(io.BytesIO("\n".join(lines).encode()), "jsonl"), db)
+
+    assert [cluster.count for cluster in fetch_clusters(MapLayer.event, "57,55,60,61", 4, db)] == [1]
+
+    # События НКО уходят из кластеров вместе с ним: неодобренные там и не учитывались
+    remove_nko_events(1, db)
+    db.commit()
+    assert fetch_clusters(MapLayer.event, "57,55,60,61", 4, db) == []
+
+
+def test_viewport_across_antimeridian_is_split(db):
+    add_point(MapLayer.nko, 65.0, 179.5, db)
+    add_point(MapLayer.nko, 65.0, -179.5, db)
+    add_point(MapLayer.nko, 65.0, 0.0, db)
+    db.commit()
+
+    clusters = fetch_clusters(MapLayer.nko, "60,170,70,-170", 3, db)
+
+    assert sorted(cluster.longitude for cluster in clusters) == [-179.5, 179.5]
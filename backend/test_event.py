@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from event import (
+    EventCreateRequest, EventFilterRequest, _event_upcoming_page_statement, create_event, fetch_event_by_id,
+    fetch_events, get_favorite_events
+)
+import security
+from event_feed import sync_event_feed
+from models import EventInDB, FavoriteEventsInDB
+
+
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_fetch_events_query_count_is_constant(db, seed, count_queries, count):
+    seed(count)
+
+    queries, events = count_queries(lambda: fetch_events(EventFilterRequest(), db).items)
+
+    assert len(events) == count
+    # Лента event_feed уже содержит НКО, город и категории: один запрос данных
+    # и сверка кэша справочников с table_versions
+    assert queries == 2
+    assert all(event.nko_name == f"НКО {event.id}" and event.city == "Пермь" for event in events)
+    assert all(len(event.categories) == 1 for event in events)
+
+
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_get_favorite_events_query_count_is_constant(db, seed, count_queries, count):
+    seed(count)
+
+    queries, events = count_queries(lambda: get_favorite_events(1, db))
+
+    assert len(events) == count
+    assert queries == 3
+
+
+def test_fetch_event_by_id_returns_categories(db, seed):
+    seed(3)
+
+    event = fetch_event_by_id(2, db)
+
+    assert event.name == "Событие 2"
+    assert event.categories == ["Спорт"]
+
+
+def test_list_rows_match_entity_responses(db, seed):
+    seed(4)
+
+    page = fetch_events(EventFilterRequest(), db)
+
+    assert page.items == [fetch_event_by_id(event.id, db) for event in page.items]
+    assert page.items[0].state == "approved"
+
+
+def _add_event(db, event_id, state, starts_in, finishes_in=None):
+    now = datetime.now(timezone.utc)
+    db.add(EventInDB(
+        id=event_id, nko_id=1, name=f"Событие {event_id}", city_id=1, created_by=1, state=state,
+        starts_at=now + starts_in, finish_at=now + finishes_in if finishes_in is not None else None,
+        created_at=now,
+    ))
+
+
+def test_upcoming_public_feed_orders_by_start(db, seed):
+    seed(3)  # События 2024 года уже прошли
+    _add_event(db, 10, "approved", timedelta(days=3))
+    _add_event(db, 11, "approved", timedelta(days=-1), timedelta(days=1))  # Идет сейчас
+    _add_event(db, 12, "draft", timedelta(days=2))
+    _add_event(db, 13, "approved", timedelta(days=1))
+    _add_event(db, 14, "approved", timedelta(days=-2), timedelta(days=-1))  # Уже закончилось
+    sync_event_feed([10, 11, 12, 13, 14], db)
+    db.commit()
+
+    first = fetch_events(EventFilterRequest(state="approved", upcoming=True, limit=2), db)
+    second = fetch_events(EventFilterRequest(state="approved", upcoming=True, limit=2, cursor=first.next_cursor), db)
+
+    assert [event.id for event in first.items + second.items] == [11, 13, 10]
+    assert second.next_cursor is None
+    assert {event.id for event in fetch_events(EventFilterRequest(upcoming=True), db).items} == {10, 11, 12, 13}
+
+
+def test_is_favorite_in_regular_and_upcoming_lists(db, seed, count_queries):
+    seed(2)
+    _add_event(db, 10, "approved", timedelta(days=1))
+    _add_event(db, 11, "approved", timedelta(days=2))
+    db.add(FavoriteEventsInDB(user_id=1, event_id=11))
+    db.query(FavoriteEventsInDB).filter(FavoriteEventsInDB.event_id == 2).delete()
+    sync_event_feed([10, 11], db)
+    db.commit()
+    token = security.create_access_token(data={"sub": "ivanov", "id": 1})
+
+    queries, events = count_queries(lambda: fetch_events(EventFilterRequest(jwt_token=token), db).items)
+    assert queries == 2
+    assert {event.id: event.is_favorite for event in events} == {1: True, 2: False, 10: False, 11: True}
+
+    upcoming = fetch_events(EventFilterRequest(jwt_token=token, state="approved", upcoming=True), db).items
+    assert [(event.id, event.is_favorite) for event in upcoming] == [(10, False), (11, True)]
+
+
+def test_state_filter_rejects_unknown_state(db, seed):
+    seed(1)
+
+    with pytest.raises(HTTPException) as error:
+        fetch_events(EventFilterRequest(state="deleted"), db)
+
+    assert error.value.status_code == 400
+
+
+def test_create_event_rejects_events_longer_than_upcoming_window(db, seed):
+    seed(1)
+    event = EventCreateRequest(
+        nko_id=1, name="Выставка", city="Пермь", created_by=1, state="approved", categories=["Спорт"],
+        starts_at="2025-05-01T10:00:00+00:00", finish_at="2025-07-01T10:00:00+00:00",
+    )
+
+    with pytest.raises(HTTPException) as error:
+        create_event(event, db)
+
+    assert error.value.status_code == 400
+    assert db.query(EventInDB).count() == 1
+
+
+def test_upcoming_page_keys_come_from_partial_index_columns():
+    statement = _event_upcoming_page_statement(False, False, True, False, False, False, False, True, False, True)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    inner = sql[sql.index("(SELECT"):sql.index(") AS page")]
+
+    # Состояние подставляется константой, подзапрос читает только колонки индекса
+    assert "event_feed.state = __[POSTCOMPILE_state]" in inner
+    assert inner.startswith("(SELECT event_feed.starts_at AS starts_at, event_feed.id AS id \nFROM event_feed \nWHERE")
+    assert "ORDER BY event_feed.starts_at ASC, event_feed.id ASC" in inner
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+from event import EventFilterRequest, delete_event, fetch_events
+from event_feed import REFRESH_OVERLAP, event_feed_status, refresh_event_feed, sync_event_feed
+from models import CityInDB, EventFeedInDB, EventInDB, EventsCategoriesLinkInDB, EventsCategoryInDB, NKOInDB
+
+
+def test_event_feed_follows_sync_and_delete(db, seed):
+    seed(3)
+    assert not event_feed_status(db).stale
+
+    db.add(EventInDB(
+        id=10, nko_id=1, name="Субботник", city_id=1, created_by=1, state="approved",
+        starts_at=datetime(2025, 2, 1, tzinfo=timezone.utc), created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    ))
+    db.add_all([EventsCategoriesLinkInDB(events_id=10, category_id=2), EventsCategoriesLinkInDB(events_id=10, category_id=1)])
+    sync_event_feed([10], db)
+    db.commit()
+
+    page = fetch_events(EventFilterRequest(category=["Экология"], limit=10), db)
+    assert page.items[0].id == 10
+    assert page.items[0].categories == ["Спорт", "Экология"]
+    assert page.items[0].nko_name == "НКО 1"
+
+    delete_event(10, db)
+    assert 10 not in [item.id for item in fetch_events(EventFilterRequest(limit=10), db).items]
+    assert not event_feed_status(db).stale
+
+
+def test_event_feed_status_reports_drift(db, seed):
+    seed(3)
+    db.query(EventFeedInDB).filter(EventFeedInDB.id == 1).delete()
+    db.query(EventInDB).filter(EventInDB.id == 2).delete()
+    db.commit()
+
+    status = event_feed_status(db)
+    assert (status.missing, status.orphaned, status.outdated, status.stale) == (1, 1, 0, True)
+    assert status.last_refreshed_at is not None
+
+
+def test_event_feed_status_reports_outdated_rows_until_refresh(db, seed):
+    seed(3)
+    # НКО переименована в обход бэкенда: строка ленты ее события устарела
+    db.query(NKOInDB).filter(NKOInDB.id == 1).update({"name": "НКО Один"})
+    db.commit()
+
+    status = event_feed_status(db)
+    assert (status.missing, status.orphaned, status.outdated, status.stale) == (0, 0, 1, True)
+
+    assert refresh_event_feed(db)[0] == 1
+    assert db.query(EventFeedInDB.nko_name).filter(EventFeedInDB.nko_id == 1).scalar() == "НКО Один"
+    assert not event_feed_status(db).stale
+    # Повторная сверка не трогает совпадающие строки
+    assert refresh_event_feed(db)[0] == 0
+
+
+def test_incremental_refresh_touches_only_changed_events(db, seed):
+    seed(3)
+    old = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for model in (EventInDB, NKOInDB, CityInDB, EventsCategoryInDB):
+        db.query(model).update({"updated_at": old})
+    db.commit()
+    changed, started_at = refresh_event_feed(db)
+    assert (changed, started_at is not None) == (0, True)
+
+    # Строка события 2 испорчена в обход бэкенда, а НКО события 1 переименована через ORM
+    db.query(EventFeedInDB).filter(EventFeedInDB.id == 2).update({"name": "Испорчено"})
+    db.query(NKOInDB).filter(NKOInDB.id == 1).update({"name": "НКО Один"})
+    db.commit()
+
+    assert refresh_event_feed(db, started_at - REFRESH_OVERLAP)[0] == 1
+    assert db.query(EventFeedInDB.nko_name).filter(EventFeedInDB.id == 1).scalar() == "НКО Один"
+    assert db.query(EventFeedInDB.name).filter(EventFeedInDB.id == 2).scalar() == "Испорчено"
+    # Полная сверка находит и строки, изменения которых не отмечены в updated_at
+    assert refresh_event_feed(db)[0] == 1
+    assert not event_feed_status(db).stale
@@ -0,0 +1,27 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+
+from event import EventCreateRequest, _event_page_statement
+from event_partitions import ensure_event_partition
+
+
+def test_time_to_filter_bounds_partition_key():
+    statement = _event_page_statement(False, False, False, False, True, True, False, False, False, False)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    # Оба конца диапазона ограничивают starts_at: PostgreSQL отсекает лишние секции
+    assert "event_feed.starts_at >= %(time_from)s" in sql
+    assert "event_feed.starts_at <= %(time_to)s" in sql
+    assert "event_feed.finish_at <= %(time_to)s" in sql
+
+
+def test_event_requires_starts_at():
+    with pytest.raises(ValidationError):
+        EventCreateRequest(nko_id=1, name="Субботник", city="Пермь", created_by=1, state="draft", categories=[])
+
+
+def test_ensure_partition_is_noop_outside_postgres(db, query_counter):
+    query_counter.reset()
+    ensure_event_partition("2030-01-01T10:00:00+00:00", db)
+    assert query_counter.count == 0
@@ -0,0 +1,73 @@
+import csv
+import io
+
+import orjson
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from event import EventFilterRequest
+from export import ExportKind, export_chunks, prepare_export
+from news import NewsFilterRequest
+from nko import NKOFilterRequest
+
+
+def _export(kind, filters, fmt, db, engine):
+    return list(export_chunks(prepare_export(kind, filters, db), fmt, sessionmaker(bind=engine)))
+
+
+def test_ndjson_export_streams_filtered_rows_in_batches(db, engine, seed, monkeypatch):
+    seed(5)
+    monkeypatch.setattr(settings, "export_batch_size", 2)
+
+    chunks = _export(ExportKind.event, EventFilterRequest(category=["Экология"], state="approved"), "ndjson", db, engine)
+
+    # События с нечетным ID в категории «Экология»: три строки, две пачки
+    assert len(chunks) == 2
+    rows = [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+    assert [(row["id"], row["categories"]) for row in rows] == [(1, ["Экология"]), (3, ["Экология"]), (5, ["Экология"])]
+    assert rows[0]["nko_name"] == "НКО 1"
+    assert rows[0]["starts_at"].startswith("2024-01-01T01:00:00")
+
+
+def test_csv_export_uses_bulk_import_layout(db, engine, seed):
+    seed(3)
+
+    nko = list(csv.DictReader(io.StringIO(b"".join(
+        _export(ExportKind.nko, NKOFilterRequest(city="Пермь"), "csv", db, engine)
+    ).decode())))
+    assert [row["name"] for row in nko] == ["НКО 1", "НКО 2", "НКО 3"]
+    assert nko[0]["city"] == "Пермь"
+    assert nko[0]["categories"] == "Помощь детям;Образование"
+    assert nko[0]["meta"] == ""
+
+    news = list(csv.DictReader(io.StringIO(b"".join(
+        _export(ExportKind.news, NewsFilterRequest(city="Пермь"), "csv", db, engine)
+    ).decode())))
+    assert [(row["title"], row["created_by"]) for row in news] == [
+        ("Новость 1", "Иванов Иван"), ("Новость 2", "Иванов Иван"), ("Новость 3", "Иванов Иван")
+    ]
+    assert news[0]["created_at"].startswith("2024-01-01T01:00:00")
+
+
+def test_empty_csv_export_has_header(db, engine, seed):
+    seed(1)
+
+    body = b"".join(_export(ExportKind.news, NewsFilterRequest(city="Казань"), "csv", db, engine))
+
+    assert body.decode().splitlines() == ["id,title,description,image,city,created_by,approved_by,meta,created_at"]
+
+
+def test_parquet_export_writes_row_group_per_batch(db, engine, seed, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    seed(5)
+    monkeypatch.setattr(settings, "export_batch_size", 2)
+
+    body = b"".join(_export(ExportKind.nko, NKOFilterRequest(), "parquet", db, engine))
+
+    parquet = pq.ParquetFile(io.BytesIO(body))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("categories").to_pylist()[0] == ["Помощь детям", "Образование"]
+    assert str(table.schema.field("created_at").type) == "timestamp[us, tz=UTC]"
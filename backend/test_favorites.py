@@ -0,0 +1,70 @@
+from favorites import FavoriteIds, add_favorites, favorites_contains, get_favorite_sets, remove_favorites
+from models import FavoriteEventsInDB, FavoriteNKOInDB
+from nko import add_nko_to_favorites, remove_nko_from_favorites
+from versions import bump_versions
+
+
+def test_contains_is_served_from_cache_validated_by_versions(db, seed, count_queries):
+    seed(3)
+    db.query(FavoriteNKOInDB).filter(FavoriteNKOInDB.nko_id == 2).delete()
+    db.commit()
+    ids = FavoriteIds(nko=[3, 2, 1, 99], event=[1], news=[])
+
+    queries, membership = count_queries(lambda: favorites_contains(1, ids, db))
+    assert queries == 2
+    assert membership.model_dump() == {"nko": [True, False, True, False], "event": [True], "news": []}
+
+    # Избранное не менялось: только сверка версий
+    queries, _ = count_queries(lambda: favorites_contains(1, ids, db))
+    assert queries == 1
+
+    add_nko_to_favorites(1, 2, db)
+    remove_nko_from_favorites(1, 3, db)
+
+    queries, membership = count_queries(lambda: favorites_contains(1, ids, db))
+    assert queries == 2
+    assert membership.nko == [False, True, True, False]
+
+
+def test_changes_from_other_workers_are_seen_without_waiting(db, seed):
+    seed(2)
+    assert get_favorite_sets(1, db).sets["nko"] == {1, 2}
+
+    # Другой воркер удалил запись из избранного в обход кэша этого процесса
+    db.query(FavoriteNKOInDB).filter(FavoriteNKOInDB.nko_id == 1).delete()
+    bump_versions(db, "favorite_nko")
+    db.commit()
+
+    assert get_favorite_sets(1, db).sets["nko"] == {2}
+
+
+def test_rolled_back_change_keeps_cached_snapshot(db, seed, count_queries):
+    seed(2)
+    get_favorite_sets(1, db)
+
+    db.query(FavoriteNKOInDB).filter(FavoriteNKOInDB.nko_id == 1).delete()
+    bump_versions(db, "favorite_nko")
+    db.rollback()
+
+    queries, sets = count_queries(lambda: get_favorite_sets(1, db))
+    assert (queries, sets.sets["nko"]) == (1, {1, 2})
+
+
+def test_batch_add_and_remove(db, seed):
+    seed(3)
+    db.query(FavoriteEventsInDB).delete()
+    db.commit()
+    get_favorite_sets(1, db)
+
+    added = add_favorites(1, FavoriteIds(nko=[1, 99], event=[2, 3, 42]), db)
+
+    assert added.changed.model_dump() == {"nko": [], "event": [2, 3], "news": []}
+    assert added.skipped.model_dump() == {"nko": [1, 99], "event": [42], "news": []}
+    assert {row.event_id for row in db.query(FavoriteEventsInDB)} == {2, 3}
+
+    removed = remove_favorites(1, FavoriteIds(nko=[1], event=[3, 1], news=[2]), db)
+
+    assert removed.changed.model_dump() == {"nko": [1], "event": [3], "news": [2]}
+    assert removed.skipped.model_dump() == {"nko": [], "event": [1], "news": []}
+    membership = favorites_contains(1, FavoriteIds(nko=[1, 2], event=[2, 3], news=[1, 2]), db)
+    assert membership.model_dump() == {"nko": [False, True], "event": [True, False], "news": [True, False]}
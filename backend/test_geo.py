@@ -0,0 +1,55 @@
+import pytest
+from fastapi import HTTPException
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from geo import EARTH_RADIUS_KM, apply_geo, parse_bbox, parse_near, radius_boxes
+from models import NKOInDB
+
+
+def test_parse_near_and_bbox():
+    assert parse_near("58.01, 56.25") == (58.01, 56.25)
+    assert parse_bbox("57.9,56.0,58.1,56.4") == (57.9, 56.0, 58.1, 56.4)
+
+
+@pytest.mark.parametrize("near", ["58.01", "abc,1", "91,0", "nan,1"])
+def test_invalid_near_is_rejected(near):
+    with pytest.raises(HTTPException) as error:
+        parse_near(near)
+
+    assert error.value.status_code == 400
+
+
+def test_radius_boxes_cover_circle():
+    [(min_lat, min_lon, max_lat, max_lon)] = radius_boxes(58.0, 56.0, 10)
+
+    # 10 км по меридиану — около 0.09 градуса, по параллели на 58° шире
+    assert max_lat - 58.0 == pytest.approx(10 / 111.32)
+    assert max_lon - 56.0 > max_lat - 58.0
+    assert (max_lat - 58.0) * 3.14159 / 180 * EARTH_RADIUS_KM >= 9.9
+
+
+def test_radius_boxes_split_at_antimeridian_and_cover_poles():
+    west, east = radius_boxes(65.0, 179.9, 50)
+    assert west[1] > 170 and west[3] == 180.0
+    assert east[1] == -180.0 and -180 < east[3] < -170
+
+    assert radius_boxes(89.9, 30.0, 50) == [(89.9 - 50 / 111.32, -180.0, 90.0, 180.0)]
+
+
+def test_near_orders_by_great_circle_distance():
+    statement, distance = apply_geo(select(NKOInDB.id), NKOInDB.coords, "58.0,56.0", 10, None)
+
+    sql = str(statement.order_by(distance).compile(dialect=postgresql.dialect()))
+
+    assert "<->" not in sql
+    assert "ORDER BY %(asin_1)s * asin(" in sql
+
+
+@pytest.mark.parametrize("radius_km", [None, 0, 501])
+def test_near_requires_capped_radius(radius_km):
+    with pytest.raises(HTTPException) as error:
+        apply_geo(select(NKOInDB.id), NKOInDB.coords, "58.0,56.0", radius_km, None)
+
+    assert error.value.status_code == 400
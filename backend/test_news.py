@@ -0,0 +1,56 @@
+import pytest
+
+import security
+from models import FavoriteNewsInDB
+from news import NewsFilterRequest, fetch_news, fetch_news_by_id, get_favorite_news
+
+
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_fetch_news_query_count_is_constant(db, seed, count_queries, count):
+    seed(count)
+
+    queries, news_list = count_queries(lambda: fetch_news(NewsFilterRequest(), db).items)
+
+    assert len(news_list) == count
+    # Один запрос данных и сверка кэша справочников с table_versions
+    assert queries == 2
+    assert all(news.city == "Пермь" and news.created_by == "Иванов Иван" for news in news_list)
+    assert all(news.approved_by == "Иванов Иван" for news in news_list)
+
+
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_favorite_news_filter_query_count_is_constant(db, seed, count_queries, count):
+    seed(count)
+    token = security.create_access_token(data={"sub": "ivanov", "id": 1})
+    filters = NewsFilterRequest(jwt_token=token, favorite=True)
+
+    queries, news_list = count_queries(lambda: fetch_news(filters, db).items)
+    assert len(news_list) == count
+    assert queries == 2
+
+    # Справочники уже сверены в этой транзакции
+    queries, news_list = count_queries(lambda: get_favorite_news(1, db))
+    assert len(news_list) == count
+    assert queries == 1
+
+
+def test_is_favorite_is_computed_in_the_list_query(db, seed, count_queries):
+    seed(3)
+    db.query(FavoriteNewsInDB).filter(FavoriteNewsInDB.news_id == 3).delete()
+    db.commit()
+    token = security.create_access_token(data={"sub": "ivanov", "id": 1})
+
+    queries, news_list = count_queries(lambda: fetch_news(NewsFilterRequest(jwt_token=token), db).items)
+
+    assert queries == 2
+    assert {news.id: news.is_favorite for news in news_list} == {1: True, 2: True, 3: False}
+    assert {news.is_favorite for news in fetch_news(NewsFilterRequest(), db).items} == {None}
+
+
+def test_fetch_news_by_id(db, seed):
+    seed(3)
+
+    news = fetch_news_by_id(2, db)
+
+    assert news.title == "Новость 2"
+    assert news.city == "Пермь"
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT
+
+import security
+from models import FavoriteNKOInDB
+from nko import NKOFilterRequest, _nko_page_statement, fetch_nko, fetch_nko_by_id, get_favorite_nko
+
+
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_fetch_nko_query_count_is_constant(db, seed, count_queries, count):
+    seed(count)
+
+    queries, nko_list = count_queries(lambda: fetch_nko(NKOFilterRequest(), db).items)
+
+    assert len(nko_list) == count
+    assert queries == 3
+    assert all(sorted(nko.categories) == ["Образование", "Помощь детям"] for nko in nko_list)
+
+
+def test_is_favorite_is_computed_in_the_page_query(db, seed, count_queries):
+    seed(3)
+    db.query(FavoriteNKOInDB).filter(FavoriteNKOInDB.nko_id == 2).delete()
+    db.commit()
+    token = security.create_access_token(data={"sub": "ivanov", "id": 1})
+
+    queries, nko_list = count_queries(lambda: fetch_nko(NKOFilterRequest(jwt_token=token), db).items)
+
+    assert queries == 3
+    assert {nko.id: nko.is_favorite for nko in nko_list} == {1: True, 2: False, 3: True}
+    assert {nko.is_favorite for nko in fetch_nko(NKOFilterRequest(), db).items} == {None}
+    assert {nko.is_favorite for nko in fetch_nko(NKOFilterRequest(jwt_token=token, favorite=True), db).items} == {True}
+
+
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_get_favorite_nko_query_count_is_constant(db, seed, count_queries, count):
+    seed(count)
+
+    queries, nko_list = count_queries(lambda: get_favorite_nko(1, db))
+
+    assert len(nko_list) == count
+    assert queries == 3
+
+
+def test_fetch_nko_by_id_returns_categories(db, seed):
+    seed(3)
+
+    nko = fetch_nko_by_id(2, db)
+
+    assert nko.name == "НКО 2"
+    assert nko.city == "Пермь"
+    assert sorted(nko.categories) == ["Образование", "Помощь детям"]
+
+
+def test_filter_combination_reuses_compiled_statement(db, seed, engine):
+    seed(3)
+    cache_hits = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT nko."):
+            cache_hits.append(context.cache_hit == CACHE_HIT)
+
+    fetch_nko(NKOFilterRequest(city="Пер", category=["Образование"]), db)
+    page = fetch_nko(NKOFilterRequest(city="мь", category=["Помощь детям"], limit=2), db)
+    fetch_nko(NKOFilterRequest(city="Пермь", category=["Образование"], cursor=page.next_cursor), db)
+
+    assert cache_hits == [False, True, False]
+    assert _nko_page_statement(True, True, False, False, False, False) is _nko_page_statement(True, True, False, False, False, False)
+
+
+def test_list_rows_match_entity_responses(db, seed):
+    seed(4)
+    db.expunge_all()
+
+    page = fetch_nko(NKOFilterRequest(), db)
+
+    # Список строится из строк без ORM-объектов
+    assert len(db.identity_map) == 0
+    assert page.items == [fetch_nko_by_id(nko.id, db) for nko in page.items]
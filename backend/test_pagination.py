@@ -0,0 +1,51 @@
+import pytest
+from fastapi import HTTPException
+
+from event import EventFilterRequest, fetch_events
+from news import NewsFilterRequest, fetch_news
+from nko import NKOFilterRequest, fetch_nko
+
+
+def _walk_pages(fetch, make_filters, db):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = fetch(make_filters(cursor), db)
+        ids.extend(item.id for item in page.items)
+        pages += 1
+        if page.next_cursor is None:
+            return ids, pages
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("fetch, filter_cls", [
+    (fetch_nko, NKOFilterRequest),
+    (fetch_events, EventFilterRequest),
+    (fetch_news, NewsFilterRequest),
+])
+def test_cursor_walks_all_rows_newest_first(db, seed, fetch, filter_cls):
+    seed(23)
+
+    ids, pages = _walk_pages(fetch, lambda cursor: filter_cls(limit=5, cursor=cursor), db)
+
+    assert ids == list(range(23, 0, -1))
+    assert pages == 5
+
+
+def test_deep_page_costs_the_same_as_first(db, seed, query_counter):
+    seed(30)
+    first = fetch_nko(NKOFilterRequest(limit=10), db)
+    second = fetch_nko(NKOFilterRequest(limit=10, cursor=first.next_cursor), db)
+
+    query_counter.reset()
+    fetch_nko(NKOFilterRequest(limit=10, cursor=second.next_cursor), db)
+
+    assert query_counter.count == 2
+
+
+def test_invalid_cursor_is_rejected(db, seed):
+    seed(1)
+
+    with pytest.raises(HTTPException) as error:
+        fetch_nko(NKOFilterRequest(cursor="not-a-cursor"), db)
+
+    assert error.value.status_code == 400
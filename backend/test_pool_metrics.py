@@ -0,0 +1,38 @@
+import logging
+import threading
+
+from sqlalchemy import create_engine
+
+from pool_metrics import Histogram, InstrumentedQueuePool, instrument_engine
+
+
+def test_histogram_buckets():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == {"buckets": {"le_1": 2, "le_5": 1, "le_inf": 1}, "sum": 14.5, "count": 4}
+
+
+def test_pool_events_and_slow_checkout_warning(tmp_path, caplog):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0
+    )
+    metrics = instrument_engine(engine, "test", slow_checkout_seconds=0.05)
+
+    first = engine.connect()
+    assert metrics.checked_out == 1
+
+    # Второй запрос ждет, пока первое соединение не вернется в пул
+    threading.Timer(0.1, first.close).start()
+    with caplog.at_level(logging.WARNING, logger="pool_metrics"):
+        with engine.connect():
+            assert metrics.checked_out == 1
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checked_out"] == 0
+    assert snapshot["slow_checkouts"] == 1
+    assert snapshot["wait_seconds_histogram"]["count"] == 2
+    assert snapshot["wait_seconds_histogram"]["sum"] >= 0.1
+    assert "Slow DB connection checkout on 'test' pool" in caplog.text
+    engine.dispose()
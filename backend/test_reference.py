@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+from city import CityCreateRequest, create_city, delete_city, fetch_cities, fetch_city_by_name
+from event import EventFilterRequest, fetch_events
+from models import CityInDB, NKOCategoryInDB
+from reference import get_reference_data, get_reference_data_with
+from versions import bump_versions
+
+
+def test_reference_reads_check_versions_once_per_transaction(db, seed, query_counter):
+    seed(2)
+    query_counter.reset()
+
+    assert [city.name for city in fetch_cities(None, db)] == ["Пермь"]
+    assert fetch_city_by_name("Пермь", db).id == 1
+    assert query_counter.count == 1
+
+
+def test_reference_changes_from_other_workers_are_seen_at_once(db, seed):
+    seed(1)
+    assert "Казань" not in get_reference_data(db).city_ids
+
+    # Другой воркер добавил город: кэш этого процесса о нем не знает, но версия cities выросла
+    db.add(CityInDB(id=2, name="Казань"))
+    bump_versions(db, "cities")
+    db.commit()
+
+    assert [city.name for city in fetch_cities(None, db)] == ["Пермь", "Казань"]
+
+
+def test_city_regex_is_matched_in_database(db, seed, query_counter):
+    seed(1)
+    query_counter.reset()
+
+    assert [city.name for city in fetch_cities("^пер", db)] == ["Пермь"]
+    assert fetch_cities("^каз", db) == []
+    assert query_counter.count == 2
+
+
+def test_writes_see_cities_and_categories_added_without_version_bump(db, seed, query_counter):
+    seed(1)
+    # Город и категория добавлены в обход API (без увеличения версий): в кэше их нет
+    db.add_all([CityInDB(id=2, name="Казань"), NKOCategoryInDB(id=3, name="Экология", created_at=datetime.now(timezone.utc))])
+    db.commit()
+    assert "Казань" not in get_reference_data(db).city_ids
+
+    reference = get_reference_data_with(
+        db, lambda reference: "Казань" in reference.city_ids and "Экология" in reference.nko_category_ids
+    )
+
+    assert (reference.city_ids["Казань"], reference.nko_category_ids["Экология"]) == (2, 3)
+    assert fetch_city_by_name("Казань", db).id == 2
+
+    # Известные записи не перечитывают справочники
+    query_counter.reset()
+    get_reference_data_with(db, lambda reference: "Пермь" in reference.city_ids)
+    assert query_counter.count == 0
+
+
+def test_city_changes_invalidate_cache(db, seed):
+    seed(1)
+
+    city = create_city(CityCreateRequest(name="Казань"), db)
+    assert fetch_city_by_name("Казань", db).id == city.id
+
+    delete_city(city.id, db)
+    assert [city.name for city in fetch_cities(None, db)] == ["Пермь"]
+
+
+def test_filters_resolve_names_through_cache(db, seed):
+    seed(4)
+
+    assert len(fetch_events(EventFilterRequest(city="Пермь"), db).items) == 4
+    assert fetch_events(EventFilterRequest(city="Казань"), db).items == []
+    # Событиям с нечетным ID назначена категория "Экология"
+    assert {event.id for event in fetch_events(EventFilterRequest(category=["Экология"]), db).items} == {1, 3}
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import database
+from config import settings
+from replicas import (
+    LEAST_CONNECTIONS,
+    READ_PRIMARY_COOKIE,
+    ReadReplica,
+    ReadYourWritesMiddleware,
+    ReplicaBalancer,
+    reads_from_primary,
+)
+
+
+class _Metrics:
+    def __init__(self, checked_out=0):
+        self.checked_out = checked_out
+
+
+def _request(cookie=None):
+    headers = [(b"cookie", f"{READ_PRIMARY_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "method": "GET", "path": "/nko", "headers": headers, "query_string": b""})
+
+
+def test_round_robin_and_least_connections():
+    replicas = [ReadReplica(f"replica-{i}", None, _Metrics()) for i in range(3)]
+
+    balancer = ReplicaBalancer(replicas)
+    assert [balancer.choose().name for _ in range(4)] == ["replica-0", "replica-1", "replica-2", "replica-0"]
+
+    replicas[0].metrics.checked_out = 2
+    replicas[2].metrics.checked_out = 1
+    balancer = ReplicaBalancer(replicas, LEAST_CONNECTIONS)
+    assert {balancer.choose().name for _ in range(3)} == {"replica-1"}
+
+    with pytest.raises(ValueError):
+        ReplicaBalancer(replicas, "random")
+
+
+def test_reads_from_primary_window():
+    assert not reads_from_primary(_request())
+    assert not reads_from_primary(_request("garbage"))
+    assert not reads_from_primary(_request(time.time() - 1))
+    assert reads_from_primary(_request(time.time() + 5))
+
+
+def test_write_opens_read_your_writes_window(monkeypatch):
+    monkeypatch.setattr(settings, "database_read_urls", "postgresql://replica/nko_db")
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.post("/write")(lambda: {"ok": True})
+    app.get("/read")(lambda: {"ok": True})
+    client = TestClient(app)
+
+    assert READ_PRIMARY_COOKIE not in client.get("/read").cookies
+    assert READ_PRIMARY_COOKIE not in client.post("/missing").cookies
+
+    until = float(client.post("/write").cookies[READ_PRIMARY_COOKIE])
+    assert 0 < until - time.time() <= settings.db_read_your_writes_seconds
+
+
+def test_fetch_session_goes_to_replica_outside_window(monkeypatch):
+    opened = []
+
+    class _Session:
+        def __init__(self, target):
+            self.target = target
+
+        def close(self):
+            pass
+
+    def factory(target):
+        return lambda: opened.append(target) or _Session(target)
+
+    replica = ReadReplica("replica-0", factory("replica"), _Metrics())
+    monkeypatch.setattr(database, "SessionLocal", factory("primary"))
+    monkeypatch.setattr(database, "AsyncSessionLocal", None)
+    monkeypatch.setattr(database, "read_replicas", ReplicaBalancer([replica]))
+
+    async def session_target(request):
+        dependency = database.get_fetch_db(request)
+        db = await dependency.__anext__()
+        await dependency.aclose()
+        return db.target
+
+    assert asyncio.run(session_target(_request())) == "replica"
+    assert asyncio.run(session_target(_request(time.time() + 5))) == "primary"
+    assert opened == ["replica", "primary"]
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from city import CityCreateRequest, create_city
+from conftest import register_text_search
+import database
+from database import get_fetch_db
+from main import app
+from models import Base, CityInDB
+import response_cache
+from response_cache import MemoryCacheBackend
+from versions import bump_versions
+
+
+@pytest.fixture
+def client(engine, db, monkeypatch):
+    monkeypatch.setattr(response_cache, "cache_backend", MemoryCacheBackend(max_bytes=1024 * 1024))
+    # Ключ кэша строится по версиям из основной БД
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    app.dependency_overrides[get_fetch_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_bytes=25)
+    backend.set("a", b"x" * 9, ttl=60)
+    backend.set("b", b"x" * 9, ttl=60)
+    backend.get("a")
+    backend.set("c", b"x" * 9, ttl=60)
+
+    assert backend.get("a") is not None
+    assert backend.get("b") is None
+    assert backend.size <= 25
+
+
+def test_repeated_request_is_served_from_cache(client, seed, query_counter):
+    seed(3)
+
+    first = client.get("/nko", params={"limit": 2, "city": "Пермь"})
+    assert first.headers["X-Cache"] == "MISS"
+
+    query_counter.reset()
+    second = client.get("/nko", params={"city": "Пермь", "limit": 2})
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    # Только сверка версий таблиц ответа
+    assert query_counter.count == 1
+
+
+def test_commit_invalidates_dependent_routes(client, db, seed):
+    seed(1)
+
+    client.get("/city")
+    client.get("/news")
+    create_city(CityCreateRequest(name="Казань"), db)
+
+    response = client.get("/city")
+    assert response.headers["X-Cache"] == "MISS"
+    assert [city["name"] for city in response.json()] == ["Пермь", "Казань"]
+    assert client.get("/news").headers["X-Cache"] == "MISS"
+
+
+def test_write_through_another_worker_changes_the_key(client, db, seed):
+    seed(1)
+    client.get("/city")
+
+    # Другой воркер добавил город: кэш этого процесса о записи не знает, версия cities выросла
+    db.add(CityInDB(id=2, name="Казань"))
+    bump_versions(db, "cities")
+    db.commit()
+
+    response = client.get("/city")
+    assert response.headers["X-Cache"] == "MISS"
+    assert [city["name"] for city in response.json()] == ["Пермь", "Казань"]
+
+
+def test_lagging_replica_response_is_not_cached(client, db, seed):
+    seed(1)
+    bump_versions(db, "cities")
+    db.commit()
+
+    # Реплика еще не получила увеличение версии cities
+    replica_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    event.listen(replica_engine, "connect", register_text_search)
+    Base.metadata.create_all(replica_engine)
+    replica = sessionmaker(bind=replica_engine)()
+    replica.add(CityInDB(id=1, name="Пермь"))
+    replica.commit()
+    app.dependency_overrides[get_fetch_db] = lambda: replica
+
+    assert client.get("/city").headers["X-Cache"] == "MISS"
+    assert client.get("/city").headers["X-Cache"] == "MISS"
+    assert response_cache.cache_backend.size == 0
+    replica.close()
+    replica_engine.dispose()
+
+
+def test_personalized_requests_bypass_cache(client, seed):
+    seed(1)
+
+    client.get("/nko", params={"favorite": True, "jwt_token": "token"})
+    response = client.get("/nko", params={"favorite": True, "jwt_token": "token"})
+
+    assert "X-Cache" not in response.headers
+
+
+class _BlockingBackend(MemoryCacheBackend):
+    """Бэкенд с сетевыми вызовами: запоминает, выполнялись ли они в цикле событий"""
+
+    blocking = True
+
+    def __init__(self):
+        super().__init__(max_bytes=1024 * 1024)
+        self.calls_in_event_loop = []
+
+    def _record(self):
+        try:
+            asyncio.get_running_loop()
+            self.calls_in_event_loop.append(True)
+        except RuntimeError:
+            self.calls_in_event_loop.append(False)
+
+    def get(self, key):
+        self._record()
+        return super().get(key)
+
+    def set(self, key, value, ttl):
+        self._record()
+        super().set(key, value, ttl)
+
+
+def test_blocking_backend_is_called_outside_event_loop(client, seed, monkeypatch):
+    seed(1)
+    backend = _BlockingBackend()
+    monkeypatch.setattr(response_cache, "cache_backend", backend)
+
+    client.get("/city")
+    assert client.get("/city").headers["X-Cache"] == "HIT"
+
+    assert backend.calls_in_event_loop == [False, False, False]
@@ -0,0 +1,70 @@
+import pytest
+from fastapi import HTTPException
+
+from event import EventFilterRequest, fetch_events
+from event_feed import sync_event_feed
+from models import EventInDB, NewsInDB, NKOInDB
+from news import NewsFilterRequest, fetch_news
+from nko import NKOFilterRequest, fetch_nko
+from search import validate_trigram_regex
+
+
+@pytest.mark.parametrize("regex", [
+    "дети", "Пермь|Москва", "эко.*акция", "helo?", "(ab|cd)efg", "(abc|d)ef", "[a|b]cde", "^(при|у)ют+$", "(ab){2}",
+])
+def test_regex_with_trigram_is_accepted(regex):
+    assert validate_trigram_regex(regex) == regex
+
+
+@pytest.mark.parametrize("regex", [
+    "ab", "a.c", "дети|я", "[abc]de", r"\w+", "(abc)?", "(дети|я)", "x(abc)*y", r"ab\.cd", "(abc", "a)",
+])
+def test_regex_without_trigram_is_rejected(regex):
+    with pytest.raises(HTTPException) as error:
+        validate_trigram_regex(regex)
+
+    assert error.value.status_code == 400
+
+
+# Сколько раз слово «приют» встречается в описании записи: ранг в поиске
+SHELTER_MENTIONS = {1: 1, 2: 3, 3: 0, 4: 2, 5: 2, 6: 2}
+
+
+def _describe_shelters(db, model):
+    for entity_id, mentions in SHELTER_MENTIONS.items():
+        description = " ".join(["приют"] * mentions + ["для", "животных"])
+        db.query(model).filter(model.id == entity_id).update({"description": description})
+    db.commit()
+
+
+@pytest.mark.parametrize("fetch, filter_cls, model", [
+    (fetch_nko, NKOFilterRequest, NKOInDB),
+    (fetch_events, EventFilterRequest, EventInDB),
+    (fetch_news, NewsFilterRequest, NewsInDB),
+])
+def test_search_orders_by_rank_and_pages_through_rank_ties(db, seed, fetch, filter_cls, model):
+    seed(6)
+    _describe_shelters(db, model)
+    sync_event_feed(list(SHELTER_MENTIONS), db)
+    db.commit()
+
+    ids, cursor = [], None
+    while True:
+        page = fetch(filter_cls(q="Приют", limit=2, cursor=cursor), db)
+        ids.extend(item.id for item in page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    # По убыванию ранга, при равном ранге — по убыванию ID; страница рвет группу 6, 5, 4
+    assert ids == [2, 6, 5, 4, 1]
+
+
+def test_search_item_has_snippet_but_not_rank(db, seed):
+    seed(3)
+    _describe_shelters(db, NKOInDB)
+
+    page = fetch_nko(NKOFilterRequest(q="приют"), db)
+
+    assert page.items[0].snippet == "приют приют приют для животных"
+    assert "rank" not in page.items[0].model_dump()
@@ -0,0 +1,22 @@
+import json
+
+from fastapi import Response
+
+from city import CityResponse
+from serialization import CITY_LIST, ORJSONResponse, serialized_response
+
+
+def test_serialized_response_keeps_dependency_headers():
+    response = Response()
+    response.headers["ETag"] = '"abc"'
+
+    result = serialized_response(CITY_LIST, [CityResponse(id=1, name="Пермь")], response)
+
+    assert json.loads(result.body) == [{"id": 1, "name": "Пермь"}]
+    assert result.headers["etag"] == '"abc"'
+    assert result.headers["content-type"] == "application/json"
+    assert int(result.headers["content-length"]) == len(result.body)
+
+
+def test_orjson_response_renders_plain_content():
+    assert ORJSONResponse({"status": "ok", "city": "Пермь"}).body == '{"status":"ok","city":"Пермь"}'.encode()
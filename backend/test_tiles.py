@@ -0,0 +1,117 @@
+import pytest
+from fastapi import HTTPException
+
+from clusters import MapLayer, add_point
+from tiles import TILE_EXTENT, _tile_pixel, build_tile, encode_layer, tile_bounds, tile_etag
+from versions import etag_matches
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def _fields(data):
+    """Минимальный разбор protobuf: список (номер поля, значение)"""
+    pos, fields = 0, []
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        if key & 7 == 2:
+            length, pos = _read_varint(data, pos)
+            fields.append((key >> 3, data[pos:pos + length]))
+            pos += length
+        else:
+            value, pos = _read_varint(data, pos)
+            fields.append((key >> 3, value))
+    return fields
+
+
+def _unpack(data):
+    pos, values = 0, []
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def test_encode_layer_produces_mvt_points():
+    tile = encode_layer("nko", [
+        (7, (100, 200), {"id": 7, "name": "НКО 7", "categories": "Образование"}),
+        (8, (-5, 4100), {"id": 8, "name": "НКО 8", "categories": "Образование"}),
+    ])
+
+    [(tile_field, layer_bytes)] = _fields(tile)
+    assert tile_field == 3
+    layer = {}
+    for number, value in _fields(layer_bytes):
+        layer.setdefault(number, []).append(value)
+
+    assert layer[15] == [2]
+    assert layer[1] == [b"nko"]
+    assert layer[5] == [TILE_EXTENT]
+    assert layer[3] == [b"id", b"name", b"categories"]
+    # Одинаковые значения атрибутов хранятся один раз
+    assert len(layer[4]) == 5
+
+    first = dict(_fields(layer[2][0]))
+    assert first[1] == 7
+    assert first[3] == 1  # POINT
+    assert _unpack(first[4]) == [9, 200, 400]  # MoveTo(1), zigzag(100), zigzag(200)
+    assert _unpack(dict(_fields(layer[2][1]))[4]) == [9, 9, 8200]
+
+
+def test_tile_geometry_helpers():
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(0, 0, 0)
+    assert (min_lon, max_lon) == (-180, 180)
+    assert max_lat == pytest.approx(85.0511, abs=1e-4)
+
+    assert _tile_pixel(0, 0, 0, 0, 0) == (TILE_EXTENT // 2, TILE_EXTENT // 2)
+    assert _tile_pixel(0, 0, 1, 1, 1) == (0, 0)
+
+
+def test_tile_etag_changes_only_for_affected_tiles(db):
+    # Пермь на 10-м уровне — тайл 671/308, Москва — далеко за его пределами
+    perm_before = tile_etag(MapLayer.nko, 10, 671, 308, db)
+    moscow_before = tile_etag(MapLayer.nko, 10, 619, 320, db)
+
+    add_point(MapLayer.nko, 58.0, 56.0, db)
+    db.commit()
+
+    assert tile_etag(MapLayer.nko, 10, 671, 308, db) != perm_before
+    assert tile_etag(MapLayer.nko, 10, 619, 320, db) == moscow_before
+    assert tile_etag(MapLayer.event, 10, 671, 308, db) == tile_etag(MapLayer.event, 10, 671, 308, db)
+
+
+def test_etag_matching_and_tile_validation(db):
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches(None, '"a"')
+
+    with pytest.raises(HTTPException) as error:
+        tile_etag(MapLayer.nko, 2, 4, 0, db)
+
+    assert error.value.status_code == 404
+
+
+def test_low_zoom_tile_holds_cluster_centroids(db):
+    for offset in range(5):
+        add_point(MapLayer.nko, 58.0 + offset / 1000, 56.0, db)
+    add_point(MapLayer.nko, 55.75, 37.6, db)
+    db.commit()
+
+    # Весь мир на нулевом уровне: два кластера вместо шести точек
+    [(_, layer_bytes)] = _fields(build_tile(MapLayer.nko, 0, 0, 0, db))
+    layer = {}
+    for number, value in _fields(layer_bytes):
+        layer.setdefault(number, []).append(value)
+
+    assert len(layer[2]) == 2
+    assert layer[3] == [b"count"]
+    assert sorted(dict(_fields(value))[5] for value in layer[4]) == [1, 5]
+    assert build_tile(MapLayer.event, 0, 0, 0, db) == b""
@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from city import CityCreateRequest, create_city
+from database import get_fetch_db
+import event
+from main import app
+from nko import remove_nko_from_favorites
+import response_cache
+from versions import bump_versions, get_versions
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    # Проверяем сами ETag, без кэша ответов поверх них
+    monkeypatch.setattr(response_cache, "cache_backend", None)
+    app.dependency_overrides[get_fetch_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_bump_versions_counts_writes(db):
+    bump_versions(db, "nko", "cities")
+    bump_versions(db, "nko")
+    db.commit()
+
+    assert get_versions(db, ["nko", "cities", "news"]) == {"nko": 2, "cities": 1, "news": 0}
+
+
+def test_unchanged_list_answers_304_with_single_query(client, db, seed, query_counter):
+    seed(3)
+
+    response = client.get("/city")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+
+    query_counter.reset()
+    response = client.get("/city", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert query_counter.count == 1
+
+    create_city(CityCreateRequest(name="Казань"), db)
+    response = client.get("/city", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_etag_depends_on_query_and_related_tables(client, db, seed):
+    seed(3)
+
+    etag = client.get("/nko", params={"limit": 2}).headers["ETag"]
+    assert client.get("/nko", params={"limit": 1}).headers["ETag"] != etag
+    assert client.get("/nko/1").headers["ETag"] != etag
+
+    remove_nko_from_favorites(1, 1, db)
+    assert client.get("/nko", params={"limit": 2}, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_upcoming_etag_expires_with_time(client, db, seed, monkeypatch):
+    seed(3)
+    now = 1_700_000_000.0
+    monkeypatch.setattr(event.time, "time", lambda: now)
+
+    etag = client.get("/event", params={"upcoming": "true"}).headers["ETag"]
+    plain_etag = client.get("/event").headers["ETag"]
+    assert client.get("/event", params={"upcoming": "true"}, headers={"If-None-Match": etag}).status_code == 304
+
+    # Данные не менялись, но события могли завершиться: 304 больше не отдается
+    now += event.UPCOMING_ETAG_SECONDS
+    assert client.get("/event", params={"upcoming": "true"}, headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/event", headers={"If-None-Match": plain_etag}).status_code == 304
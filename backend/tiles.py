@@ -0,0 +1,272 @@
+import hashlib
+import math
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from clusters import CLUSTER_CELL_SHIFT, MAX_CLUSTER_ZOOM, MAX_MERCATOR_LAT, MapLayer
+from event import _fetch_event_categories
+from geo import _box
+from models import EventInDB, EventsStates, MapClusterInDB, NKOInDB
+from nko import _fetch_nko_categories
+
+# Параметры тайлов Mapbox Vector Tile 2.1
+MAX_TILE_ZOOM = 22
+TILE_EXTENT = 4096
+# Запас вокруг тайла, чтобы значки у границы не обрезались при отрисовке
+TILE_BUFFER = 64
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+# Ограничение размера тайла: ниже MIN_POINT_TILE_ZOOM и при числе точек больше
+# MAX_TILE_FEATURES тайл содержит центроиды кластеров (не больше 8x8 на тайл)
+MIN_POINT_TILE_ZOOM = 10
+MAX_TILE_FEATURES = 1000
+
+# Номера полей сообщения Value и коды геометрии из спецификации MVT
+_VALUE_STRING = 1
+_VALUE_UINT = 5
+_GEOM_POINT = 1
+_CMD_MOVE_TO = 1
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 31)
+
+
+def _field_varint(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _field_bytes(number: int, payload: bytes) -> bytes:
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: List[int]) -> bytes:
+    return _field_bytes(number, b"".join(_varint(value) for value in values))
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Границы тайла в градусах: (min_lat, min_lon, max_lat, max_lon)"""
+    n = 2 ** z
+
+    def lat(row: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
+
+def _tile_pixel(latitude: float, longitude: float, z: int, x: int, y: int) -> Tuple[int, int]:
+    """Координаты точки в системе тайла (0..TILE_EXTENT, ось y направлена вниз)"""
+    n = 2 ** z
+    lat = math.radians(max(min(latitude, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT))
+    world_x = (longitude + 180) / 360 * n
+    world_y = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n
+    return round((world_x - x) * TILE_EXTENT), round((world_y - y) * TILE_EXTENT)
+
+
+def encode_layer(name: str, features: List[Tuple[int, Tuple[int, int], Dict[str, object]]]) -> bytes:
+    """
+    Кодирование точечного слоя в формат Mapbox Vector Tile
+
+    Args:
+        name: Имя слоя
+        features: Список (id, (px, py), атрибуты); атрибуты — строки или неотрицательные целые
+
+    Returns:
+        Сообщение Tile с одним слоем
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[int, object], int] = {}
+    encoded_features = []
+
+    for feature_id, (px, py), properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            value_type = _VALUE_UINT if isinstance(value, int) else _VALUE_STRING
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((value_type, value), len(values)))
+
+        geometry = [_CMD_MOVE_TO | 1 << 3, _zigzag(px), _zigzag(py)]
+        encoded_features.append(_field_bytes(2, (
+            _field_varint(1, feature_id)
+            + _packed(2, tags)
+            + _field_varint(3, _GEOM_POINT)
+            + _packed(4, geometry)
+        )))
+
+    layer = _field_varint(15, 2) + _field_bytes(1, name.encode())
+    layer += b"".join(encoded_features)
+    layer += b"".join(_field_bytes(3, key.encode()) for key in keys)
+    for value_type, value in values:
+        if value_type == _VALUE_UINT:
+            layer += _field_bytes(4, _field_varint(_VALUE_UINT, value))
+        else:
+            layer += _field_bytes(4, _field_bytes(_VALUE_STRING, str(value).encode()))
+    layer += _field_varint(5, TILE_EXTENT)
+
+    return _field_bytes(3, layer)
+
+
+def _validate_tile(z: int, x: int, y: int) -> None:
+    if not 0 <= z <= MAX_TILE_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail=f"Тайл {z}/{x}/{y} не существует")
+
+
+def tile_etag(layer: MapLayer, z: int, x: int, y: int, db: Session) -> str:
+    """
+    ETag тайла по состоянию ячеек сетки кластеров, которые его покрывают
+
+    Ячейка кластера уровня zoom — это тайл уровня zoom + CLUSTER_CELL_SHIFT,
+    поэтому изменение точки меняет ETag только у тайлов, в которые она попадает
+    (на крупных масштабах — у соседей по общей ячейке самого детального уровня).
+    Диапазон расширен на ячейку в каждую сторону, чтобы учесть точки из TILE_BUFFER.
+    """
+    _validate_tile(z, x, y)
+
+    zoom = min(max(z - CLUSTER_CELL_SHIFT, 0), MAX_CLUSTER_ZOOM)
+    shift = zoom + CLUSTER_CELL_SHIFT - z
+    if shift >= 0:
+        min_x, max_x = x << shift, ((x + 1) << shift) - 1
+        min_y, max_y = y << shift, ((y + 1) << shift) - 1
+    else:
+        min_x = max_x = x >> -shift
+        min_y = max_y = y >> -shift
+
+    state = (
+        db.query(
+            func.count(),
+            func.max(MapClusterInDB.version),
+            func.sum(MapClusterInDB.count),
+            func.sum(MapClusterInDB.sum_lat),
+            func.sum(MapClusterInDB.sum_lon),
+        )
+        .filter(
+            MapClusterInDB.layer == layer.value,
+            MapClusterInDB.zoom == zoom,
+            MapClusterInDB.cell_x.between(min_x - 1, max_x + 1),
+            MapClusterInDB.cell_y.between(min_y - 1, max_y + 1),
+        )
+        .one()
+    )
+    digest = hashlib.sha1(repr((layer.value, z, x, y, *state)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _cluster_features(layer: MapLayer, z: int, x: int, y: int, db: Session) -> List[Tuple[int, Tuple[int, int], Dict[str, object]]]:
+    """
+    Центроиды кластеров внутри тайла: ячейки уровня z, т.е. 8x8 ячеек на тайл
+
+    На уровнях больше MAX_CLUSTER_ZOOM берутся ячейки самого детального уровня.
+    Атрибут count — число точек кластера; id — номер ячейки в сетке уровня.
+    """
+    zoom = min(z, MAX_CLUSTER_ZOOM)
+    shift = zoom + CLUSTER_CELL_SHIFT - z
+    min_x, max_x = x << shift, ((x + 1) << shift) - 1
+    min_y, max_y = y << shift, ((y + 1) << shift) - 1
+    width = 2 ** (zoom + CLUSTER_CELL_SHIFT)
+
+    rows = (
+        db.query(MapClusterInDB)
+        .filter(
+            MapClusterInDB.layer == layer.value,
+            MapClusterInDB.zoom == zoom,
+            MapClusterInDB.cell_x.between(min_x, max_x),
+            MapClusterInDB.cell_y.between(min_y, max_y),
+            MapClusterInDB.count > 0,
+        )
+        .all()
+    )
+    return [
+        (
+            cluster.cell_y * width + cluster.cell_x,
+            _tile_pixel(cluster.sum_lat / cluster.count, cluster.sum_lon / cluster.count, z, x, y),
+            {"count": cluster.count},
+        )
+        for cluster in rows
+    ]
+
+
+def build_tile(layer: MapLayer, z: int, x: int, y: int, db: Session) -> bytes:
+    """
+    Генерация векторного тайла с точками НКО или событий
+
+    Размер тайла не зависит от размера каталога: на уровнях ниже
+    MIN_POINT_TILE_ZOOM, а также если в тайл попадает больше
+    MAX_TILE_FEATURES точек, вместо точек отдаются центроиды кластеров
+    из map_clusters. Слой событий содержит только одобренные события.
+
+    Args:
+        layer: Слой карты (nko или event)
+        z, x, y: Координаты тайла
+        db: Сессия базы данных
+
+    Returns:
+        Тайл в формате MVT; пустой тайл — пустые байты
+    """
+    _validate_tile(z, x, y)
+
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y)
+    lat_buffer = (max_lat - min_lat) * TILE_BUFFER / TILE_EXTENT
+    lon_buffer = (max_lon - min_lon) * TILE_BUFFER / TILE_EXTENT
+    box = _box(min_lat - lat_buffer, min_lon - lon_buffer, max_lat + lat_buffer, max_lon + lon_buffer)
+
+    try:
+        if z < MIN_POINT_TILE_ZOOM:
+            features = _cluster_features(layer, z, x, y, db)
+            return encode_layer(layer.value, features) if features else b""
+
+        if layer == MapLayer.nko:
+            query = (
+                db.query(NKOInDB.id, NKOInDB.name, NKOInDB.coords)
+                .filter(NKOInDB.coords.op("<@")(box))
+                .order_by(NKOInDB.id)
+            )
+        else:
+            query = (
+                db.query(EventInDB.id, EventInDB.name, EventInDB.coords)
+                .filter(EventInDB.coords.op("<@")(box), EventInDB.state == EventsStates.approved)
+                .order_by(EventInDB.id)
+            )
+        rows = query.limit(MAX_TILE_FEATURES + 1).all()
+
+        if len(rows) > MAX_TILE_FEATURES:
+            if z <= MAX_CLUSTER_ZOOM + CLUSTER_CELL_SHIFT:
+                features = _cluster_features(layer, z, x, y, db)
+                return encode_layer(layer.value, features) if features else b""
+            # Точнее сетки кластеров разбить нельзя: тайл обрезается
+            rows = rows[:MAX_TILE_FEATURES]
+
+        fetch_categories = _fetch_nko_categories if layer == MapLayer.nko else _fetch_event_categories
+        categories = fetch_categories([row.id for row in rows], db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if not rows:
+        return b""
+
+    features = [
+        (
+            row.id,
+            _tile_pixel(*row.coords, z, x, y),
+            {"id": row.id, "name": row.name, "categories": ",".join(categories.get(row.id, []))},
+        )
+        for row in rows
+    ]
+    return encode_layer(layer.value, features)
@@ -0,0 +1,98 @@
+import hashlib
+from typing import Callable, Dict, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import FetchSession, dialect_insert, get_fetch_db
+from models import TableVersionInDB
+
+# Атрибут request.state с версиями таблиц, по которым собран ответ (для кэша ответов)
+SERVED_VERSIONS_KEY = "table_versions"
+
+
+def bump_versions(db: Session, *tables: str) -> None:
+    """
+    Увеличение счетчиков изменений таблиц
+
+    Вызывается в транзакции записи перед коммитом, поэтому новый ETag
+    и новый ключ кэша ответов становятся видны одновременно с изменившимися
+    данными.
+
+    Args:
+        db: Сессия базы данных
+        tables: Имена измененных таблиц
+    """
+    statement = dialect_insert(db, TableVersionInDB).values(
+        [{"name": table, "version": 1} for table in tables]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[TableVersionInDB.name],
+        set_={"version": TableVersionInDB.version + 1},
+    )
+    db.execute(statement)
+
+
+def get_versions(db: Session, tables: Sequence[str]) -> Dict[str, int]:
+    """Текущие счетчики изменений таблиц одним запросом по первичному ключу"""
+    rows = (
+        db.query(TableVersionInDB.name, TableVersionInDB.version)
+        .filter(TableVersionInDB.name.in_(tables))
+        .all()
+    )
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows)
+    return versions
+
+
+def compute_etag(request: Request, versions: Dict[str, int]) -> str:
+    """Сильный ETag по пути, нормализованной строке запроса и версиям таблиц"""
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    state = ";".join(f"{table}:{version}" for table, version in sorted(versions.items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}|{state}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка заголовка If-None-Match против ETag ресурса"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def conditional_get(*tables: str, time_bucket: Optional[Callable[[Request], Optional[int]]] = None) -> Callable:
+    """
+    Зависимость FastAPI для условных GET-запросов
+
+    ETag ответа зависит только от запроса и версий перечисленных таблиц,
+    поэтому проверка If-None-Match стоит одного запроса к table_versions:
+    при совпадении возвращается 304 без выборки данных и сериализации.
+
+    Пример:
+        @app.get("/city", dependencies=[Depends(conditional_get("cities"))])
+
+    Args:
+        tables: Таблицы, от которых зависит ответ эндпоинта
+        time_bucket: Для ответов, которые меняются со временем без записи в таблицы:
+            номер текущего интервала времени (входит в ETag) или None для остальных запросов
+    """
+
+    async def dependency(request: Request, response: Response, db: FetchSession = Depends(get_fetch_db)) -> None:
+        if isinstance(db, AsyncSession):
+            versions = await db.run_sync(get_versions, tables)
+        else:
+            versions = await run_in_threadpool(get_versions, db, tables)
+        setattr(request.state, SERVED_VERSIONS_KEY, versions)
+        bucket = time_bucket(request) if time_bucket else None
+        if bucket is not None:
+            versions = {**versions, "time": bucket}
+        etag = compute_etag(request, versions)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+    return dependency
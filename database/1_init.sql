@@ -11,6 +11,16 @@ BEGIN
     END LOOP;
 END
 $$;
+DROP SCHEMA IF EXISTS events_archive CASCADE;
+
+-- Время последнего изменения строки (updated_at) для таблиц, из которых собирается
+-- лента событий: по нему фоновая сверка ленты берет только изменившиеся события
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
 
 -- Категории НКО
 CREATE TABLE IF NOT EXISTS nko_categories (
@@ -22,9 +32,13 @@ CREATE TABLE IF NOT EXISTS nko_categories (
 -- 
 CREATE TABLE IF NOT EXISTS cities (
     id SMALLSERIAL PRIMARY KEY,
-    name VARCHAR(100) NOT NULL UNIQUE
+    name VARCHAR(100) NOT NULL UNIQUE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
+CREATE TRIGGER cities_touch_updated_at BEFORE UPDATE ON cities
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
 -- Организации (НКО)
 CREATE TABLE IF NOT EXISTS nko (
     id BIGSERIAL PRIMARY KEY,
@@ -36,9 +50,18 @@ CREATE TABLE IF NOT EXISTS nko (
     coords POINT NOT NULL,
     meta JSONB,
     created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    ) STORED,
     FOREIGN KEY (city_id) REFERENCES cities(id)
 );
 
+CREATE TRIGGER nko_touch_updated_at BEFORE UPDATE ON nko
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE INDEX IF NOT EXISTS nko_updated_at_idx ON nko (updated_at);
+
 -- Связующая таблица для НКО и их категорий
 CREATE TABLE IF NOT EXISTS nko_categories_link (
     nko_id BIGINT NOT NULL,
@@ -76,16 +99,22 @@ CREATE TABLE IF NOT EXISTS nko_users_link (
 CREATE TABLE IF NOT EXISTS events_categories (
     id SMALLSERIAL PRIMARY KEY,
     name VARCHAR(100) NOT NULL UNIQUE,
-    description VARCHAR(255) NOT NULL UNIQUE -- Увеличена длина для соответствия данным
+    description VARCHAR(255) NOT NULL UNIQUE, -- Увеличена длина для соответствия данным
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
+CREATE TRIGGER events_categories_touch_updated_at BEFORE UPDATE ON events_categories
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
 -- Перечисление для состояний мероприятий
 DROP TYPE IF EXISTS events_states;
 CREATE TYPE events_states AS ENUM ('draft', 'approved', 'rejected', 'review');
 
--- Мероприятия
+-- Мероприятия, секционированные по месяцам starts_at (секции events_pYYYY_MM,
+-- см. ensure_events_partition и maintain_events_partitions ниже). Ключ секционирования
+-- входит в первичный ключ, поэтому ссылки на событие хранят и его starts_at.
 CREATE TABLE IF NOT EXISTS events (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     nko_id BIGINT NOT NULL,
     name VARCHAR(255) NOT NULL,
     description TEXT,
@@ -93,28 +122,74 @@ CREATE TABLE IF NOT EXISTS events (
     city_id SMALLINT NOT NULL,
     picture TEXT,
     coords POINT,
-    starts_at TIMESTAMPTZ,
+    starts_at TIMESTAMPTZ NOT NULL,
     finish_at TIMESTAMPTZ,
     created_by BIGINT NOT NULL,
     approved_by BIGINT,
     state events_states NOT NULL,
     meta TEXT,
     created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    ) STORED,
+    PRIMARY KEY (id, starts_at),
+    -- Фильтр finish_at <= time_to дополняется условием starts_at <= time_to для отсечения секций
+    CHECK (finish_at IS NULL OR finish_at >= starts_at),
     FOREIGN KEY (nko_id) REFERENCES nko(id) ON DELETE CASCADE,
     FOREIGN KEY (city_id) REFERENCES cities(id),
     FOREIGN KEY (approved_by) REFERENCES users(id),
     FOREIGN KEY (created_by) REFERENCES users(id)
-);
+) PARTITION BY RANGE (starts_at);
+
+CREATE TRIGGER events_touch_updated_at BEFORE UPDATE ON events
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE INDEX IF NOT EXISTS events_updated_at_idx ON events (updated_at);
+
+-- Заполнение event_starts_at в таблицах, ссылающихся на events: приложение
+-- и загрузка данных передают только ID события. Аргумент триггера — колонка с ID.
+CREATE OR REPLACE FUNCTION fill_event_starts_at() RETURNS trigger AS $$
+BEGIN
+    IF NEW.event_starts_at IS NULL THEN
+        SELECT starts_at INTO NEW.event_starts_at
+        FROM events
+        WHERE id = (to_jsonb(NEW) ->> TG_ARGV[0])::bigint;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
 
 -- Связующая таблица для мероприятий и их категорий
 CREATE TABLE IF NOT EXISTS events_categories_link (
     events_id BIGINT NOT NULL,
+    event_starts_at TIMESTAMPTZ NOT NULL,
     category_id SMALLINT NOT NULL,
     PRIMARY KEY (events_id, category_id),
-    FOREIGN KEY (events_id) REFERENCES events(id) ON DELETE CASCADE,
+    FOREIGN KEY (events_id, event_starts_at) REFERENCES events(id, starts_at) ON DELETE CASCADE ON UPDATE CASCADE,
     FOREIGN KEY (category_id) REFERENCES events_categories(id) ON DELETE RESTRICT
 );
 
+CREATE TRIGGER events_categories_link_fill_starts_at
+    BEFORE INSERT ON events_categories_link
+    FOR EACH ROW EXECUTE FUNCTION fill_event_starts_at('events_id');
+
+-- Изменение категорий события отмечается в events.updated_at
+CREATE OR REPLACE FUNCTION touch_linked_event() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE events SET updated_at = now() WHERE id = OLD.events_id AND starts_at = OLD.event_starts_at;
+        RETURN OLD;
+    END IF;
+    UPDATE events SET updated_at = now() WHERE id = NEW.events_id AND starts_at = NEW.event_starts_at;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER events_categories_link_touch_event
+    AFTER INSERT OR UPDATE OR DELETE ON events_categories_link
+    FOR EACH ROW EXECUTE FUNCTION touch_linked_event();
+
 
 -- Таблица избранных новостей
 CREATE TABLE IF NOT EXISTS favorite_news (
@@ -128,11 +203,19 @@ CREATE TABLE IF NOT EXISTS favorite_news (
 CREATE TABLE IF NOT EXISTS favorite_events (
     user_id BIGINT NOT NULL,
     event_id BIGINT NOT NULL,
+    event_starts_at TIMESTAMPTZ NOT NULL,
     PRIMARY KEY (user_id, event_id),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+    FOREIGN KEY (event_id, event_starts_at) REFERENCES events(id, starts_at) ON DELETE CASCADE ON UPDATE CASCADE
 );
 
+CREATE TRIGGER favorite_events_fill_starts_at
+    BEFORE INSERT ON favorite_events
+    FOR EACH ROW EXECUTE FUNCTION fill_event_starts_at('event_id');
+
+-- Каскадное удаление и архивирование событий ищут избранное по событию
+CREATE INDEX IF NOT EXISTS favorite_events_event_idx ON favorite_events (event_id, event_starts_at);
+
 -- Таблица избранных НКО
 CREATE TABLE IF NOT EXISTS favorite_nko (
     user_id BIGINT NOT NULL,
@@ -153,7 +236,277 @@ CREATE TABLE IF NOT EXISTS news (
     approved_by BIGINT,
     meta TEXT,
     created_at TIMESTAMPTZ DEFAULT now(),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    ) STORED,
     FOREIGN KEY (city_id) REFERENCES cities(id),
     FOREIGN KEY (created_by) REFERENCES users(id),
     FOREIGN KEY (approved_by) REFERENCES users(id)
 );
+
+-- Индексы для keyset-пагинации списков по (created_at, id)
+CREATE INDEX IF NOT EXISTS nko_created_at_id_idx ON nko (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS events_created_at_id_idx ON events (created_at DESC, id DESC);
+
+-- Фильтры по времени: внутри секции
+CREATE INDEX IF NOT EXISTS events_starts_at_idx ON events (starts_at);
+CREATE INDEX IF NOT EXISTS events_finish_at_idx ON events (finish_at);
+CREATE INDEX IF NOT EXISTS news_created_at_id_idx ON news (created_at DESC, id DESC);
+
+-- Полнотекстовый поиск (русская морфология)
+CREATE INDEX IF NOT EXISTS nko_search_vector_idx ON nko USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS events_search_vector_idx ON events USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS news_search_vector_idx ON news USING GIN (search_vector);
+
+-- Триграммные индексы для фильтров ~* (regex) и ILIKE '%...%'
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS nko_name_trgm_idx ON nko USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS nko_description_trgm_idx ON nko USING GIN (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS events_name_trgm_idx ON events USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS events_description_trgm_idx ON events USING GIN (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS news_title_trgm_idx ON news USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS cities_name_trgm_idx ON cities USING GIN (name gin_trgm_ops);
+
+-- Геопоиск: GiST-индексы для отбора по bbox и радиусу (<@) по координатам
+CREATE INDEX IF NOT EXISTS nko_coords_gist_idx ON nko USING GIST (coords);
+CREATE INDEX IF NOT EXISTS events_coords_gist_idx ON events USING GIST (coords);
+
+-- Кластеры точек для карты: иерархическая сетка Web Mercator.
+-- Ячейка уровня zoom — тайл уровня zoom + 3 (8x8 ячеек на экранный тайл).
+-- Поддерживается инкрементально бэкендом (backend/clusters.py),
+-- rebuild_map_clusters() пересчитывает сетку целиком. Слой событий
+-- содержит только одобренные события: карта публичная.
+CREATE TABLE IF NOT EXISTS map_clusters (
+    layer VARCHAR(16) NOT NULL,
+    zoom SMALLINT NOT NULL,
+    cell_x INTEGER NOT NULL,
+    cell_y INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum_lat DOUBLE PRECISION NOT NULL,
+    sum_lon DOUBLE PRECISION NOT NULL,
+    min_lat DOUBLE PRECISION NOT NULL,
+    min_lon DOUBLE PRECISION NOT NULL,
+    max_lat DOUBLE PRECISION NOT NULL,
+    max_lon DOUBLE PRECISION NOT NULL,
+    version BIGINT NOT NULL,
+    PRIMARY KEY (layer, zoom, cell_x, cell_y)
+);
+
+CREATE OR REPLACE FUNCTION rebuild_map_clusters() RETURNS void AS $$
+BEGIN
+    DELETE FROM map_clusters;
+
+    INSERT INTO map_clusters
+    SELECT layer, zoom, cell_x, cell_y, count(*),
+           sum(lat), sum(lon), min(lat), min(lon), max(lat), max(lon),
+           (extract(epoch FROM clock_timestamp()) * 1000000)::bigint
+    FROM (
+        SELECT p.layer, z.zoom, p.lat, p.lon,
+               least(greatest(floor((p.lon + 180) / 360 * z.n), 0), z.n - 1)::int AS cell_x,
+               least(greatest(floor(
+                   (1 - ln(tan(radians(p.mlat)) + 1 / cos(radians(p.mlat))) / pi()) / 2 * z.n
+               ), 0), z.n - 1)::int AS cell_y
+        FROM (
+            SELECT 'nko' AS layer, coords[0] AS lat, coords[1] AS lon,
+                   least(greatest(coords[0], -85.05112878), 85.05112878) AS mlat
+            FROM nko
+            UNION ALL
+            SELECT 'event', coords[0], coords[1],
+                   least(greatest(coords[0], -85.05112878), 85.05112878)
+            FROM events WHERE coords IS NOT NULL AND state = 'approved'
+        ) p
+        CROSS JOIN (
+            SELECT zoom, power(2, zoom + 3) AS n FROM generate_series(0, 16) AS zoom
+        ) z
+    ) cells
+    GROUP BY layer, zoom, cell_x, cell_y;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Денормализованная лента событий для GET /event: событие вместе с названиями
+-- НКО, города и категорий, без JOIN при чтении. Поддерживается инкрементально
+-- бэкендом и периодически сверяется с исходными таблицами (backend/event_feed.py).
+CREATE TABLE IF NOT EXISTS event_feed (
+    id BIGINT NOT NULL,
+    nko_id BIGINT NOT NULL,
+    nko_name VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    address TEXT,
+    city_id SMALLINT NOT NULL,
+    city_name VARCHAR(100),
+    picture TEXT,
+    coords POINT,
+    starts_at TIMESTAMPTZ NOT NULL,
+    finish_at TIMESTAMPTZ,
+    created_by BIGINT NOT NULL,
+    approved_by BIGINT,
+    state events_states NOT NULL,
+    meta TEXT,
+    created_at TIMESTAMPTZ,
+    category_ids SMALLINT[] NOT NULL DEFAULT '{}',
+    categories TEXT[] NOT NULL DEFAULT '{}',
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    ) STORED,
+    -- Лента секционирована так же, как events: фильтры time_from/time_to отсекают секции
+    PRIMARY KEY (id, starts_at),
+    FOREIGN KEY (id, starts_at) REFERENCES events(id, starts_at) ON DELETE CASCADE ON UPDATE CASCADE
+) PARTITION BY RANGE (starts_at);
+
+-- Индексы под фильтры fetch_events
+CREATE INDEX IF NOT EXISTS event_feed_created_at_id_idx ON event_feed (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS event_feed_city_created_at_idx ON event_feed (city_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS event_feed_nko_created_at_idx ON event_feed (nko_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS event_feed_category_ids_idx ON event_feed USING GIN (category_ids);
+CREATE INDEX IF NOT EXISTS event_feed_starts_at_idx ON event_feed (starts_at);
+CREATE INDEX IF NOT EXISTS event_feed_finish_at_idx ON event_feed (finish_at);
+CREATE INDEX IF NOT EXISTS event_feed_search_vector_idx ON event_feed USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS event_feed_name_trgm_idx ON event_feed USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS event_feed_description_trgm_idx ON event_feed USING GIN (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS event_feed_coords_gist_idx ON event_feed USING GIST (coords);
+
+-- Публичная лента предстоящих событий (GET /event?upcoming=true): частичный индекс
+-- только по одобренным событиям, ключ — порядок ленты (starts_at, id). INCLUDE
+-- покрывает остальные условия ленты, поэтому ключи страницы выбираются index-only scan
+CREATE INDEX IF NOT EXISTS event_feed_approved_upcoming_idx ON event_feed (starts_at, id)
+    INCLUDE (finish_at, city_id, nko_id, category_ids)
+    WHERE state = 'approved';
+
+-- Секции событий и ленты за месяц (UTC), в который попадает ts: events_pYYYY_MM
+-- и event_feed_pYYYY_MM. Возвращает true, если секции созданы этим вызовом.
+CREATE OR REPLACE FUNCTION ensure_events_partition(ts TIMESTAMPTZ) RETURNS boolean AS $$
+DECLARE
+    month_start timestamp := date_trunc('month', ts AT TIME ZONE 'UTC');
+    suffix text := to_char(month_start, 'YYYY_MM');
+    lower_bound timestamptz := month_start AT TIME ZONE 'UTC';
+    upper_bound timestamptz := (month_start + interval '1 month') AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass('public.events_p' || suffix) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+
+    -- Одновременные вызовы для одного месяца создают секцию один раз
+    PERFORM pg_advisory_xact_lock(hashtext('events_partition_' || suffix));
+    IF to_regclass('public.events_p' || suffix) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+
+    EXECUTE format('CREATE TABLE events_p%s PARTITION OF events FOR VALUES FROM (%L) TO (%L)',
+                   suffix, lower_bound, upper_bound);
+    EXECUTE format('CREATE TABLE event_feed_p%s PARTITION OF event_feed FOR VALUES FROM (%L) TO (%L)',
+                   suffix, lower_bound, upper_bound);
+    RETURN true;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Перенос секции событий в схему events_archive (или удаление при keep = false).
+-- Категории событий копируются в архив рядом с секцией, избранное и строки
+-- ленты удаляются: на архивные события нельзя ссылаться внешними ключами.
+CREATE OR REPLACE FUNCTION archive_events_partition(suffix text, keep boolean) RETURNS void AS $$
+DECLARE
+    archive_suffix text := suffix;
+BEGIN
+    IF keep THEN
+        CREATE SCHEMA IF NOT EXISTS events_archive;
+        -- Секция за тот же месяц могла быть создана заново и уже архивирована
+        IF to_regclass('events_archive.events_p' || suffix) IS NOT NULL THEN
+            archive_suffix := suffix || '_' || to_char(now(), 'YYYYMMDDHH24MISS');
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE events_archive.events_categories_link_p%s AS '
+            'SELECT l.events_id, l.category_id FROM events_categories_link l '
+            'JOIN events_p%s e ON e.id = l.events_id AND e.starts_at = l.event_starts_at',
+            archive_suffix, suffix);
+    END IF;
+
+    EXECUTE format(
+        'DELETE FROM events_categories_link l USING events_p%s e '
+        'WHERE l.events_id = e.id AND l.event_starts_at = e.starts_at', suffix);
+    EXECUTE format(
+        'DELETE FROM favorite_events f USING events_p%s e '
+        'WHERE f.event_id = e.id AND f.event_starts_at = e.starts_at', suffix);
+    EXECUTE format('DROP TABLE IF EXISTS event_feed_p%s', suffix);
+    EXECUTE format('ALTER TABLE events DETACH PARTITION events_p%s', suffix);
+
+    IF keep THEN
+        IF archive_suffix <> suffix THEN
+            EXECUTE format('ALTER TABLE events_p%s RENAME TO events_p%s', suffix, archive_suffix);
+        END IF;
+        EXECUTE format('ALTER TABLE events_p%s SET SCHEMA events_archive', archive_suffix);
+    ELSE
+        EXECUTE format('DROP TABLE events_p%s', suffix);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Обслуживание секций: создает секции на months_ahead месяцев вперед и
+-- архивирует (keep_archived) или удаляет секции, закончившиеся раньше, чем
+-- retain_months месяцев назад (0 — хранить все). Параллельный вызов ничего не делает.
+CREATE OR REPLACE FUNCTION maintain_events_partitions(
+    months_ahead integer, retain_months integer, keep_archived boolean DEFAULT true
+) RETURNS TABLE (action text, partition_name text) AS $$
+DECLARE
+    current_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC');
+    month_start timestamp;
+    part record;
+    removed integer := 0;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('maintain_events_partitions')) THEN
+        RETURN;
+    END IF;
+
+    FOR i IN 0..months_ahead LOOP
+        month_start := current_month + make_interval(months => i);
+        IF ensure_events_partition(month_start AT TIME ZONE 'UTC') THEN
+            action := 'created';
+            partition_name := 'events_p' || to_char(month_start, 'YYYY_MM');
+            RETURN NEXT;
+        END IF;
+    END LOOP;
+
+    IF retain_months > 0 THEN
+        FOR part IN
+            SELECT substr(c.relname, 9) AS suffix
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'events'::regclass
+              AND c.relname ~ '^events_p[0-9]{4}_[0-9]{2}$'
+              AND to_date(substr(c.relname, 9), 'YYYY_MM') + interval '1 month'
+                  <= current_month - make_interval(months => retain_months)
+            ORDER BY c.relname
+        LOOP
+            PERFORM archive_events_partition(part.suffix, keep_archived);
+            removed := removed + 1;
+            action := CASE WHEN keep_archived THEN 'archived' ELSE 'dropped' END;
+            partition_name := 'events_p' || part.suffix;
+            RETURN NEXT;
+        END LOOP;
+
+        -- Точки ушедших событий убираются из кластеров карты
+        IF removed > 0 THEN
+            PERFORM rebuild_map_clusters();
+        END IF;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Секции на текущий и три следующих месяца; дальше их создает бэкенд
+-- (backend/event_partitions.py) по расписанию и при создании события
+SELECT * FROM maintain_events_partitions(3, 0);
+
+-- Счетчики изменений таблиц: из них строятся ETag ответов API (backend/versions.py).
+-- Начальное значение — время создания схемы, чтобы ETag не повторялись после пересоздания БД.
+CREATE TABLE IF NOT EXISTS table_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+INSERT INTO table_versions (name, version)
+SELECT name, (extract(epoch FROM now()) * 1000)::bigint
+FROM unnest(ARRAY['nko', 'events', 'news', 'cities', 'nko_categories', 'events_categories',
+                    'favorite_nko', 'favorite_events', 'favorite_news']) AS name
+ON CONFLICT (name) DO NOTHING;
@@ -84,6 +84,7 @@ INSERT INTO events_categories (name, description) VALUES
 ('Сбор вещей', 'Приём и распределение одежды, обуви и предметов быта');
 
 -- Заполнение таблицы events
+SELECT ensure_events_partition(month) FROM generate_series(timestamptz '2025-01-01 00:00+00', '2025-06-01 00:00+00', interval '1 month') AS month;
 INSERT INTO events (nko_id, name, description, address, city_id, picture, coords, starts_at, finish_at, created_by, approved_by, state, meta, created_at) VALUES
 (1, 'Благотворительный концерт «Подари жизнь»', 'Сбор средств на лечение детей, выступления артистов и ярмарка.', 'г. Москва, ул. Доватора, д. 13', 2, 'https://podari-zhizn.ru/events/1.jpg', POINT(37.5665, 55.7522), '2025-02-10 18:00:00+03', '2025-02-10 21:00:00+03', 5, 1, 'approved', NULL, '2025-01-20 10:00:00+03'),
 (2, 'Донорский марафон Русфонда', 'Донорская акция и консультации для потенциальных доноров костного мозга.', 'г. Москва, ул. Петровка, д. 26', 2, 'https://rusfond.ru/events/2.jpg', POINT(37.6156, 55.7658), '2025-03-05 10:00:00+03', '2025-03-05 18:00:00+03', 6, 2, 'rejected', NULL, '2025-02-10 09:30:00+03'),
@@ -0,0 +1,2 @@
+-- Начальный расчет кластеров карты после загрузки данных
+SELECT rebuild_map_clusters();
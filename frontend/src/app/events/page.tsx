@@ -8,10 +8,19 @@ import { Input } from '@/components/ui/input'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
 import { Button } from '@/components/ui/button'
 import { Search, Filter, Calendar, Heart, X } from 'lucide-react'
-import { fetchEvents, fetchCities, fetchNKO, EventResponse, CityResponse, EventFilters, NKOResponse } from '@/lib/api'
+import { fetchEvents, fetchCities, fetchNKO, EventResponse, CityResponse, EventFilters, NKOResponse, MAX_PAGE_SIZE } from '@/lib/api'
 import { useAuth } from '@/contexts/AuthContext'
 import { useState, useMemo, useEffect } from 'react'
 
+// Сортировка загруженных событий по дате (ближайшие первые)
+function sortByStart(events: EventResponse[]): EventResponse[] {
+  return [...events].sort((a, b) => {
+    const dateA = new Date(a.starts_at || 0)
+    const dateB = new Date(b.starts_at || 0)
+    return dateA.getTime() - dateB.getTime()
+  })
+}
+
 export default function EventsPage() {
   const { user, isLoading: authLoading } = useAuth()
   const [searchTerm, setSearchTerm] = useState('')
@@ -28,6 +37,8 @@ export default function EventsPage() {
   const [categories, setCategories] = useState<string[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   // DEBUG: Log authentication state
   console.log('DEBUG: Events Page - User auth state:', {
@@ -36,53 +47,54 @@ export default function EventsPage() {
   })
   console.log('DEBUG: Events Page - Show favorites only:', showFavoritesOnly)
 
-  // Загрузка данных при монтировании компонента и изменении фильтров
+  // Фильтры запроса к бэкенду
+  const filters = useMemo(() => {
+    const filters: EventFilters = {}
+    if (selectedCity !== 'all') {
+      filters.city = selectedCity
+    }
+    if (selectedCategory !== 'all') {
+      filters.category = [selectedCategory]
+    }
+    // Бэкенд принимает только выражения, пригодные для триграммного индекса
+    if (searchTerm.trim().length >= 3) {
+      filters.regex = searchTerm
+    }
+    if (selectedNKO !== 'all') {
+      filters.nko_id = [parseInt(selectedNKO)]
+    }
+    if (selectedDateFrom) {
+      filters.time_from = selectedDateFrom + 'T00:00:00'
+    }
+    if (selectedDateTo) {
+      filters.time_to = selectedDateTo + 'T23:59:59'
+    }
+
+    // Добавляем фильтр по избранным только для авторизованных пользователей
+    if (showFavoritesOnly && user) {
+      filters.favorite = true
+    }
+    return filters
+  }, [selectedCity, selectedCategory, searchTerm, selectedNKO, selectedDateFrom, selectedDateTo, showFavoritesOnly, user])
+
+  // Загрузка первой страницы при монтировании компонента и изменении фильтров
   useEffect(() => {
     const loadData = async () => {
       try {
         setLoading(true)
         setError(null)
         
-        // DEBUG: Log filter parameters
-        const filters: EventFilters = {}
-        if (selectedCity !== 'all') {
-          filters.city = selectedCity
-        }
-        if (selectedCategory !== 'all') {
-          filters.category = [selectedCategory]
-        }
-        if (searchTerm) {
-          filters.regex = searchTerm
-        }
-        if (selectedNKO !== 'all') {
-          filters.nko_id = [parseInt(selectedNKO)]
-        }
-        if (selectedDateFrom) {
-          filters.time_from = selectedDateFrom + 'T00:00:00'
-        }
-        if (selectedDateTo) {
-          filters.time_to = selectedDateTo + 'T23:59:59'
-        }
-        
-        // Добавляем фильтр по избранным только для авторизованных пользователей
-        if (showFavoritesOnly && user) {
-          filters.favorite = true
-          console.log('DEBUG: Events Page - Applying favorites filter for user:', user.id)
-        } else if (showFavoritesOnly && !user) {
-          console.warn('DEBUG: Events Page - Cannot apply favorites filter - user not authenticated')
-          // Не применяем фильтр если пользователь не авторизован
-        }
-        
         console.log('DEBUG: Events Page - Loading data with filters:', filters)
         console.log('DEBUG: Events Page - Show favorites only:', showFavoritesOnly)
         console.log('DEBUG: Events Page - User authenticated:', !!user)
         
-        // Параллельно загружаем события, города и НКО
-        const [eventsResponse, citiesResponse, nkoResponse] = await Promise.all([
+        // Параллельно загружаем первую страницу событий, города и НКО для фильтра
+        const [eventsPage, citiesResponse, nkoPage] = await Promise.all([
           fetchEvents(filters),
           fetchCities(),
-          fetchNKO()
+          fetchNKO(undefined, null, MAX_PAGE_SIZE)
         ])
+        const eventsResponse = eventsPage.items
         
         // DEBUG: Log event data structure
         console.log('DEBUG: Events - Sample event data:', eventsResponse[0])
@@ -91,16 +103,10 @@ export default function EventsPage() {
         console.log('DEBUG: Events - Available cities for filter:', citiesResponse.map(c => ({ id: c.id, name: c.name })))
         console.log('DEBUG: Events - Selected city filter:', selectedCity)
         
-        // Сортируем события по дате (ближайшие первые)
-        const sortedEvents = eventsResponse.sort((a, b) => {
-          const dateA = new Date(a.starts_at || 0)
-          const dateB = new Date(b.starts_at || 0)
-          return dateA.getTime() - dateB.getTime()
-        })
-        
-        setEventsData(sortedEvents)
+        setEventsData(sortByStart(eventsResponse))
+        setNextCursor(eventsPage.next_cursor ?? null)
         setCities(citiesResponse)
-        setNkoList(nkoResponse)
+        setNkoList(nkoPage.items)
         
         // Извлекаем уникальные категории из событий
         const uniqueCategories = Array.from(
@@ -120,7 +126,28 @@ export default function EventsPage() {
     if (!authLoading) {
       loadData()
     }
-  }, [authLoading, selectedCity, selectedCategory, searchTerm, selectedNKO, selectedDateFrom, selectedDateTo, showFavoritesOnly, user])
+  }, [authLoading, filters, selectedCity, showFavoritesOnly, user])
+
+  // Следующая страница по курсору из предыдущего ответа
+  const loadMore = async () => {
+    if (!nextCursor) {
+      return
+    }
+    try {
+      setLoadingMore(true)
+      const eventsPage = await fetchEvents(filters, nextCursor)
+      setEventsData(prev => sortByStart([...prev, ...eventsPage.items]))
+      setNextCursor(eventsPage.next_cursor ?? null)
+      setCategories(prev => Array.from(
+        new Set([...prev, ...eventsPage.items.flatMap(event => event.categories)])
+      ).sort())
+    } catch (err) {
+      console.error('Error loading more events:', err)
+      setError('Не удалось загрузить данные. Попробуйте обновить страницу.')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
 
   const filteredEvents = useMemo(() => {
     // Since we're now using server-side filtering, we just need to handle client-side search
@@ -398,6 +425,19 @@ export default function EventsPage() {
                   </Button>
                 </div>
               )}
+
+              {/* Следующая страница */}
+              {nextCursor && (
+                <div className="text-center mt-12">
+                  <Button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="btn-primary"
+                  >
+                    {loadingMore ? 'Загрузка...' : 'Показать еще'}
+                  </Button>
+                </div>
+              )}
             </>
           )}
         </div>
@@ -24,6 +24,8 @@ export default function NKOPage() {
   const [categories, setCategories] = useState<string[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   // DEBUG: Log authentication state
   console.log('DEBUG: NKO Page - User auth state:', {
@@ -32,51 +34,52 @@ export default function NKOPage() {
   })
   console.log('DEBUG: NKO Page - Show favorites only:', showFavoritesOnly)
 
-  // Загрузка данных при монтировании компонента и изменении фильтров
+  // Фильтры запроса к бэкенду
+  const filters = useMemo(() => {
+    const filters: NKOFilters = {}
+    if (selectedCity !== 'all') {
+      filters.city = selectedCity
+    }
+    if (selectedCategory !== 'all') {
+      filters.category = [selectedCategory]
+    }
+    // Бэкенд принимает только выражения, пригодные для триграммного индекса
+    if (searchTerm.trim().length >= 3) {
+      filters.regex = searchTerm
+    }
+
+    // Добавляем фильтр по избранным только для авторизованных пользователей
+    if (showFavoritesOnly && user) {
+      filters.favorite = true
+    }
+    return filters
+  }, [selectedCity, selectedCategory, searchTerm, showFavoritesOnly, user])
+
+  // Загрузка первой страницы при монтировании компонента и изменении фильтров
   useEffect(() => {
     const loadData = async () => {
       try {
         setLoading(true)
         setError(null)
         
-        // DEBUG: Log filter parameters
-        const filters: NKOFilters = {}
-        if (selectedCity !== 'all') {
-          filters.city = selectedCity
-        }
-        if (selectedCategory !== 'all') {
-          filters.category = [selectedCategory]
-        }
-        if (searchTerm) {
-          filters.regex = searchTerm
-        }
-        
-        // Добавляем фильтр по избранным только для авторизованных пользователей
-        if (showFavoritesOnly && user) {
-          filters.favorite = true
-          console.log('DEBUG: NKO Page - Applying favorites filter for user:', user.id)
-        } else if (showFavoritesOnly && !user) {
-          console.warn('DEBUG: NKO Page - Cannot apply favorites filter - user not authenticated')
-          // Не применяем фильтр если пользователь не авторизован
-        }
-        
         console.log('DEBUG: NKO Page - Loading data with filters:', filters)
         console.log('DEBUG: NKO Page - Show favorites only:', showFavoritesOnly)
         console.log('DEBUG: NKO Page - User authenticated:', !!user)
         
-        // Параллельно загружаем НКО и города
-        const [nkoResponse, citiesResponse] = await Promise.all([
+        // Параллельно загружаем первую страницу НКО и города
+        const [nkoPage, citiesResponse] = await Promise.all([
           fetchNKO(filters),
           fetchCities()
         ])
         
-        console.log('DEBUG: NKO Page - Loaded NKO count:', nkoResponse.length)
-        setNKOData(nkoResponse)
+        console.log('DEBUG: NKO Page - Loaded NKO count:', nkoPage.items.length)
+        setNKOData(nkoPage.items)
+        setNextCursor(nkoPage.next_cursor ?? null)
         setCities(citiesResponse)
         
         // Извлекаем уникальные категории из НКО
         const uniqueCategories = Array.from(
-          new Set(nkoResponse.flatMap(nko => nko.categories))
+          new Set(nkoPage.items.flatMap(nko => nko.categories))
         ).sort()
         setCategories(uniqueCategories)
         
@@ -92,7 +95,28 @@ export default function NKOPage() {
     if (!authLoading) {
       loadData()
     }
-  }, [authLoading, selectedCity, selectedCategory, searchTerm, showFavoritesOnly, user])
+  }, [authLoading, filters, showFavoritesOnly, user])
+
+  // Следующая страница по курсору из предыдущего ответа
+  const loadMore = async () => {
+    if (!nextCursor) {
+      return
+    }
+    try {
+      setLoadingMore(true)
+      const nkoPage = await fetchNKO(filters, nextCursor)
+      setNKOData(prev => [...prev, ...nkoPage.items])
+      setNextCursor(nkoPage.next_cursor ?? null)
+      setCategories(prev => Array.from(
+        new Set([...prev, ...nkoPage.items.flatMap(nko => nko.categories)])
+      ).sort())
+    } catch (err) {
+      console.error('Error loading more NKO:', err)
+      setError('Не удалось загрузить данные. Попробуйте обновить страницу.')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
 
   const filteredNKO = useMemo(() => {
     return nkoData.filter(nko => {
@@ -319,6 +343,19 @@ export default function NKOPage() {
                   </Button>
                 </div>
               )}
+
+              {/* Следующая страница */}
+              {nextCursor && (
+                <div className="text-center mt-12">
+                  <Button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="btn-primary"
+                  >
+                    {loadingMore ? 'Загрузка...' : 'Показать еще'}
+                  </Button>
+                </div>
+              )}
             </>
           )}
         </div>
@@ -28,8 +28,8 @@ export default function HomePage() {
   useEffect(() => {
     const loadData = async () => {
       try {
-        const data = await fetchNKO()
-        setNKOData(data)
+        const page = await fetchNKO()
+        setNKOData(page.items)
       } catch (error) {
         console.error('Error loading NKO data:', error)
       } finally {
@@ -5,7 +5,8 @@ import { Button } from '@/components/ui/button'
 import { MapPin, Calendar, Clock, Building, ExternalLink } from 'lucide-react'
 import { S3Image } from '@/components/S3Image'
 import Link from 'next/link'
-import { EventResponse } from '@/lib/api'
+import { FavoriteStar } from '@/components/FavoriteStar'
+import { EventResponse, addEventToFavorites, removeEventFromFavorites } from '@/lib/api'
 
 interface EventCardProps {
   event: EventResponse
@@ -82,9 +83,19 @@ export function EventCard({ event }: EventCardProps) {
           </div>
         </div>
         
-        <h3 className="font-bold text-lg text-[var(--color-text-primary)] mb-2 line-clamp-2">
-          {event.name}
-        </h3>
+        <div className="flex items-start justify-between gap-2 mb-2">
+          <h3 className="font-bold text-lg text-[var(--color-text-primary)] line-clamp-2">
+            {event.name}
+          </h3>
+          {/* Флаг есть только в ответе на запрос с токеном */}
+          {event.is_favorite !== undefined && event.is_favorite !== null && (
+            <FavoriteStar
+              isFavorite={event.is_favorite}
+              onAdd={() => addEventToFavorites(event.id)}
+              onRemove={() => removeEventFromFavorites(event.id)}
+            />
+          )}
+        </div>
         
         {/* Date and Time */}
         <div className="flex items-center text-[var(--color-text-secondary)] text-sm mb-2">
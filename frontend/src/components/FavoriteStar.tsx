@@ -0,0 +1,52 @@
+'use client'
+
+import { useEffect, useState } from 'react'
+import { Star } from 'lucide-react'
+
+interface FavoriteStarProps {
+  isFavorite: boolean
+  onAdd: () => Promise<unknown>
+  onRemove: () => Promise<unknown>
+}
+
+// Отметка «в избранном» на карточке списка. Начальное состояние приходит
+// в самой строке списка (is_favorite), отдельный запрос /favorites/contains не нужен
+export function FavoriteStar({ isFavorite, onAdd, onRemove }: FavoriteStarProps) {
+  const [favorite, setFavorite] = useState(isFavorite)
+  const [saving, setSaving] = useState(false)
+
+  // Список перезагружен с новыми флагами
+  useEffect(() => {
+    setFavorite(isFavorite)
+  }, [isFavorite])
+
+  const toggle = async () => {
+    setSaving(true)
+    try {
+      if (favorite) {
+        await onRemove()
+        setFavorite(false)
+      } else {
+        await onAdd()
+        setFavorite(true)
+      }
+    } catch (error) {
+      console.error('Error toggling favorite:', error)
+    } finally {
+      setSaving(false)
+    }
+  }
+
+  return (
+    <button
+      type="button"
+      onClick={toggle}
+      disabled={saving}
+      title={favorite ? 'В избранном' : 'В избранное'}
+      aria-pressed={favorite}
+      className="text-[var(--color-primary)] hover:opacity-80 transition-opacity disabled:opacity-50"
+    >
+      <Star className={`h-5 w-5 ${favorite ? 'fill-current' : ''}`} />
+    </button>
+  )
+}
@@ -5,7 +5,8 @@ import { Button } from '@/components/ui/button'
 import { MapPin, Globe, ExternalLink } from 'lucide-react'
 import { NKOLogo } from '@/components/NKOLogo'
 import Link from 'next/link'
-import { NKOResponse } from '@/lib/api'
+import { FavoriteStar } from '@/components/FavoriteStar'
+import { NKOResponse, addNKOToFavorites, removeNKOFromFavorites } from '@/lib/api'
 
 interface NKOCardProps {
   nko: NKOResponse
@@ -52,9 +53,19 @@ export function NKOCard({ nko }: NKOCardProps) {
           </div>
         </div>
         
-        <h3 className="font-bold text-lg text-[var(--color-text-primary)] mb-2 line-clamp-2">
-          {nko.name}
-        </h3>
+        <div className="flex items-start justify-between gap-2 mb-2">
+          <h3 className="font-bold text-lg text-[var(--color-text-primary)] line-clamp-2">
+            {nko.name}
+          </h3>
+          {/* Флаг есть только в ответе на запрос с токеном */}
+          {nko.is_favorite !== undefined && nko.is_favorite !== null && (
+            <FavoriteStar
+              isFavorite={nko.is_favorite}
+              onAdd={() => addNKOToFavorites(nko.id)}
+              onRemove={() => removeNKOFromFavorites(nko.id)}
+            />
+          )}
+        </div>
         
         <p className="text-[var(--color-text-secondary)] text-sm line-clamp-3">
           {nko.description}
@@ -254,6 +254,30 @@ class ApiClient {
 export const apiClient = new ApiClient(API_BASE_URL)
 export { ApiError }
 
+// Страница спискового эндпоинта (keyset-пагинация)
+export interface Page<T> {
+  items: T[]
+  next_cursor?: string | null
+}
+
+export const PAGE_SIZE = 50
+export const MAX_PAGE_SIZE = 200
+
+// Одна страница спискового эндпоинта; следующую запрашивают по next_cursor («Показать еще»)
+async function fetchPage<T>(
+  path: string,
+  params: URLSearchParams,
+  cursor?: string | null,
+  limit: number = PAGE_SIZE
+): Promise<Page<T>> {
+  params.set('limit', limit.toString())
+  if (cursor) {
+    params.set('cursor', cursor)
+  }
+
+  return apiClient.get<Page<T>>(`${path}?${params.toString()}`)
+}
+
 // NKO related interfaces
 export interface NKOResponse {
   id: number
@@ -267,6 +291,7 @@ export interface NKOResponse {
   meta?: { url?: string }
   created_at?: string
   categories: string[]
+  is_favorite?: boolean | null // Только при запросе с jwt_token
 }
 
 export interface CityResponse {
@@ -282,7 +307,11 @@ export interface NKOFilters {
 }
 
 // NKO API methods
-export async function fetchNKO(filters?: NKOFilters): Promise<NKOResponse[]> {
+export async function fetchNKO(
+  filters?: NKOFilters,
+  cursor?: string | null,
+  limit?: number
+): Promise<Page<NKOResponse>> {
   const params = new URLSearchParams()
   
   // Получаем токен из cookies (как в других частях приложения)
@@ -311,12 +340,7 @@ export async function fetchNKO(filters?: NKOFilters): Promise<NKOResponse[]> {
     console.log('DEBUG: fetchNKO - Adding favorite filter:', filters.favorite)
   }
   
-  const queryString = params.toString()
-  const endpoint = `/nko${queryString ? `?${queryString}` : ''}`
-  
-  console.log('DEBUG: fetchNKO - Endpoint:', endpoint)
-  
-  return apiClient.get<NKOResponse[]>(endpoint)
+  return fetchPage<NKOResponse>('/nko', params, cursor, limit)
 }
 
 export async function fetchNKOById(id: number): Promise<NKOResponse> {
@@ -374,6 +398,7 @@ export interface EventResponse {
   meta?: string
   created_at?: string
   categories: string[]
+  is_favorite?: boolean | null // Только при запросе с jwt_token
 }
 
 export interface EventFilters {
@@ -387,7 +412,7 @@ export interface EventFilters {
 }
 
 // Event API methods
-export async function fetchEvents(filters?: EventFilters): Promise<EventResponse[]> {
+export async function fetchEvents(filters?: EventFilters, cursor?: string | null): Promise<Page<EventResponse>> {
   const params = new URLSearchParams()
   
   // Получаем токен из cookies
@@ -428,12 +453,7 @@ export async function fetchEvents(filters?: EventFilters): Promise<EventResponse
     params.append('time_to', filters.time_to)
   }
   
-  const queryString = params.toString()
-  const endpoint = `/event${queryString ? `?${queryString}` : ''}`
-  
-  console.log('DEBUG: fetchEvents - Endpoint:', endpoint)
-  
-  return apiClient.get<EventResponse[]>(endpoint)
+  return fetchPage<EventResponse>('/event', params, cursor)
 }
 
 export async function fetchEventById(id: number): Promise<EventResponse> {
@@ -456,6 +476,23 @@ export async function fetchEventById(id: number): Promise<EventResponse> {
 }
 
 // Favorites API functions
+export interface FavoriteIds {
+  nko?: number[]
+  event?: number[]
+  news?: number[]
+}
+
+export interface FavoritesMembership {
+  nko: boolean[]
+  event: boolean[]
+  news: boolean[]
+}
+
+// Флаги «в избранном» для набора карточек одним запросом, в порядке переданных ID
+export async function checkFavorites(ids: FavoriteIds): Promise<FavoritesMembership> {
+  return apiClient.post<FavoritesMembership>('/favorites/contains', ids)
+}
+
 export async function addNKOToFavorites(nkoId: number): Promise<{ message: string }> {
   console.log('DEBUG: addNKOToFavorites - NKO ID:', nkoId)
   const endpoint = `/nko/${nkoId}/favorite`
@@ -471,9 +508,7 @@ export async function removeNKOFromFavorites(nkoId: number): Promise<{ message:
 export async function checkIfNKOIsFavorite(nkoId: number): Promise<boolean> {
   console.log('DEBUG: checkIfNKOIsFavorite - NKO ID:', nkoId)
   try {
-    // Получаем избранные НКО пользователя и проверяем наличие текущей
-    const favorites = await fetchNKO({ favorite: true })
-    const isFavorite = favorites.some(nko => nko.id === nkoId)
+    const isFavorite = (await checkFavorites({ nko: [nkoId] })).nko[0]
     console.log('DEBUG: checkIfNKOIsFavorite - result:', isFavorite)
     return isFavorite
   } catch (error) {
@@ -499,9 +534,7 @@ export async function removeEventFromFavorites(eventId: number): Promise<{ messa
 export async function checkIfEventIsFavorite(eventId: number): Promise<boolean> {
   console.log('DEBUG: checkIfEventIsFavorite - Event ID:', eventId)
   try {
-    // Получаем избранные события пользователя и проверяем наличие текущего
-    const favorites = await fetchEvents({ favorite: true })
-    const isFavorite = favorites.some(event => event.id === eventId)
+    const isFavorite = (await checkFavorites({ event: [eventId] })).event[0]
     console.log('DEBUG: checkIfEventIsFavorite - result:', isFavorite)
     return isFavorite
   } catch (error) {
@@ -64,6 +64,8 @@ class NewsToolRequest(ToolRequest):
     city: Optional[str] = None
     favorite: Optional[bool] = None
     regex: Optional[str] = None
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
 
 
 class EventsToolRequest(ToolRequest):
@@ -75,6 +77,8 @@ class EventsToolRequest(ToolRequest):
     regex: Optional[str] = None
     time_from: Optional[str] = None
     time_to: Optional[str] = None
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
 
 
 class NKOToolRequest(ToolRequest):
@@ -83,6 +87,8 @@ class NKOToolRequest(ToolRequest):
     favorite: Optional[bool] = None
     category: Optional[List[str]] = None
     regex: Optional[str] = None
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
 
 
 class SearchRequest(ToolRequest):
@@ -111,14 +117,20 @@ async def tool_get_news(request: NewsToolRequest) -> Dict[str, Any]:
             params["favorite"] = request.favorite
         if request.regex:
             params["regex"] = request.regex
+        if request.limit:
+            params["limit"] = request.limit
+        if request.cursor:
+            params["cursor"] = request.cursor
         
         response = await http_client.get("/news", params=params)
         response.raise_for_status()
+        page = response.json()
         
         return {
             "success": True,
-            "data": response.json(),
-            "count": len(response.json())
+            "data": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page.get("next_cursor")
         }
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
@@ -156,14 +168,20 @@ async def tool_get_events(request: EventsToolRequest) -> Dict[str, Any]:
             params["time_from"] = request.time_from
         if request.time_to:
             params["time_to"] = request.time_to
+        if request.limit:
+            params["limit"] = request.limit
+        if request.cursor:
+            params["cursor"] = request.cursor
         
         response = await http_client.get("/event", params=params)
         response.raise_for_status()
+        page = response.json()
         
         return {
             "success": True,
-            "data": response.json(),
-            "count": len(response.json())
+            "data": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page.get("next_cursor")
         }
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
@@ -272,7 +290,9 @@ async def mcp_endpoint(request: MCPRequest) -> Union[MCPSuccessResponse, MCPErro
                             "jwt_token": {"type": "string", "description": "JWT токен для получения избранных"},
                             "city": {"type": "string", "description": "Фильтр по городу"},
                             "favorite": {"type": "boolean", "description": "Только избранные новости"},
-                            "regex": {"type": "string", "description": "Поиск по тексту"}
+                            "regex": {"type": "string", "description": "Поиск по тексту"},
+                            "limit": {"type": "integer", "description": "Размер страницы"},
+                            "cursor": {"type": "string", "description": "Курсор следующей страницы (next_cursor из предыдущего ответа)"}
                         }
                     }
                 ),
@@ -289,7 +309,9 @@ async def mcp_endpoint(request: MCPRequest) -> Union[MCPSuccessResponse, MCPErro
                             "category": {"type": "array", "items": {"type": "string"}, "description": "Категории"},
                             "regex": {"type": "string", "description": "Поиск по тексту"},
                             "time_from": {"type": "string", "description": "Время начала (ISO)"},
-                            "time_to": {"type": "string", "description": "Время окончания (ISO)"}
+                            "time_to": {"type": "string", "description": "Время окончания (ISO)"},
+                            "limit": {"type": "integer", "description": "Размер страницы"},
+                            "cursor": {"type": "string", "description": "Курсор следующей страницы (next_cursor из предыдущего ответа)"}
                         }
                     }
                 ),
@@ -303,7 +325,9 @@ async def mcp_endpoint(request: MCPRequest) -> Union[MCPSuccessResponse, MCPErro
                             "city": {"type": "string", "description": "Город"},
                             "favorite": {"type": "boolean", "description": "Только избранные"},
                             "category": {"type": "array", "items": {"type": "string"}, "description": "Категории"},
-                            "regex": {"type": "string", "description": "Поиск по тексту"}
+                            "regex": {"type": "string", "description": "Поиск по тексту"},
+                            "limit": {"type": "integer", "description": "Размер страницы"},
+                            "cursor": {"type": "string", "description": "Курсор следующей страницы (next_cursor из предыдущего ответа)"}
                         }
                     }
                 ),
@@ -527,14 +551,20 @@ async def tool_get_nko(request: NKOToolRequest) -> Dict[str, Any]:
             params["category"] = request.category
         if request.regex:
             params["regex"] = request.regex
+        if request.limit:
+            params["limit"] = request.limit
+        if request.cursor:
+            params["cursor"] = request.cursor
         
         response = await http_client.get("/nko", params=params)
         response.raise_for_status()
+        page = response.json()
         
         return {
             "success": True,
-            "data": response.json(),
-            "count": len(response.json())
+            "data": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page.get("next_cursor")
         }
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
@@ -555,21 +585,21 @@ async def tool_search(request: SearchRequest) -> Dict[str, Any]:
         
         # Поиск по новостям
         if not request.entity_type or request.entity_type == "news":
-            news_response = await http_client.get("/news", params={"regex": request.query})
+            news_response = await http_client.get("/news", params={"q": request.query})
             if news_response.status_code == 200:
-                results["news"] = news_response.json()
+                results["news"] = news_response.json()["items"]
         
         # Поиск по мероприятиям
         if not request.entity_type or request.entity_type == "events":
-            events_response = await http_client.get("/event", params={"regex": request.query})
+            events_response = await http_client.get("/event", params={"q": request.query})
             if events_response.status_code == 200:
-                results["events"] = events_response.json()
+                results["events"] = events_response.json()["items"]
         
         # Поиск по НКО
         if not request.entity_type or request.entity_type == "nko":
-            nko_response = await http_client.get("/nko", params={"regex": request.query})
+            nko_response = await http_client.get("/nko", params={"q": request.query})
             if nko_response.status_code == 200:
-                results["nko"] = nko_response.json()
+                results["nko"] = nko_response.json()["items"]
         
         total_count = sum(len(v) for v in results.values())
         